@@ -5,20 +5,39 @@ Dieses Modul verwaltet die Ordnerstruktur nach Auftragsnummer,
 generiert Dateinamen mit Versionierung und verschiebt Dateien ins Archiv.
 """
 
+import os
+import fnmatch
 import shutil
 import hashlib
+import threading
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import logging
 
+import blob_store
+import metrics
+from pdf_merge import publish_exclusive
+
 logger = logging.getLogger(__name__)
 
 
+# Blockgröße beim Kopieren ins Archiv (große Blöcke = wenige SMB-Roundtrips)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Versuche, wenn ein paralleler Worker denselben Versionsnamen belegt hat
+MOVE_ATTEMPTS = 10
+
+
 class ArchiveError(Exception):
     """Fehler bei der Archivierung."""
     pass
 
 
+class ArchiveTargetExistsError(ArchiveError):
+    """Zieldatei wurde zwischenzeitlich von einem anderen Prozess angelegt."""
+    pass
+
+
 def format_auftrag_nr(raw_nr: str, pad_length: int = 6) -> str:
     """
     Formatiert die Auftragsnummer mit intelligenter Padding-Logik.
@@ -133,7 +152,8 @@ def get_archive_dir_for_auftrag(
     archiv_root: Path,
     auftrag_nr: str,
     config: Dict[str, Any],
-    datum: Optional[str] = None
+    datum: Optional[str] = None,
+    create: bool = True
 ) -> Path:
     """
     Bestimmt den Zielordner für eine Auftragsnummer.
@@ -148,6 +168,7 @@ def get_archive_dir_for_auftrag(
         auftrag_nr: Rohe oder gepaddete Auftragsnummer
         config: Konfigurationsdictionary
         datum: Datum im Format YYYY-MM-DD (optional)
+        create: Ordner anlegen (False = nur Pfad berechnen, z.B. für Pläne)
     
     Returns:
         Pfad zum Auftragsordner
@@ -179,7 +200,8 @@ def get_archive_dir_for_auftrag(
         logger.debug(f"Verwende flache Struktur: {auftrag_nr_padded}")
     
     # Ordner erstellen, falls nicht vorhanden
-    archive_dir.mkdir(parents=True, exist_ok=True)
+    if create:
+        archive_dir.mkdir(parents=True, exist_ok=True)
     logger.debug(f"Archivordner: {archive_dir}")
     
     return archive_dir
@@ -318,6 +340,64 @@ def generate_target_filename(
     return filename
 
 
+def _list_file_names(directory: Path) -> List[str]:
+    """Dateinamen eines Ordners (ein Aufruf von os.scandir)."""
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.name for entry in entries]
+    except FileNotFoundError:
+        return []
+
+
+def resolve_split_targets(
+    archiv_root: Path,
+    auftrag_nr: str,
+    config: Dict[str, Any],
+    metadata: Optional[Dict[str, Any]],
+    num_pages: int
+) -> Tuple[Path, Optional[Path]]:
+    """
+    Bestimmt die Archivpfade für Auftrag und Anhang einer aufgeteilten PDF.
+
+    Der Zielordner wird nur einmal aufgelistet; die Versionen für Auftrag
+    (wie get_existing_versions/generate_target_filename) und Anhang
+    (`<nr>_Anhang_S2-<n>[_v<k>].pdf`) werden aus dieser Liste bestimmt.
+
+    Args:
+        archiv_root: Root-Verzeichnis des Archivs
+        auftrag_nr: Auftragsnummer (roh, wie vom Parser geliefert)
+        config: Konfigurationsdictionary
+        metadata: Metadaten für Dateinamen und Jahr-Ordner
+        num_pages: Seitenzahl der Eingabe-PDF
+
+    Returns:
+        Tuple (Auftrag-Pfad, Anhang-Pfad); Anhang-Pfad ist None bei einer Seite
+    """
+    pad_length = config.get("auftragsnummer_pad_length", 6)
+    auftrag_nr_padded = format_auftrag_nr(auftrag_nr, pad_length)
+    datum = metadata.get("datum") if metadata else None
+    archive_dir = get_archive_dir_for_auftrag(archiv_root, auftrag_nr, config, datum)
+
+    names = [n for n in _list_file_names(archive_dir) if not n.startswith('.')]
+    pattern = f"{auftrag_nr_padded}_*.pdf"
+    existing = [archive_dir / n for n in names if fnmatch.fnmatch(n, pattern)]
+    auftrag_filename = generate_target_filename(auftrag_nr_padded, config, existing, metadata)
+    auftrag_path = archive_dir / auftrag_filename
+
+    if num_pages < 2:
+        return auftrag_path, None
+
+    taken = {os.path.normcase(n) for n in names}
+    taken.add(os.path.normcase(auftrag_filename))
+    base_name = f"{auftrag_nr}_Anhang_S2-{num_pages}"
+    anhang_filename = f"{base_name}.pdf"
+    version = 1
+    while os.path.normcase(anhang_filename) in taken:
+        version += 1
+        anhang_filename = f"{base_name}_v{version}.pdf"
+    return auftrag_path, archive_dir / anhang_filename
+
+
 def calculate_file_hash(file_path: Path) -> str:
     """
     Berechnet den SHA256-Hash einer Datei.
@@ -330,7 +410,7 @@ def calculate_file_hash(file_path: Path) -> str:
     """
     sha256 = hashlib.sha256()
     
-    with open(file_path, 'rb') as f:
+    with metrics.time_stage("hash"), open(file_path, 'rb') as f:
         # Datei in Blöcken lesen für große Dateien
         for block in iter(lambda: f.read(65536), b''):
             sha256.update(block)
@@ -340,6 +420,114 @@ def calculate_file_hash(file_path: Path) -> str:
     return file_hash
 
 
+def _fsync_dir(directory: Path) -> None:
+    """Schreibt den Verzeichniseintrag fest (nur POSIX, sonst ohne Wirkung)."""
+    if os.name != 'posix':
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_filesystem(source_path: Path, target_dir: Path) -> bool:
+    """True, wenn Quelle und Zielordner auf demselben Dateisystem liegen."""
+    try:
+        return os.stat(source_path).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def transfer_file(source_path: Path, target_path: Path, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """
+    Verschiebt eine Datei und berechnet dabei ihren SHA256-Hash.
+
+    Auf demselben Dateisystem wird die Datei einmal gelesen (Hash) und dann
+    umbenannt. Sonst wird sie in einem Durchgang kopiert: jeder Block geht
+    in den Hash und in eine Temp-Datei im Zielordner. Danach fsync, Prüfung
+    der Größe gegen die Quelle und atomares Umbenennen - ein Absturz
+    hinterlässt höchstens eine Temp-Datei, nie eine halbe PDF im Archiv.
+    Die Quelle wird erst gelöscht, wenn das Ziel vollständig vorliegt.
+
+    Veröffentlicht wird in beiden Fällen exklusiv (publish_exclusive): legt
+    ein anderer Worker den Namen gleichzeitig an, schlägt der Aufruf fehl,
+    statt dessen Datei zu überschreiben.
+
+    Args:
+        source_path: Quelldatei
+        target_path: Zielpfad (darf noch nicht existieren)
+        chunk_size: Blockgröße in Bytes
+
+    Returns:
+        Hexadezimaler SHA256-Hash
+
+    Raises:
+        ArchiveTargetExistsError: Wenn das Ziel existiert
+        ArchiveError: Wenn die Kopie unvollständig ist
+        OSError: Bei Lese-/Schreibfehlern
+    """
+    target_dir = target_path.parent
+    target_dir.mkdir(parents=True, exist_ok=True)
+    if target_path.exists():
+        raise ArchiveTargetExistsError(f"Zieldatei existiert bereits: {target_path}")
+
+    if _same_filesystem(source_path, target_dir):
+        file_hash = calculate_file_hash(source_path)
+        try:
+            publish_exclusive(source_path, target_path)
+        except FileExistsError as e:
+            raise ArchiveTargetExistsError(str(e))
+        _fsync_dir(target_dir)
+        return file_hash
+
+    sha256 = hashlib.sha256()
+    tmp_path = target_dir / f".{target_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            expected_size = os.fstat(src.fileno()).st_size
+            for block in iter(lambda: src.read(chunk_size), b''):
+                sha256.update(block)
+                dst.write(block)
+            dst.flush()
+            os.fsync(dst.fileno())
+            written = dst.tell()
+        if written != expected_size:
+            raise ArchiveError(
+                f"Kopie unvollständig: {written} von {expected_size} Bytes ({source_path.name})"
+            )
+        try:
+            shutil.copystat(source_path, tmp_path)
+        except OSError:
+            pass
+        try:
+            publish_exclusive(tmp_path, target_path)
+        except FileExistsError as e:
+            raise ArchiveTargetExistsError(str(e))
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    _fsync_dir(target_dir)
+
+    try:
+        source_path.unlink()
+    except OSError as e:
+        # Archiv ist vollständig - eine übrig gebliebene Quelle ist nur lästig
+        logger.warning(f"⚠️  Quelldatei konnte nicht gelöscht werden: {source_path} ({e})")
+
+    file_hash = sha256.hexdigest()
+    logger.debug(f"SHA256-Hash: {file_hash[:16]}...")
+    return file_hash
+
+
 def move_to_archive(
     source_path: Path,
     archiv_root: Path,
@@ -366,9 +554,6 @@ def move_to_archive(
     if not source_path.exists():
         raise ArchiveError(f"Quelldatei existiert nicht: {source_path}")
     
-    # Hash vor dem Verschieben berechnen
-    file_hash = calculate_file_hash(source_path)
-    
     # Auftragsnummer formatieren
     pad_length = config.get("auftragsnummer_pad_length", 6)
     auftrag_nr_padded = format_auftrag_nr(auftrag_nr, pad_length)
@@ -379,18 +564,25 @@ def move_to_archive(
     # Zielordner bestimmen (mit Datum für Jahr-basierte Struktur)
     archive_dir = get_archive_dir_for_auftrag(archiv_root, auftrag_nr, config, datum)
     
-    # Existierende Versionen finden
-    existing_files = get_existing_versions(archive_dir, auftrag_nr_padded)
-    
-    # Dateinamen generieren (mit optionalen Metadaten)
-    target_filename = generate_target_filename(auftrag_nr_padded, config, existing_files, metadata)
-    target_path = archive_dir / target_filename
-    
-    # Datei verschieben
+    # Datei verschieben (Hash wird dabei berechnet). Belegt ein paralleler
+    # Worker denselben Versionsnamen, wird die nächste Version ermittelt.
     try:
-        logger.info(f"Verschiebe {source_path.name} -> {target_path}")
-        shutil.move(str(source_path), str(target_path))
+        for attempt in range(1, MOVE_ATTEMPTS + 1):
+            existing_files = get_existing_versions(archive_dir, auftrag_nr_padded)
+            target_filename = generate_target_filename(auftrag_nr_padded, config, existing_files, metadata)
+            target_path = archive_dir / target_filename
+            logger.info(f"Verschiebe {source_path.name} -> {target_path}")
+            try:
+                with metrics.time_stage("archive_move"):
+                    file_hash = transfer_file(source_path, target_path)
+                break
+            except ArchiveTargetExistsError:
+                if attempt == MOVE_ATTEMPTS:
+                    raise
+                logger.warning(f"⚠️  {target_path.name} wurde parallel angelegt, versuche nächste Version")
         logger.info(f"Datei erfolgreich archiviert: {target_path}")
+        if blob_store.is_enabled(config):
+            blob_store.adopt(target_path, file_hash, blob_store.store_dir(archiv_root, config))
         
         return target_path, file_hash
         
@@ -446,12 +638,25 @@ def create_archive_structure(archiv_root: Path) -> None:
     logger.info(f"Archiv-Struktur erstellt: {archiv_root}")
 
 
-def get_archive_statistics(archiv_root: Path) -> Dict[str, Any]:
+def get_archive_statistics(
+    archiv_root: Path,
+    db_path: Optional[Path] = None,
+    refresh: bool = False,
+    max_age: float = 300.0
+) -> Dict[str, Any]:
     """
     Sammelt Statistiken über das Archiv.
     
+    Liest aus dem Datei-Manifest (archive_manifest) statt das Archiv zu
+    durchlaufen. Ist der letzte Abgleich älter als `max_age`, läuft er im
+    Hintergrund (wie /api/backup/stats); geliefert wird der bisherige Stand.
+    
     Args:
         archiv_root: Root-Verzeichnis des Archivs
+        db_path: Pfad zur werkstatt.db (Standard: archiv_root/werkstatt.db)
+        refresh: Manifest vorher synchron abgleichen (stat aller bekannten Ordner)
+        max_age: Sekunden, die ein Abgleich als aktuell gilt
+                 (vgl. Config `manifest_refresh_seconds`)
     
     Returns:
         Dictionary mit Statistiken (Anzahl Aufträge, Dateien, Gesamtgröße)
@@ -463,33 +668,13 @@ def get_archive_statistics(archiv_root: Path) -> Dict[str, Any]:
             "total_size_mb": 0.0
         }
     
-    # Alle Auftragsordner finden (6-stellige Zahlen)
-    auftragsordner = []
-    total_files = 0
-    total_size = 0
-    
-    for item in archiv_root.rglob("*"):
-        if item.is_dir() and len(item.name) == 6 and item.name.isdigit():
-            auftragsordner.append(item)
-            
-            # PDFs in diesem Ordner zählen
-            pdfs = list(item.glob("*.pdf"))
-            total_files += len(pdfs)
-            
-            # Größe berechnen
-            for pdf in pdfs:
-                try:
-                    total_size += pdf.stat().st_size
-                except:
-                    pass
-    
-    total_size_mb = total_size / (1024 * 1024)  # Bytes zu MB
-    
-    stats = {
-        "total_auftraege": len(auftragsordner),
-        "total_files": total_files,
-        "total_size_mb": round(total_size_mb, 2)
-    }
+    import archive_manifest
+    db_path = db_path or archiv_root / "werkstatt.db"
+    if refresh:
+        archive_manifest.reconcile(db_path, archiv_root)
+    else:
+        archive_manifest.refresh_in_background(db_path, archiv_root, max_age)
+    stats = archive_manifest.statistics(db_path)
     
     logger.info(f"Archiv-Statistik: {stats}")
     return stats
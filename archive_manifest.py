@@ -0,0 +1,558 @@
+"""
+Datei-Manifest des Archivs.
+
+Die Tabelle `archive_manifest` in der werkstatt.db führt jede Datei im Archiv
+mit Größe, Änderungszeit, SHA256-Hash (falls bekannt) und Auftrags-ID.
+Statistiken (Anzahl PDFs, Gesamtgröße, Auftragsordner, data.csv-Dateien)
+kommen damit aus einer SQL-Abfrage statt aus einem rglob über das komplette
+SMB-Archiv.
+
+Aktuell gehalten wird das Manifest auf zwei Wegen:
+- Die Schreibpfade (Eingang, Ordner-Import, Neu-Verarbeiten) tragen ihre
+  Dateien direkt ein (`record_files`).
+- `reconcile()` gleicht den Rest ab (Änderungen von Hand, Backup-Export,
+  Umbenennungen in der Web-UI). Jeder bekannte Ordner wird nur per stat()
+  geprüft; aufgelistet (os.scandir) werden nur Ordner, deren Änderungszeit
+  sich seit dem letzten Abgleich geändert hat. Eine Datei, die ohne
+  Umbenennen überschrieben wurde, erkennt erst ein vollständiger Abgleich
+  (`full=True`).
+
+Verwendung:
+    python3 archive_manifest.py            # Abgleich (inkrementell)
+    python3 archive_manifest.py --full     # Alle Ordner neu auflisten
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import db
+from folder_walker import is_ignored
+
+logger = logging.getLogger(__name__)
+
+
+# Dateien im Archiv-Root, die nicht ins Manifest gehören (Datenbank, Checkpoints)
+IGNORED_FILE_PREFIXES = ('werkstatt.db',)
+
+# Ordner pro Transaktion beim Abgleich
+RECONCILE_BATCH = 200
+
+_initialized = set()
+_init_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_refreshing = set()
+
+
+class ArchiveManifestError(Exception):
+    """Fehler beim Zugriff auf das Archiv-Manifest."""
+    pass
+
+
+def _ensure_tables(db_path: Path) -> None:
+    """Legt die Manifest-Tabellen einmal pro Prozess an."""
+    key = str(db_path)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = db._get_optimized_connection(db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_manifest (
+                    path TEXT PRIMARY KEY,
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    hash TEXT,
+                    auftrag_id INTEGER,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_manifest_dir ON archive_manifest(dir)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_manifest_auftrag ON archive_manifest(auftrag_id)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_manifest_dirs (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_manifest_dirs_parent ON archive_manifest_dirs(parent)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_manifest_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    _ensure_tables(db_path)
+    return db._get_optimized_connection(db_path)
+
+
+def _key(path: Path) -> str:
+    """Schlüssel einer Datei (wie auftraege.file_path: str des Pfads)."""
+    return str(Path(path))
+
+
+def _is_tracked(name: str) -> bool:
+    return not name.startswith('.') and not name.startswith(IGNORED_FILE_PREFIXES)
+
+
+def _upsert_sql() -> str:
+    # Hash bleibt erhalten, solange Größe und Änderungszeit gleich sind
+    return '''
+        INSERT INTO archive_manifest (path, dir, name, size, mtime_ns, hash, auftrag_id, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            size = excluded.size,
+            mtime_ns = excluded.mtime_ns,
+            hash = COALESCE(excluded.hash, CASE
+                WHEN archive_manifest.size = excluded.size AND archive_manifest.mtime_ns = excluded.mtime_ns
+                THEN archive_manifest.hash END),
+            auftrag_id = COALESCE(excluded.auftrag_id, archive_manifest.auftrag_id),
+            updated_at = excluded.updated_at
+    '''
+
+
+# ============================================================
+# Schreibpfade
+# ============================================================
+
+def record_files(
+    db_path: Path,
+    paths: Iterable[Optional[Path]],
+    auftrag_id: Optional[int] = None,
+    hashes: Optional[Dict[Path, str]] = None
+) -> bool:
+    """
+    Trägt neu geschriebene Archivdateien ins Manifest ein.
+
+    Fehler werden nur protokolliert - der nächste Abgleich holt fehlende
+    Einträge nach; die Archivierung selbst soll daran nicht scheitern.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        paths: Archivdateien (None-Einträge werden übersprungen)
+        auftrag_id: Zugehöriger Auftrag
+        hashes: Bekannte SHA256-Hashes pro Pfad
+
+    Returns:
+        True, wenn das Manifest aktualisiert wurde
+    """
+    hashes = {_key(p): h for p, h in (hashes or {}).items()}
+    now = datetime.now().isoformat()
+    rows = []
+    for path in paths:
+        if path is None:
+            continue
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError as e:
+            logger.warning(f"Manifest: {path.name} nicht lesbar ({e})")
+            continue
+        key = _key(path)
+        rows.append((key, _key(path.parent), path.name, st.st_size, st.st_mtime_ns,
+                     hashes.get(key), auftrag_id, now))
+    if not rows:
+        return False
+    try:
+        conn = _connect(db_path)
+        try:
+            db._begin_write(conn)
+            conn.executemany(_upsert_sql(), rows)
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error as e:
+        logger.warning(f"Manifest nicht aktualisiert ({e}) - wird beim nächsten Abgleich nachgeholt")
+        return False
+
+
+def forget_files(db_path: Path, paths: Iterable[Path]) -> None:
+    """Entfernt gelöschte oder verschobene Dateien aus dem Manifest."""
+    keys = [(_key(p),) for p in paths if p is not None]
+    if not keys:
+        return
+    try:
+        conn = _connect(db_path)
+        try:
+            db._begin_write(conn)
+            conn.executemany('DELETE FROM archive_manifest WHERE path = ?', keys)
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"Manifest nicht aktualisiert ({e}) - wird beim nächsten Abgleich nachgeholt")
+
+
+# ============================================================
+# Abgleich mit dem Dateisystem
+# ============================================================
+
+def _delete_tree(conn: sqlite3.Connection, directory: str) -> int:
+    """Entfernt einen verschwundenen Ordner samt Unterordnern aus dem Manifest."""
+    prefix = directory.rstrip(os.sep) + os.sep
+    # substr statt LIKE: Ordnernamen dürfen '_' und '%' enthalten
+    cursor = conn.execute(
+        'DELETE FROM archive_manifest WHERE dir = ? OR substr(dir, 1, ?) = ?',
+        (directory, len(prefix), prefix)
+    )
+    conn.execute(
+        'DELETE FROM archive_manifest_dirs WHERE path = ? OR substr(path, 1, ?) = ?',
+        (directory, len(prefix), prefix)
+    )
+    return cursor.rowcount
+
+
+def _scan(directory: str) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """Listet einen Ordner: {Dateiname: (Größe, mtime_ns)}, Unterordner."""
+    files: Dict[str, Tuple[int, int]] = {}
+    subdirs: List[str] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_ignored(entry.name):
+                        subdirs.append(entry.path)
+                elif entry.is_file() and _is_tracked(entry.name):
+                    st = entry.stat()
+                    files[entry.name] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                # Eintrag zwischen Auflisten und Prüfen verschwunden
+                continue
+    return files, subdirs
+
+
+class _Changes:
+    """Gesammelte Änderungen eines Abgleichs, in kurzen Transaktionen geschrieben."""
+
+    def __init__(self, conn: sqlite3.Connection, stats: Dict[str, int]):
+        self.conn = conn
+        self.stats = stats
+        self.upserts: List[tuple] = []
+        self.deletes: List[tuple] = []
+        self.trees: List[str] = []
+        self.dirs: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.dirs) + len(self.trees)
+
+    def flush(self) -> None:
+        if not (self.upserts or self.deletes or self.trees or self.dirs):
+            return
+        # Dateisystem-Zugriffe laufen außerhalb der Transaktion - der
+        # Schreib-Lock wird nur für die SQL-Anweisungen gehalten
+        db._begin_write(self.conn)
+        try:
+            for directory in self.trees:
+                self.stats['removed'] += _delete_tree(self.conn, directory)
+            self.conn.executemany(_upsert_sql(), self.upserts)
+            self.conn.executemany('DELETE FROM archive_manifest WHERE path = ?', self.deletes)
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO archive_manifest_dirs (path, parent, mtime_ns) VALUES (?, ?, ?)',
+                self.dirs
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.upserts, self.deletes, self.trees, self.dirs = [], [], [], []
+
+
+def reconcile(db_path: Path, archiv_root: Path, full: bool = False) -> Dict[str, Any]:
+    """
+    Gleicht das Manifest mit dem Archiv ab.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        full: Alle Ordner auflisten, auch wenn ihre Änderungszeit gleich ist
+
+    Returns:
+        Statistik (dirs_checked, dirs_scanned, added, updated, removed, seconds)
+
+    Raises:
+        ArchiveManifestError: Wenn das Archiv nicht erreichbar ist
+    """
+    start = time.perf_counter()
+    root = _key(archiv_root)
+    if not os.path.isdir(root):
+        raise ArchiveManifestError(f"Archiv nicht gefunden: {archiv_root}")
+
+    stats = {'dirs_checked': 0, 'dirs_scanned': 0, 'added': 0, 'updated': 0, 'removed': 0}
+    conn = _connect(db_path)
+    try:
+        known_dirs: Dict[str, int] = {}
+        children: Dict[str, List[str]] = {}
+        for row in conn.execute('SELECT path, parent, mtime_ns FROM archive_manifest_dirs'):
+            known_dirs[row['path']] = row['mtime_ns']
+            children.setdefault(row['parent'], []).append(row['path'])
+
+        now = datetime.now().isoformat()
+        changes = _Changes(conn, stats)
+        stack: List[Tuple[str, Optional[str]]] = [(root, None)]
+        while stack:
+            directory, parent = stack.pop()
+            stats['dirs_checked'] += 1
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                changes.trees.append(directory)
+                continue
+
+            if not full and known_dirs.get(directory) == mtime_ns:
+                # Ordnerinhalt unverändert: nur bekannte Unterordner prüfen
+                stack.extend((child, directory) for child in children.get(directory, []))
+                continue
+
+            try:
+                files, subdirs = _scan(directory)
+            except OSError as e:
+                logger.warning(f"Ordner nicht lesbar, übersprungen: {directory} ({e})")
+                continue
+            stats['dirs_scanned'] += 1
+
+            stored = {row['name']: (row['size'], row['mtime_ns']) for row in conn.execute(
+                'SELECT name, size, mtime_ns FROM archive_manifest WHERE dir = ?', (directory,))}
+            for name, (size, file_mtime) in files.items():
+                old = stored.get(name)
+                if old == (size, file_mtime):
+                    continue
+                stats['added' if old is None else 'updated'] += 1
+                changes.upserts.append(
+                    (os.path.join(directory, name), directory, name, size, file_mtime, None, None, now))
+            gone = [(os.path.join(directory, name),) for name in stored if name not in files]
+            changes.deletes.extend(gone)
+            stats['removed'] += len(gone)
+
+            current = set(subdirs)
+            changes.trees.extend(child for child in children.get(directory, []) if child not in current)
+            changes.dirs.append((directory, parent, mtime_ns))
+            stack.extend((child, directory) for child in sorted(subdirs, reverse=True))
+
+            if len(changes) >= RECONCILE_BATCH:
+                changes.flush()
+
+        changes.flush()
+        db._begin_write(conn)
+        _link_auftraege(conn)
+        conn.execute('INSERT OR REPLACE INTO archive_manifest_state (key, value) VALUES (?, ?)',
+                     ('last_reconcile', datetime.now().isoformat()))
+        conn.execute('INSERT OR REPLACE INTO archive_manifest_state (key, value) VALUES (?, ?)',
+                     ('archiv_root', root))
+        conn.commit()
+    finally:
+        conn.close()
+
+    stats['seconds'] = round(time.perf_counter() - start, 2)
+    logger.info(f"✓ Manifest abgeglichen: {stats['dirs_scanned']}/{stats['dirs_checked']} Ordner gelesen, "
+                f"+{stats['added']} ~{stats['updated']} -{stats['removed']} ({stats['seconds']}s)")
+    return stats
+
+
+def _link_auftraege(conn: sqlite3.Connection) -> None:
+    """Ordnet neu gefundenen Dateien ihren Auftrag zu (über auftraege.file_path)."""
+    unlinked = {row['path'] for row in conn.execute(
+        'SELECT path FROM archive_manifest WHERE auftrag_id IS NULL')}
+    if not unlinked:
+        return
+    try:
+        rows = conn.execute('SELECT id, file_path FROM auftraege').fetchall()
+    except sqlite3.OperationalError:
+        # auftraege-Tabelle existiert noch nicht
+        return
+    conn.executemany(
+        'UPDATE archive_manifest SET auftrag_id = ? WHERE path = ?',
+        [(row['id'], row['file_path']) for row in rows if row['file_path'] in unlinked]
+    )
+
+
+def last_reconcile(db_path: Path) -> Optional[datetime]:
+    """Zeitpunkt des letzten Abgleichs (None = noch nie abgeglichen)."""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM archive_manifest_state WHERE key = 'last_reconcile'").fetchone()
+    finally:
+        conn.close()
+    return datetime.fromisoformat(row['value']) if row else None
+
+
+def refresh_in_background(db_path: Path, archiv_root: Path, max_age: float) -> bool:
+    """
+    Startet einen Abgleich im Hintergrund, wenn der letzte älter als max_age ist.
+
+    Pro Datenbank läuft höchstens ein Abgleich gleichzeitig; Aufrufer lesen
+    währenddessen den bisherigen Stand.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        max_age: Sekunden, die ein Abgleich als aktuell gilt
+
+    Returns:
+        True, wenn ein Abgleich gestartet wurde
+    """
+    key = str(db_path)
+    last = last_reconcile(db_path)
+    if last is not None and (datetime.now() - last).total_seconds() < max_age:
+        return False
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def run() -> None:
+        try:
+            reconcile(db_path, archiv_root)
+        except Exception as e:
+            logger.warning(f"Manifest-Abgleich fehlgeschlagen: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name="manifest-reconcile", daemon=True).start()
+    return True
+
+
+# ============================================================
+# Abfragen
+# ============================================================
+
+def _is_order_folder(directory: str) -> bool:
+    name = os.path.basename(directory)
+    return len(name) == 6 and name.isdigit()
+
+
+def statistics(db_path: Path) -> Dict[str, Any]:
+    """
+    Archiv-Statistik aus dem Manifest.
+
+    Returns:
+        total_auftraege (Auftragsordner mit PDFs), total_files (PDFs darin),
+        total_size_mb, total_pdfs (alle PDFs), csv_count (data.csv),
+        last_reconcile (ISO-Zeitpunkt oder None)
+    """
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT dir, COUNT(*) AS files, SUM(size) AS size
+            FROM archive_manifest
+            WHERE lower(name) LIKE '%.pdf'
+            GROUP BY dir
+        ''').fetchall()
+        csv_count = conn.execute(
+            "SELECT COUNT(*) FROM archive_manifest WHERE name = 'data.csv'").fetchone()[0]
+        state = conn.execute(
+            "SELECT value FROM archive_manifest_state WHERE key = 'last_reconcile'").fetchone()
+    finally:
+        conn.close()
+
+    order_rows = [row for row in rows if _is_order_folder(row['dir'])]
+    total_size = sum(row['size'] or 0 for row in order_rows)
+    return {
+        "total_auftraege": len(order_rows),
+        "total_files": sum(row['files'] for row in order_rows),
+        "total_size_mb": round(total_size / (1024 * 1024), 2),
+        "total_pdfs": sum(row['files'] for row in rows),
+        "csv_count": csv_count,
+        "last_reconcile": state['value'] if state else None
+    }
+
+
+def count_pdfs(db_path: Path) -> Optional[int]:
+    """Anzahl PDFs im Archiv laut Manifest (None = noch nie abgeglichen)."""
+    if last_reconcile(db_path) is None:
+        return None
+    conn = _connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM archive_manifest WHERE lower(name) LIKE '%.pdf'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def newest_file(db_path: Path, name: str) -> Optional[Path]:
+    """Zuletzt geänderte Datei mit diesem Namen (z.B. 'data.csv')."""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute('''
+            SELECT path FROM archive_manifest WHERE name = ? ORDER BY mtime_ns DESC LIMIT 1
+        ''', (name,)).fetchone()
+    finally:
+        conn.close()
+    return Path(row['path']) if row else None
+
+
+def files_by_auftrag(db_path: Path, auftrag_ids: Iterable[int]) -> Dict[int, List[Path]]:
+    """
+    Dateien pro Auftrag laut Manifest (Auftrag, Anhang, Daten eines Imports).
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        auftrag_ids: Auftrags-IDs
+
+    Returns:
+        {auftrag_id: [Pfade]}; Aufträge ohne zugeordnete Dateien fehlen
+    """
+    ids = list(dict.fromkeys(auftrag_ids))
+    result: Dict[int, List[Path]] = {}
+    conn = _connect(db_path)
+    try:
+        # SQLite begrenzt die Anzahl Parameter pro Abfrage
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                    f'SELECT auftrag_id, path FROM archive_manifest WHERE auftrag_id IN ({marks})', chunk):
+                result.setdefault(row['auftrag_id'], []).append(Path(row['path']))
+    finally:
+        conn.close()
+    return result
+
+
+def list_files(db_path: Path) -> List[Tuple[str, int, int, Optional[str]]]:
+    """Alle Dateien laut Manifest als (Pfad, Größe, mtime_ns, Hash)."""
+    conn = _connect(db_path)
+    try:
+        return [tuple(row) for row in conn.execute('SELECT path, size, mtime_ns, hash FROM archive_manifest')]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Archiv-Manifest abgleichen')
+    arg_parser.add_argument('--full', action='store_true', help='Alle Ordner neu auflisten')
+    arg_parser.add_argument('--config', help='Pfad zur Konfigurationsdatei')
+    args = arg_parser.parse_args()
+
+    cfg = Config(Path(args.config)) if args.config else Config()
+    try:
+        reconcile(cfg.get_db_path(), cfg.get_archiv_root(), full=args.full)
+    except ArchiveManifestError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for key, value in statistics(cfg.get_db_path()).items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,534 @@
+"""
+Umstellung bestehender Archivordner auf die konfigurierte Struktur.
+
+`use_year_folders` / `use_thousand_blocks` gelten nur für neue Dateien. Dieses
+Werkzeug verschiebt das vorhandene Archiv nachträglich:
+
+1. Plan: Für jeden Auftrag wird der Zielordner über
+   `archive.get_archive_dir_for_auftrag` bestimmt. Verschoben wird der ganze
+   Auftragsordner (Auftrag, Anhang, Daten, Backup-CSV). Liegen Versionen mit
+   unterschiedlichem Ziel in einem Ordner (z.B. verschiedene Jahre), gilt das
+   Ziel der neuesten Version. Treffen mehrere Ordner auf dasselbe Ziel,
+   werden ihre Einträge einzeln zusammengeführt; gleichnamige Dateien werden
+   als Konflikt gemeldet und nicht angefasst.
+2. Verschieben: Thread-Pool, ein Task pro Zielordner. Innerhalb eines
+   Laufwerks per Umbenennen (über SMB serverseitig, ohne Datenkopie).
+3. Datenbank: Alle `file_path` in einer einzigen Transaktion.
+
+Jeder Schritt steht in der Tabelle `archive_migration` der werkstatt.db.
+Ein abgebrochener Lauf wird beim nächsten Aufruf fortgesetzt (bereits
+verschobene Ordner werden erkannt), `--rollback` macht die letzte Migration
+rückgängig - auch einen abgebrochenen Lauf mit teilweise verschobenen
+Ordnern.
+
+Verwendung:
+    python3 archive_migrate.py --dry-run       # Plan anzeigen
+    python3 archive_migrate.py [--workers 8]   # Migrieren / fortsetzen
+    python3 archive_migrate.py --rollback      # Letzte Migration zurück
+"""
+
+import errno
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+import archive
+import db
+import query_cache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WORKERS = 8
+
+STATUS_PENDING = 'pending'
+STATUS_MOVED = 'moved'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_ROLLED_BACK = 'rolled_back'
+
+_OPEN_STATUSES = (STATUS_PENDING, STATUS_MOVED, STATUS_FAILED)
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+class ArchiveMigrationError(Exception):
+    """Fehler bei der Umstellung der Archivstruktur."""
+    pass
+
+
+class DirMove(NamedTuple):
+    """Ein zu verschiebender Auftragsordner."""
+    src: Path
+    dst: Path
+    entries: Optional[List[str]]  # None = ganzer Ordner, sonst einzelne Einträge
+    rows: List[Tuple[int, str, str]]  # (auftrag_id, alter Pfad, neuer Pfad)
+
+
+def _ensure_tables(db_path: Path) -> None:
+    """Legt die Journal-Tabellen einmal pro Prozess an."""
+    key = str(db_path)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        conn = db._get_optimized_connection(db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_migration (
+                    src_dir TEXT PRIMARY KEY,
+                    dst_dir TEXT NOT NULL,
+                    entries TEXT,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_migration_rows (
+                    auftrag_id INTEGER PRIMARY KEY,
+                    src_dir TEXT NOT NULL,
+                    old_path TEXT NOT NULL,
+                    new_path TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    _ensure_tables(db_path)
+    return db._get_optimized_connection(db_path)
+
+
+def _same_path(a: Path, b: Path) -> bool:
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _is_within(path: Path, root: Path) -> bool:
+    path_key = os.path.normcase(os.path.abspath(path))
+    root_key = os.path.normcase(os.path.abspath(root))
+    return path_key.startswith(root_key + os.sep)
+
+
+def _list_names(directory: Path) -> List[str]:
+    try:
+        with os.scandir(directory) as it:
+            return sorted(entry.name for entry in it)
+    except FileNotFoundError:
+        return []
+
+
+# ============================================================
+# Plan
+# ============================================================
+
+def plan_migration(db_path: Path, archiv_root: Path, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Berechnet die nötigen Verschiebungen (ohne etwas zu ändern).
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        config: Konfigurationsdictionary (Struktur-Einstellungen)
+
+    Returns:
+        Dict mit moves (List[DirMove]), conflicts, skipped, mixed, unchanged
+    """
+    conn = db._get_optimized_connection(db_path)
+    try:
+        rows = conn.execute('SELECT id, auftrag_nr, datum, file_path FROM auftraege').fetchall()
+    finally:
+        conn.close()
+
+    groups: Dict[str, List[sqlite3.Row]] = defaultdict(list)
+    skipped = 0
+    for row in rows:
+        src = Path(row['file_path']).parent
+        if not _is_within(src, archiv_root) or _same_path(src, archiv_root):
+            skipped += 1
+            continue
+        groups[str(src)].append(row)
+
+    planned: List[Tuple[Path, Path, List[Tuple[int, str, str]]]] = []
+    by_target: Dict[str, List[int]] = defaultdict(list)
+    mixed = unchanged = 0
+    for src_key, group in groups.items():
+        src = Path(src_key)
+        targets = {}
+        for row in group:
+            try:
+                targets[row['id']] = archive.get_archive_dir_for_auftrag(
+                    archiv_root, row['auftrag_nr'], config, row['datum'], create=False)
+            except archive.ArchiveError as e:
+                logger.warning(f"Übersprungen: Auftrag {row['id']} ({e})")
+        if not targets:
+            skipped += len(group)
+            continue
+        newest = max((row for row in group if row['id'] in targets),
+                     key=lambda row: (row['datum'] or '', row['id']))
+        dst = targets[newest['id']]
+        if len({os.path.normcase(str(t)) for t in targets.values()}) > 1:
+            mixed += 1
+        if _same_path(src, dst):
+            unchanged += 1
+            continue
+        moved_rows = [(row['id'], row['file_path'], str(dst / Path(row['file_path']).name)) for row in group]
+        by_target[os.path.normcase(str(dst))].append(len(planned))
+        planned.append((src, dst, moved_rows))
+
+    moves: List[DirMove] = []
+    conflicts: List[str] = []
+    for indexes in by_target.values():
+        dst = planned[indexes[0]][1]
+        if len(indexes) == 1 and not dst.exists():
+            src, dst, moved_rows = planned[indexes[0]]
+            moves.append(DirMove(src, dst, None, moved_rows))
+            continue
+        # Zusammenführen: Einträge einzeln, ohne Namensgleichheit
+        taken = {os.path.normcase(name) for name in _list_names(dst)}
+        for index in indexes:
+            src, dst, moved_rows = planned[index]
+            names = _list_names(src)
+            clashes = [name for name in names if os.path.normcase(name) in taken]
+            if clashes:
+                conflicts.append(f"{src} -> {dst}: {', '.join(clashes[:3])}")
+                continue
+            taken.update(os.path.normcase(name) for name in names)
+            moves.append(DirMove(src, dst, names, moved_rows))
+
+    return {
+        'moves': moves,
+        'conflicts': conflicts,
+        'skipped': skipped,
+        'mixed': mixed,
+        'unchanged': unchanged
+    }
+
+
+def _save_plan(db_path: Path, moves: List[DirMove]) -> None:
+    """Ersetzt das Journal durch einen neuen Plan."""
+    now = datetime.now().isoformat()
+    conn = _connect(db_path)
+    try:
+        db._begin_write(conn)
+        conn.execute('DELETE FROM archive_migration')
+        conn.execute('DELETE FROM archive_migration_rows')
+        conn.executemany(
+            'INSERT INTO archive_migration (src_dir, dst_dir, entries, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+            [(str(m.src), str(m.dst), json.dumps(m.entries) if m.entries is not None else None,
+              STATUS_PENDING, now) for m in moves]
+        )
+        conn.executemany(
+            'INSERT INTO archive_migration_rows (auftrag_id, src_dir, old_path, new_path) VALUES (?, ?, ?, ?)',
+            [(auftrag_id, str(m.src), old, new) for m in moves for auftrag_id, old, new in m.rows]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _load_journal(db_path: Path, statuses: Tuple[str, ...]) -> List[DirMove]:
+    conn = _connect(db_path)
+    try:
+        marks = ','.join('?' * len(statuses))
+        moves = conn.execute(
+            f'SELECT src_dir, dst_dir, entries FROM archive_migration WHERE status IN ({marks})', statuses
+        ).fetchall()
+        rows = defaultdict(list)
+        for row in conn.execute('SELECT auftrag_id, src_dir, old_path, new_path FROM archive_migration_rows'):
+            rows[row['src_dir']].append((row['auftrag_id'], row['old_path'], row['new_path']))
+    finally:
+        conn.close()
+    return [
+        DirMove(Path(m['src_dir']), Path(m['dst_dir']),
+                json.loads(m['entries']) if m['entries'] is not None else None,
+                rows[m['src_dir']])
+        for m in moves
+    ]
+
+
+def _set_status(db_path: Path, results: List[Tuple[Path, Optional[str]]], ok_status: str) -> None:
+    now = datetime.now().isoformat()
+    conn = _connect(db_path)
+    try:
+        db._begin_write(conn)
+        conn.executemany(
+            'UPDATE archive_migration SET status = ?, error = ?, updated_at = ? WHERE src_dir = ?',
+            [(ok_status if error is None else STATUS_FAILED, error, now, str(src)) for src, error in results]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ============================================================
+# Verschieben
+# ============================================================
+
+def _rename(src: Path, dst: Path) -> None:
+    """Umbenennen; über Laufwerksgrenzen hinweg kopieren."""
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(src), str(dst))
+
+
+def _move_one(src: Path, dst: Path, entries: Optional[List[str]]) -> None:
+    """
+    Verschiebt einen Ordner (oder seine Einträge). Idempotent: bereits
+    verschobene Teile (Quelle weg, Ziel da) werden übersprungen.
+    """
+    if entries is None:
+        if not src.exists() and dst.exists():
+            return
+        if dst.exists():
+            raise ArchiveMigrationError(f"Zielordner existiert bereits: {dst}")
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        _rename(src, dst)
+        return
+
+    dst.mkdir(parents=True, exist_ok=True)
+    for name in entries:
+        source = src / name
+        target = dst / name
+        if not os.path.lexists(source):
+            if os.path.lexists(target):
+                continue
+            raise ArchiveMigrationError(f"Eintrag fehlt: {source}")
+        if os.path.lexists(target):
+            raise ArchiveMigrationError(f"Ziel existiert bereits: {target}")
+        _rename(source, target)
+    try:
+        src.rmdir()
+    except OSError:
+        pass
+
+
+def _run_moves(moves: List[DirMove], workers: int, reverse: bool = False) -> List[Tuple[Path, Optional[str]]]:
+    """
+    Führt Verschiebungen parallel aus (ein Task pro Zielordner, damit
+    Zusammenführungen in denselben Ordner nacheinander laufen).
+
+    Returns:
+        Liste (Quellordner, Fehler oder None)
+    """
+    tasks: Dict[str, List[DirMove]] = defaultdict(list)
+    for move in moves:
+        key = move.src if reverse else move.dst
+        tasks[os.path.normcase(str(key))].append(move)
+
+    def run(group: List[DirMove]) -> List[Tuple[Path, Optional[str]]]:
+        done = []
+        for move in group:
+            try:
+                if reverse:
+                    _move_one(move.dst, move.src, move.entries)
+                else:
+                    _move_one(move.src, move.dst, move.entries)
+                done.append((move.src, None))
+            except Exception as e:
+                logger.error(f"❌ {move.src} -> {move.dst}: {e}")
+                done.append((move.src, str(e)))
+        return done
+
+    results: List[Tuple[Path, Optional[str]]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run, group) for group in tasks.values()]
+        next_report = 500
+        for future in as_completed(futures):
+            results.extend(future.result())
+            if len(results) >= next_report:
+                logger.info(f"   {len(results)}/{len(moves)} Ordner verschoben")
+                next_report += 500
+    return results
+
+
+def _update_paths(db_path: Path, moves: List[DirMove], final_status: str, reverse: bool = False) -> int:
+    """Schreibt alle file_path in einer Transaktion um und schließt das Journal ab."""
+    now = datetime.now().isoformat()
+    updates = []
+    for move in moves:
+        for auftrag_id, old, new in move.rows:
+            updates.append((old, now, auftrag_id, new) if reverse else (new, now, auftrag_id, old))
+
+    conn = _connect(db_path)
+    try:
+        db._begin_write(conn)
+        before = conn.total_changes
+        conn.executemany(
+            'UPDATE auftraege SET file_path = ?, updated_at = ? WHERE id = ? AND file_path = ?', updates
+        )
+        changed = conn.total_changes - before
+        conn.executemany(
+            'UPDATE archive_migration SET status = ?, error = NULL, updated_at = ? WHERE src_dir = ?',
+            [(final_status, now, str(move.src)) for move in moves]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    query_cache.invalidate(db_path)
+    return changed
+
+
+def _remove_empty_parents(directories: List[Path], archiv_root: Path) -> None:
+    """Entfernt leer gewordene Gruppierungsordner (z.B. alte Tausender-Blöcke)."""
+    for directory in sorted({d.parent for d in directories}, key=lambda p: len(p.parts), reverse=True):
+        while _is_within(directory, archiv_root):
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+
+def _finish(db_path: Path, archiv_root: Path, moves: List[DirMove], results: List[Tuple[Path, Optional[str]]],
+            final_status: str, reverse: bool) -> Dict[str, Any]:
+    failed = {os.path.normcase(str(src)) for src, error in results if error}
+    succeeded = [m for m in moves if os.path.normcase(str(m.src)) not in failed]
+    # Verschobene Ordner vor dem DB-Update markieren (Fortsetzen nach Abbruch)
+    _set_status(db_path, results, STATUS_MOVED)
+
+    db_start = time.perf_counter()
+    changed = _update_paths(db_path, succeeded, final_status, reverse)
+    db_seconds = time.perf_counter() - db_start
+    _remove_empty_parents([m.dst if reverse else m.src for m in succeeded], archiv_root)
+    return {'moved': len(succeeded), 'failed': len(failed), 'rows_updated': changed, 'db_seconds': db_seconds}
+
+
+def migrate(
+    db_path: Path,
+    archiv_root: Path,
+    config: Dict[str, Any],
+    workers: int = DEFAULT_WORKERS,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Stellt das Archiv auf die konfigurierte Struktur um.
+
+    Gibt es eine nicht abgeschlossene Migration, wird sie fortgesetzt statt
+    neu geplant.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        config: Konfigurationsdictionary
+        workers: Parallele Verschiebungen
+        dry_run: Nur planen und berichten
+
+    Returns:
+        Bericht (moved, failed, rows_updated, conflicts, ...)
+
+    Raises:
+        ArchiveMigrationError: Wenn das Archiv nicht existiert
+    """
+    if not archiv_root.exists():
+        raise ArchiveMigrationError(f"Archiv nicht gefunden: {archiv_root}")
+    start = time.perf_counter()
+
+    pending = _load_journal(db_path, _OPEN_STATUSES)
+    if pending:
+        logger.info(f"🔁 Setze offene Migration fort ({len(pending)} Ordner)")
+        report: Dict[str, Any] = {'resumed': True, 'conflicts': []}
+        moves = pending
+    else:
+        plan = plan_migration(db_path, archiv_root, config)
+        moves = plan['moves']
+        report = {k: v for k, v in plan.items() if k != 'moves'}
+        report['resumed'] = False
+        logger.info(f"📋 Plan: {len(moves)} Ordner verschieben, {plan['unchanged']} unverändert, "
+                    f"{len(plan['conflicts'])} Konflikte, {plan['mixed']} mit gemischten Zielen")
+        for conflict in plan['conflicts']:
+            logger.warning(f"⚠️  Namenskonflikt: {conflict}")
+
+    report['planned'] = len(moves)
+    if dry_run or not moves:
+        for move in moves[:20]:
+            logger.info(f"   {move.src} -> {move.dst}{' (zusammenführen)' if move.entries is not None else ''}")
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    if not pending:
+        _save_plan(db_path, moves)
+
+    results = _run_moves(moves, workers)
+    report.update(_finish(db_path, archiv_root, moves, results, STATUS_DONE, reverse=False))
+    report['seconds'] = time.perf_counter() - start
+    logger.info(f"✓ Migration: {report['moved']} Ordner verschoben, {report['rows_updated']} Pfade "
+                f"aktualisiert ({report['db_seconds']:.2f}s DB), {report['failed']} Fehler, "
+                f"{report['seconds']:.1f}s")
+    if report['failed']:
+        logger.warning("⚠️  Fehlgeschlagene Ordner bleiben offen - erneuter Aufruf setzt fort")
+    return report
+
+
+def rollback(db_path: Path, archiv_root: Path, workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """
+    Macht die letzte Migration rückgängig (Ordner zurück, file_path zurück).
+
+    Auch offene und fehlgeschlagene Ordner werden zurückgenommen: Bei einer
+    abgebrochenen Zusammenführung liegt ein Teil der Einträge schon im Ziel.
+    _move_one überspringt, was bereits an der Quelle liegt.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        workers: Parallele Verschiebungen
+
+    Returns:
+        Bericht (moved, failed, rows_updated)
+    """
+    start = time.perf_counter()
+    moves = _load_journal(db_path, (STATUS_DONE,) + _OPEN_STATUSES)
+    if not moves:
+        logger.info("Keine Migration zum Zurücknehmen gefunden")
+        return {'moved': 0, 'failed': 0, 'rows_updated': 0}
+
+    logger.info(f"↩️  Nehme Migration zurück ({len(moves)} Ordner)")
+    results = _run_moves(moves, workers, reverse=True)
+    report = _finish(db_path, archiv_root, moves, results, STATUS_ROLLED_BACK, reverse=True)
+    report['seconds'] = time.perf_counter() - start
+    logger.info(f"✓ Rollback: {report['moved']} Ordner zurück, {report['rows_updated']} Pfade, "
+                f"{report['failed']} Fehler")
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Archiv auf die konfigurierte Ordnerstruktur umstellen')
+    arg_parser.add_argument('--dry-run', action='store_true', help='Nur Plan anzeigen')
+    arg_parser.add_argument('--rollback', action='store_true', help='Letzte Migration rückgängig machen')
+    arg_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parallele Verschiebungen')
+    arg_parser.add_argument('--config', help='Pfad zur Konfigurationsdatei')
+    args = arg_parser.parse_args()
+
+    cfg = Config(Path(args.config)) if args.config else Config()
+    try:
+        if args.rollback:
+            result = rollback(cfg.get_db_path(), cfg.get_archiv_root(), args.workers)
+        else:
+            result = migrate(cfg.get_db_path(), cfg.get_archiv_root(), cfg.config, args.workers, args.dry_run)
+    except (ArchiveMigrationError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    sys.exit(1 if result.get('failed') else 0)
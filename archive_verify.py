@@ -0,0 +1,374 @@
+"""
+Integritätsprüfung des Archivs.
+
+Vergleicht die Dateien im Archiv mit der Datenbank:
+- fehlend:     Auftrag in der Datenbank, Datei (file_path) existiert nicht
+- verwaist:    PDF in einem Archivordner, zu dem kein Auftrag gehört
+- beschädigt:  SHA256 der Datei weicht vom gespeicherten Hash ab
+               (auftraege.hash bzw. der beim Archivieren im Manifest
+               eingetragene Hash für Anhang-/Daten-PDFs)
+
+Die Dateiliste kommt aus dem Archiv-Manifest (archive_manifest.py). Gehasht
+wird in einem begrenzten Thread-Pool - über SMB ist das I/O-gebunden, mehrere
+Lesevorgänge gleichzeitig verdecken die Netzwerk-Latenz. Dateien, deren
+Größe und Änderungszeit seit der letzten erfolgreichen Prüfung gleich sind,
+werden übersprungen (`full=True` prüft alles). Mit `max_mb_per_second`
+lässt sich die Leserate begrenzen, damit die Prüfung auch tagsüber laufen
+kann.
+
+Verwendung:
+    python3 archive_verify.py
+    python3 archive_verify.py --workers 8 --max-mb-s 20
+    python3 archive_verify.py --full --json bericht.json
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+import archive_manifest
+import db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WORKERS = 4
+CHUNK_SIZE = 1024 * 1024
+
+STATUS_OK = 'ok'
+STATUS_CORRUPT = 'corrupt'
+STATUS_BASELINE = 'baseline'  # Kein gespeicherter Hash, aktueller Hash übernommen
+
+VERIFIED_FILES = metrics.REGISTRY.counter(
+    'werkstatt_verify_files_total',
+    'Bei der Integritätsprüfung gehashte Archivdateien nach Ergebnis',
+    ('result',)
+)
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+class ArchiveVerifyError(Exception):
+    """Fehler bei der Integritätsprüfung."""
+    pass
+
+
+def _ensure_table(db_path: Path) -> None:
+    """Legt die Tabelle mit den Prüfergebnissen einmal pro Prozess an."""
+    key = str(db_path)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        conn = db._get_optimized_connection(db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive_verification (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    expected_hash TEXT,
+                    actual_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    verified_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+class _Throttle:
+    """Begrenzt die gemeinsame Leserate aller Threads (Bytes pro Sekunde)."""
+
+    def __init__(self, max_mb_per_second: float):
+        self.rate = max_mb_per_second * 1024 * 1024 if max_mb_per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int) -> None:
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + nbytes / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+def _hash_file(path: str, throttle: _Throttle) -> Tuple[str, int]:
+    """SHA256 und gelesene Bytes einer Datei."""
+    sha256 = hashlib.sha256()
+    total = 0
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(CHUNK_SIZE)
+            if not block:
+                break
+            throttle.consume(len(block))
+            sha256.update(block)
+            total += len(block)
+    return sha256.hexdigest(), total
+
+
+def _load_auftraege(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    try:
+        return conn.execute('SELECT id, auftrag_nr, file_path, hash FROM auftraege').fetchall()
+    except sqlite3.OperationalError:
+        # auftraege-Tabelle existiert noch nicht
+        return []
+
+
+def verify_archive(
+    db_path: Path,
+    archiv_root: Path,
+    workers: int = DEFAULT_WORKERS,
+    max_mb_per_second: float = 0.0,
+    full: bool = False,
+    refresh_manifest: bool = True,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Prüft das Archiv gegen die Datenbank.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        workers: Gleichzeitig gehashte Dateien
+        max_mb_per_second: Obergrenze für die Leserate (0 = unbegrenzt)
+        full: Auch unveränderte, bereits geprüfte Dateien hashen
+        refresh_manifest: Manifest vorher abgleichen (inkrementell)
+        on_progress: Erhält (erledigt, gesamt) nach jeder gehashten Datei
+
+    Returns:
+        Bericht mit missing, orphaned, corrupted (Listen), checked, skipped,
+        baseline, errors, bytes, seconds
+
+    Raises:
+        ArchiveVerifyError: Wenn Archiv oder Datenbank nicht erreichbar sind
+    """
+    start = time.perf_counter()
+    db_path = Path(db_path)
+    if not db_path.exists():
+        raise ArchiveVerifyError(f"Datenbank nicht gefunden: {db_path}")
+    if refresh_manifest:
+        try:
+            archive_manifest.reconcile(db_path, archiv_root)
+        except archive_manifest.ArchiveManifestError as e:
+            raise ArchiveVerifyError(str(e))
+    _ensure_table(db_path)
+
+    conn = db._get_optimized_connection(db_path)
+    try:
+        auftraege = _load_auftraege(conn)
+        manifest = {row['path']: row for row in conn.execute(
+            "SELECT path, dir, size, mtime_ns, hash FROM archive_manifest WHERE lower(name) LIKE '%.pdf'")}
+        previous = {row['path']: row for row in conn.execute(
+            'SELECT path, size, mtime_ns, expected_hash, status FROM archive_verification')}
+    finally:
+        conn.close()
+
+    report: Dict[str, Any] = {
+        'missing': [], 'orphaned': [], 'corrupted': [],
+        'checked': 0, 'skipped': 0, 'baseline': 0, 'errors': [], 'bytes': 0
+    }
+
+    # Erwarteter Hash pro Datei: Auftrag-PDFs aus der Datenbank, sonst Manifest
+    expected: Dict[str, Optional[str]] = {path: row['hash'] for path, row in manifest.items()}
+    order_dirs = set()
+    for row in auftraege:
+        path = row['file_path']
+        if not path:
+            continue
+        order_dirs.add(str(Path(path).parent))
+        if path not in manifest and not os.path.exists(path):
+            report['missing'].append({'auftrag_id': row['id'], 'auftrag_nr': row['auftrag_nr'], 'path': path})
+            continue
+        if row['hash']:
+            expected[path] = row['hash']
+
+    # Verwaist: PDFs in Ordnern ohne Auftrag
+    report['orphaned'] = sorted(path for path, row in manifest.items() if row['dir'] not in order_dirs)
+
+    # Zu hashende Dateien (unveränderte, bereits geprüfte überspringen).
+    # Verglichen wird mit dem aktuellen stat der Datei, nicht mit dem
+    # Manifest: der inkrementelle Abgleich übersieht an Ort und Stelle
+    # überschriebene Dateien (Ordner-mtime bleibt gleich).
+    todo: List[Tuple[str, Optional[str]]] = []
+    stale: List[str] = []
+    for path, row in manifest.items():
+        if row['dir'] not in order_dirs:
+            continue
+        prev = previous.get(path)
+        expected_hash = expected.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Lesefehler meldet die Prüfung selbst
+            todo.append((path, expected_hash))
+            continue
+        changed_unnoticed = (st.st_size, st.st_mtime_ns) != (row['size'], row['mtime_ns'])
+        if changed_unnoticed:
+            stale.append(path)
+        if expected_hash is None and prev is not None and (changed_unnoticed or prev['status'] == STATUS_CORRUPT):
+            # Manifest kennt den alten Inhalt nicht mehr: Stand der letzten Prüfung gilt
+            expected_hash = prev['expected_hash']
+        if (not full and prev is not None and prev['status'] != STATUS_CORRUPT
+                and prev['size'] == st.st_size and prev['mtime_ns'] == st.st_mtime_ns
+                and prev['expected_hash'] == expected_hash):
+            report['skipped'] += 1
+            continue
+        todo.append((path, expected_hash))
+
+    if stale:
+        # Größe/Zeit nachtragen; der alte Hash gilt damit nicht mehr
+        logger.warning(f"⚠️  {len(stale)} Dateien seit dem letzten Abgleich an Ort und Stelle geändert")
+        archive_manifest.record_files(db_path, [Path(path) for path in stale])
+
+    logger.info(f"🔍 Integritätsprüfung: {len(todo)} Dateien zu prüfen, {report['skipped']} unverändert, "
+                f"{len(report['missing'])} fehlend, {len(report['orphaned'])} verwaist")
+
+    throttle = _Throttle(max_mb_per_second)
+    results: List[tuple] = []
+    manifest_hashes: List[tuple] = []
+
+    def check(path: str, expected_hash: Optional[str]) -> Tuple[str, Optional[str], str, int, int, int]:
+        st = os.stat(path)
+        actual, nbytes = _hash_file(path, throttle)
+        return path, expected_hash, actual, nbytes, st.st_size, st.st_mtime_ns
+
+    workers = max(1, int(workers))
+    window = workers * 4  # Begrenzte Anzahl offener Aufträge statt einer Future pro Datei
+    done_count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as executor:
+        pending: Dict[Any, str] = {}
+        items = iter(todo)
+        while True:
+            for path, expected_hash in items:
+                pending[executor.submit(check, path, expected_hash)] = path
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done_count += 1
+                failed_path = pending.pop(future)
+                try:
+                    path, expected_hash, actual, nbytes, size, mtime_ns = future.result()
+                except OSError as e:
+                    report['errors'].append({'path': failed_path, 'error': str(e)})
+                    VERIFIED_FILES.inc(result='error')
+                    continue
+                report['checked'] += 1
+                report['bytes'] += nbytes
+                if expected_hash is None:
+                    status = STATUS_BASELINE
+                    report['baseline'] += 1
+                    manifest_hashes.append((actual, path, size, mtime_ns))
+                elif actual == expected_hash:
+                    status = STATUS_OK
+                else:
+                    status = STATUS_CORRUPT
+                    report['corrupted'].append({'path': path, 'expected': expected_hash, 'actual': actual})
+                    logger.error(f"❌ Hash weicht ab: {path}")
+                VERIFIED_FILES.inc(result=status)
+                # Nach der Übernahme gilt der aktuelle Hash als erwarteter Hash
+                results.append((path, size, mtime_ns, expected_hash or actual, actual, status,
+                                datetime.now().isoformat()))
+                if on_progress:
+                    on_progress(done_count, len(todo))
+            if len(results) >= 500:
+                _store_results(db_path, results, manifest_hashes)
+                results, manifest_hashes = [], []
+
+    _store_results(db_path, results, manifest_hashes)
+
+    report['seconds'] = round(time.perf_counter() - start, 2)
+    mb = report['bytes'] / (1024 * 1024)
+    report['mb_per_second'] = round(mb / report['seconds'], 1) if report['seconds'] else 0.0
+    logger.info(f"✓ Integritätsprüfung: {report['checked']} geprüft ({mb:.0f} MB, "
+                f"{report['mb_per_second']} MB/s), {report['skipped']} übersprungen, "
+                f"{len(report['corrupted'])} beschädigt, {len(report['missing'])} fehlend, "
+                f"{len(report['orphaned'])} verwaist, {len(report['errors'])} Lesefehler")
+    return report
+
+
+def _store_results(db_path: Path, results: List[tuple], manifest_hashes: List[tuple]) -> None:
+    """Speichert Prüfergebnisse und übernimmt neu berechnete Hashes ins Manifest."""
+    if not results:
+        return
+    conn = db._get_optimized_connection(db_path)
+    try:
+        db._begin_write(conn)
+        conn.executemany('''
+            INSERT OR REPLACE INTO archive_verification
+                (path, size, mtime_ns, expected_hash, actual_hash, status, verified_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', results)
+        # Nur übernehmen, wenn die Datei seit dem Hashen unverändert ist
+        conn.executemany('''
+            UPDATE archive_manifest SET hash = ? WHERE path = ? AND size = ? AND mtime_ns = ?
+        ''', manifest_hashes)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def has_problems(report: Dict[str, Any]) -> bool:
+    """True, wenn fehlende, beschädigte oder unlesbare Dateien gefunden wurden."""
+    return bool(report['missing'] or report['corrupted'] or report['errors'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Integritätsprüfung des Archivs')
+    arg_parser.add_argument('--config', help='Pfad zur Konfigurationsdatei')
+    arg_parser.add_argument('--workers', '-w', type=int, help='Gleichzeitig gehashte Dateien')
+    arg_parser.add_argument('--max-mb-s', type=float, help='Leserate begrenzen (MB/s, 0 = unbegrenzt)')
+    arg_parser.add_argument('--full', action='store_true', help='Auch unveränderte Dateien prüfen')
+    arg_parser.add_argument('--json', metavar='DATEI', help='Bericht als JSON speichern')
+    args = arg_parser.parse_args()
+
+    cfg = Config(Path(args.config)) if args.config else Config()
+    try:
+        result = verify_archive(
+            cfg.get_db_path(),
+            cfg.get_archiv_root(),
+            workers=args.workers or cfg.get('verify_workers', DEFAULT_WORKERS),
+            max_mb_per_second=args.max_mb_s if args.max_mb_s is not None else cfg.get('verify_max_mb_per_second', 0),
+            full=args.full
+        )
+    except ArchiveVerifyError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    for item in result['missing']:
+        print(f"❌ Fehlt: {item['path']} (Auftrag {item['auftrag_nr']}, ID {item['auftrag_id']})")
+    for item in result['corrupted']:
+        print(f"❌ Beschädigt: {item['path']}")
+    for item in result['errors']:
+        print(f"⚠️  Nicht lesbar: {item['path']} ({item['error']})")
+    for path in result['orphaned']:
+        print(f"⚠️  Verwaist: {path}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"✓ Bericht gespeichert: {args.json}")
+    sys.exit(1 if has_problems(result) else 0)
@@ -3,29 +3,155 @@ Backup-Funktionen für Datenbank und Archiv.
 
 Dieses Modul erstellt ZIP-Backups von Datenbank, Konfiguration und optional
 dem kompletten Archiv.
+
+Die Datenbank wird nicht als Datei kopiert (im WAL-Modus fehlten sonst die
+Änderungen aus `werkstatt.db-wal`, und eine Kopie während eines Schreibvorgangs
+kann inkonsistent sein), sondern per SQLite-Backup-API in einen lokalen
+Snapshot geschrieben - in Schritten zu `SNAPSHOT_PAGES_PER_STEP` Seiten, damit
+Schreiber zwischendurch zum Zug kommen. Gezippt wird der Snapshot.
+
+Das Archiv wird inkrementell gesichert: Jedes Backup mit Archiv enthält ein
+Manifest (`backup/archive_manifest.json`) aller Archivdateien mit Größe,
+Änderungszeit, SHA256 und dem ZIP, in dem die Datei liegt. Gespeichert werden
+nur neue und geänderte Dateien; unveränderte (und verschobene Dateien mit
+bekanntem Hash) verweisen auf ein früheres ZIP. PDFs werden unkomprimiert
+abgelegt (ZIP_STORED). `restore_backup` stellt mit dem Manifest eines
+beliebigen Backups genau diesen Stand wieder her.
+
+Verwendung:
+    python3 backup.py list <backup-ordner>
+    python3 backup.py restore <werkstatt_backup_....zip> <zielordner>
 """
 
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
 import zipfile
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 import logging
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
 
+# Seiten pro Backup-Schritt (4 KB je Seite) und Pause zwischen den Schritten
+SNAPSHOT_PAGES_PER_STEP = 1024
+SNAPSHOT_STEP_SLEEP = 0.005
+# Startet der Snapshot wegen laufender Schreibzugriffe öfter neu, wird der
+# Rest in einem Schritt kopiert (im WAL-Modus blockiert das keine Schreiber)
+SNAPSHOT_MAX_RESTARTS = 3
+# Schnelle Kompression für den stündlichen Datenbank-Snapshot
+DB_COMPRESSLEVEL = 1
+
+BACKUP_PATTERN = "werkstatt_backup_*.zip"
+MANIFEST_ARCNAME = "backup/archive_manifest.json"
+INFO_ARCNAME = "backup/backup_info.json"
+# Bereits komprimierte Formate werden ohne Deflate abgelegt
+STORED_SUFFIXES = {'.pdf', '.jpg', '.jpeg', '.png', '.zip', '.gz'}
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
 class BackupError(Exception):
     """Fehler bei der Backup-Erstellung."""
     pass
 
 
+class SnapshotResult(NamedTuple):
+    """Ergebnis eines Datenbank-Snapshots."""
+    path: Path
+    pages: int
+    steps: int
+    restarts: int
+    seconds: float
+
+
+class _SnapshotRestarted(Exception):
+    pass
+
+
+def snapshot_database(
+    db_path: Path,
+    target_path: Path,
+    pages_per_step: int = SNAPSHOT_PAGES_PER_STEP,
+    step_sleep: float = SNAPSHOT_STEP_SLEEP
+) -> SnapshotResult:
+    """
+    Erstellt eine konsistente Kopie der laufenden Datenbank.
+
+    Nutzt sqlite3.Connection.backup: Zwischen den Schritten wird der Lesezugriff
+    freigegeben. Ändert ein anderer Prozess die Datenbank währenddessen,
+    beginnt SQLite von vorn; nach SNAPSHOT_MAX_RESTARTS Neustarts wird der
+    Rest in einem Schritt kopiert.
+
+    Args:
+        db_path: Quelldatenbank (darf gleichzeitig beschrieben werden)
+        target_path: Zieldatei (wird überschrieben)
+        pages_per_step: Seiten pro Schritt
+        step_sleep: Pause zwischen den Schritten in Sekunden
+
+    Returns:
+        SnapshotResult mit Seitenzahl, Schritten, Neustarts und Dauer
+
+    Raises:
+        BackupError: Wenn der Snapshot nicht erstellt werden kann
+    """
+    start = time.perf_counter()
+    stats = {'steps': 0, 'restarts': 0, 'pages': 0}
+
+    def copy(pages: int) -> None:
+        last_remaining = [None]
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            stats['steps'] += 1
+            stats['pages'] = total
+            if last_remaining[0] is not None and remaining > last_remaining[0]:
+                stats['restarts'] += 1
+                if pages > 0 and stats['restarts'] >= SNAPSHOT_MAX_RESTARTS:
+                    raise _SnapshotRestarted()
+            last_remaining[0] = remaining
+
+        target_path.unlink(missing_ok=True)
+        dest = sqlite3.connect(target_path)
+        try:
+            source.backup(dest, pages=pages, progress=progress, sleep=step_sleep)
+            # Snapshot ohne WAL-Kennung, damit die Datei allein vollständig ist
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+
+    try:
+        source = sqlite3.connect(db_path, timeout=30.0)
+        try:
+            try:
+                copy(pages_per_step)
+            except _SnapshotRestarted:
+                logger.info(f"  Snapshot: {stats['restarts']} Neustarts durch Schreibzugriffe, kopiere Rest in einem Schritt")
+                copy(-1)
+        finally:
+            source.close()
+    except (sqlite3.Error, OSError) as e:
+        metrics.STAGE_ERRORS.inc(stage="backup_snapshot")
+        raise BackupError(f"Datenbank-Snapshot fehlgeschlagen: {e}")
+
+    seconds = time.perf_counter() - start
+    metrics.STAGE_SECONDS.observe(seconds, stage="backup_snapshot")
+    return SnapshotResult(target_path, stats['pages'], stats['steps'], stats['restarts'], seconds)
+
+
 def create_backup(
     archiv_root: Path,
     db_path: Path,
     config_path: Path,
     backup_target_dir: Path,
-    include_archive: bool = False
+    include_archive: bool = False,
+    full_archive: bool = False
 ) -> Path:
     """
     Erstellt ein ZIP-Backup.
@@ -35,7 +161,8 @@ def create_backup(
         db_path: Pfad zur Datenbank
         config_path: Pfad zur Konfigurationsdatei
         backup_target_dir: Zielverzeichnis für Backups
-        include_archive: Ob das komplette Archiv gesichert werden soll
+        include_archive: Ob das Archiv gesichert werden soll (inkrementell)
+        full_archive: Alle Archivdateien neu speichern (neue Kette beginnen)
     
     Returns:
         Pfad zum erstellten Backup
@@ -43,6 +170,7 @@ def create_backup(
     Raises:
         BackupError: Bei Fehlern bei der Backup-Erstellung
     """
+    backup_start = time.perf_counter()
     try:
         # Backup-Verzeichnis erstellen
         backup_target_dir.mkdir(parents=True, exist_ok=True)
@@ -54,11 +182,17 @@ def create_backup(
         
         logger.info(f"Erstelle Backup: {backup_path}")
         
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Datenbank hinzufügen
+        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf, \
+                tempfile.TemporaryDirectory(prefix="werkstatt_snapshot_") as snapshot_dir:
+            # Datenbank hinzufügen (konsistenter Snapshot statt Dateikopie)
             if db_path.exists():
-                zipf.write(db_path, arcname=f"backup/{db_path.name}")
-                logger.info(f"  + Datenbank: {db_path.name}")
+                snapshot = snapshot_database(db_path, Path(snapshot_dir) / db_path.name)
+                zip_start = time.perf_counter()
+                zipf.write(snapshot.path, arcname=f"backup/{db_path.name}", compresslevel=DB_COMPRESSLEVEL)
+                zip_seconds = time.perf_counter() - zip_start
+                logger.info(f"  + Datenbank: {db_path.name} (Snapshot {snapshot.pages} Seiten in "
+                            f"{snapshot.seconds:.2f}s, {snapshot.steps} Schritte, {snapshot.restarts} Neustarts; "
+                            f"ZIP {zip_seconds:.2f}s)")
             else:
                 logger.warning("Datenbank nicht gefunden, überspringe")
             
@@ -75,30 +209,24 @@ def create_backup(
                 zipf.write(kunden_index, arcname="backup/kunden_index.csv")
                 logger.info("  + Kunden-Index")
             
-            # Optional: Komplettes Archiv hinzufügen
+            # Optional: Archiv hinzufügen (inkrementell gegenüber dem letzten Backup)
             if include_archive:
-                logger.info("  + Archiv (kann lange dauern)...")
-                
                 if not archiv_root.exists():
                     logger.warning(f"Archivordner nicht gefunden: {archiv_root}")
+                    info = {'type': 'db'}
                 else:
-                    # Alle Dateien im Archiv durchgehen
-                    file_count = 0
-                    for file_path in archiv_root.rglob('*'):
-                        if file_path.is_file():
-                            # Relativen Pfad berechnen
-                            rel_path = file_path.relative_to(archiv_root.parent)
-                            zipf.write(file_path, arcname=f"backup/{rel_path}")
-                            file_count += 1
-                            
-                            if file_count % 100 == 0:
-                                logger.info(f"    {file_count} Dateien gesichert...")
-                    
-                    logger.info(f"  + {file_count} Archiv-Dateien gesichert")
+                    info = _backup_archive(zipf, backup_path, archiv_root, db_path, full_archive)
+            else:
+                info = {'type': 'db'}
+            
+            info['created_at'] = datetime.now().isoformat()
+            info['seconds'] = round(time.perf_counter() - backup_start, 1)
+            zipf.writestr(INFO_ARCNAME, json.dumps(info, ensure_ascii=False, indent=1))
         
         # Backup-Größe loggen
         backup_size_mb = backup_path.stat().st_size / (1024 * 1024)
-        logger.info(f"Backup erfolgreich erstellt: {backup_path} ({backup_size_mb:.2f} MB)")
+        logger.info(f"Backup erfolgreich erstellt: {backup_path} ({backup_size_mb:.2f} MB, "
+                    f"{time.perf_counter() - backup_start:.1f}s)")
         
         return backup_path
         
@@ -106,6 +234,240 @@ def create_backup(
         raise BackupError(f"Fehler beim Erstellen des Backups: {e}")
 
 
+# ============================================================
+# Inkrementelles Archiv-Backup
+# ============================================================
+
+def _read_json(zipf: zipfile.ZipFile, arcname: str) -> Optional[Dict[str, Any]]:
+    try:
+        with zipf.open(arcname) as f:
+            return json.load(f)
+    except KeyError:
+        return None
+
+
+def read_backup_info(backup_zip: Path) -> Optional[Dict[str, Any]]:
+    """Kurzinfo eines Backups (Typ, Basis, gespeicherte/gelöschte Dateien) oder None."""
+    try:
+        with zipfile.ZipFile(backup_zip) as zipf:
+            return _read_json(zipf, INFO_ARCNAME)
+    except (zipfile.BadZipFile, OSError, ValueError) as e:
+        logger.warning(f"Backup nicht lesbar: {backup_zip.name} ({e})")
+        return None
+
+
+def _previous_manifest(backup_target_dir: Path, exclude: Path) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Manifest des neuesten Backups mit Archiv (Name, Manifest)."""
+    backups = sorted(backup_target_dir.glob(BACKUP_PATTERN), key=lambda p: p.stat().st_mtime, reverse=True)
+    for candidate in backups:
+        if candidate == exclude:
+            continue
+        try:
+            with zipfile.ZipFile(candidate) as zipf:
+                manifest = _read_json(zipf, MANIFEST_ARCNAME)
+        except (zipfile.BadZipFile, OSError, ValueError) as e:
+            logger.warning(f"Backup nicht lesbar: {candidate.name} ({e})")
+            continue
+        if manifest is not None:
+            return candidate.name, manifest
+    return None, {}
+
+
+def _store_file(zipf: zipfile.ZipFile, path: Path, arcname: str) -> Tuple[str, int, int]:
+    """
+    Schreibt eine Datei ins ZIP und hasht sie dabei (ein Lesedurchgang).
+
+    Returns:
+        (SHA256, Größe, mtime_ns) zum Zeitpunkt des Lesens
+    """
+    stat = path.stat()
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = zipfile.ZIP_STORED if path.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as src, zipf.open(zinfo, 'w', force_zip64=stat.st_size >= 2 ** 31) as dst:
+        for block in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+            sha256.update(block)
+            dst.write(block)
+    return sha256.hexdigest(), stat.st_size, stat.st_mtime_ns
+
+
+def _backup_archive(
+    zipf: zipfile.ZipFile,
+    backup_path: Path,
+    archiv_root: Path,
+    db_path: Path,
+    full: bool
+) -> Dict[str, Any]:
+    """
+    Sichert neue/geänderte Archivdateien und schreibt das Manifest.
+
+    Returns:
+        Info für backup_info.json (type, base, stored, referenced, deleted, references)
+    """
+    import archive_manifest
+
+    archive_manifest.reconcile(db_path, archiv_root, full=full)
+    base_name, previous = (None, {}) if full else _previous_manifest(backup_path.parent, backup_path)
+    previous_files: Dict[str, List] = previous.get('files', {})
+    available = {p.name for p in backup_path.parent.glob(BACKUP_PATTERN)} - {backup_path.name}
+    by_hash = {entry[2]: entry for entry in previous_files.values() if entry[2] and entry[3] in available}
+    # Verschobene Ordner (z.B. archive_migrate.py): Name, Größe und Änderungszeit bleiben gleich
+    by_identity = {(rel.rsplit('/', 1)[-1], entry[0], entry[1]): entry
+                   for rel, entry in previous_files.items() if entry[3] in available}
+
+    logger.info(f"  + Archiv ({'vollständig' if base_name is None else f'inkrementell zu {base_name}'})...")
+    files: Dict[str, List] = {}
+    stored = referenced = stored_bytes = 0
+    new_hashes: Dict[Path, str] = {}
+    for path, size, mtime_ns, known_hash in archive_manifest.list_files(db_path):
+        rel = Path(os.path.relpath(path, archiv_root)).as_posix()
+        if rel.startswith('../'):
+            continue
+        # Frisch prüfen: Der inkrementelle Abgleich übersieht an Ort und Stelle
+        # überschriebene Dateien, ein Backup darf das nicht
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            size, mtime_ns, known_hash = stat.st_size, stat.st_mtime_ns, None
+        old = previous_files.get(rel)
+        if old and old[0] == size and old[1] == mtime_ns and old[3] in available:
+            files[rel] = old
+            referenced += 1
+            continue
+        # Verschoben/umbenannt oder dedupliziert: Inhalt liegt schon in einem Backup
+        ref = by_hash.get(known_hash) if known_hash else by_identity.get((rel.rsplit('/', 1)[-1], size, mtime_ns))
+        if ref and ref[0] == size:
+            files[rel] = [size, mtime_ns, ref[2], ref[3], ref[4]]
+            referenced += 1
+            continue
+
+        arcname = f"backup/{archiv_root.name}/{rel}"
+        try:
+            file_hash, size, mtime_ns = _store_file(zipf, Path(path), arcname)
+        except FileNotFoundError:
+            continue
+        files[rel] = [size, mtime_ns, file_hash, backup_path.name, arcname]
+        by_hash.setdefault(file_hash, files[rel])
+        if not known_hash:
+            new_hashes[Path(path)] = file_hash
+        stored += 1
+        stored_bytes += size
+        if stored % 100 == 0:
+            logger.info(f"    {stored} Dateien gesichert...")
+
+    deleted = sorted(set(previous_files) - set(files))
+    manifest = {
+        'version': 1,
+        'archiv_root': archiv_root.name,
+        'created_at': datetime.now().isoformat(),
+        'files': files
+    }
+    zipf.writestr(MANIFEST_ARCNAME, json.dumps(manifest, ensure_ascii=False, separators=(',', ':')))
+    if new_hashes:
+        archive_manifest.record_files(db_path, list(new_hashes), hashes=new_hashes)
+
+    logger.info(f"  + Archiv: {stored} Dateien gespeichert ({stored_bytes / 1024 / 1024:.1f} MB), "
+                f"{referenced} unverändert, {len(deleted)} gelöscht")
+    return {
+        'type': 'full' if base_name is None else 'incremental',
+        'base': base_name,
+        'stored': stored,
+        'stored_bytes': stored_bytes,
+        'referenced': referenced,
+        'deleted': deleted,
+        'references': sorted({entry[3] for entry in files.values()} - {backup_path.name})
+    }
+
+
+def _extract(zipf: zipfile.ZipFile, arcname: str, target: Path) -> str:
+    """Entpackt einen Eintrag (atomar) und gibt seinen SHA256 zurück."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.restore")
+    sha256 = hashlib.sha256()
+    with zipf.open(arcname) as src, open(tmp_path, 'wb') as dst:
+        for block in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+            sha256.update(block)
+            dst.write(block)
+    os.replace(tmp_path, target)
+    return sha256.hexdigest()
+
+
+def restore_backup(backup_zip: Path, target_dir: Path) -> Dict[str, int]:
+    """
+    Stellt den Stand eines Backups wieder her.
+
+    Datenbank, Konfiguration und Kunden-Index kommen aus dem gewählten ZIP,
+    die Archivdateien laut dessen Manifest aus dem jeweiligen ZIP der Kette
+    (müssen im selben Ordner liegen). Hashes und Änderungszeiten werden
+    geprüft bzw. wiederhergestellt.
+
+    Args:
+        backup_zip: Backup, dessen Stand wiederhergestellt werden soll
+        target_dir: Zielordner (Archiv landet in target_dir/<Archivname>)
+
+    Returns:
+        Statistik (files, bytes, errors)
+
+    Raises:
+        BackupError: Wenn ein benötigtes ZIP der Kette fehlt
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    root_key = os.path.abspath(target_dir)
+    stats = {'files': 0, 'bytes': 0, 'errors': 0}
+    archives: Dict[str, zipfile.ZipFile] = {}
+
+    def destination(rel: str) -> Path:
+        path = target_dir / rel
+        if not os.path.abspath(path).startswith(root_key + os.sep):
+            raise BackupError(f"Ungültiger Pfad im Backup: {rel}")
+        return path
+
+    try:
+        archives[backup_zip.name] = zipfile.ZipFile(backup_zip)
+        own = archives[backup_zip.name]
+        manifest = _read_json(own, MANIFEST_ARCNAME)
+        archive_prefix = f"backup/{manifest['archiv_root']}/" if manifest else None
+
+        # Datenbank, Konfiguration, Kunden-Index (bei alten Backups auch das Archiv)
+        for info in own.infolist():
+            name = info.filename
+            if info.is_dir() or name in (MANIFEST_ARCNAME, INFO_ARCNAME):
+                continue
+            if archive_prefix and name.startswith(archive_prefix):
+                continue
+            _extract(own, name, destination(name[len("backup/"):] if name.startswith("backup/") else name))
+            stats['files'] += 1
+            stats['bytes'] += info.file_size
+
+        if manifest is None:
+            return stats
+
+        for rel, (size, mtime_ns, expected, zip_name, arcname) in manifest['files'].items():
+            source = archives.get(zip_name)
+            if source is None:
+                zip_path = backup_zip.parent / zip_name
+                if not zip_path.exists():
+                    raise BackupError(f"Backup der Kette fehlt: {zip_name}")
+                source = archives[zip_name] = zipfile.ZipFile(zip_path)
+            target = destination(f"{manifest['archiv_root']}/{rel}")
+            actual = _extract(source, arcname, target)
+            if expected and actual != expected:
+                logger.error(f"❌ Prüfsumme stimmt nicht: {rel}")
+                stats['errors'] += 1
+            os.utime(target, ns=(mtime_ns, mtime_ns))
+            stats['files'] += 1
+            stats['bytes'] += size
+    finally:
+        for zipf in archives.values():
+            zipf.close()
+
+    logger.info(f"✓ Wiederhergestellt: {stats['files']} Dateien ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+                f"{stats['errors']} Fehler")
+    return stats
+
+
 def get_last_backup_time(backup_target_dir: Path) -> Optional[datetime]:
     """
     Ermittelt die Zeit des letzten Backups.
@@ -121,7 +483,7 @@ def get_last_backup_time(backup_target_dir: Path) -> Optional[datetime]:
     
     try:
         # Alle Backup-Dateien finden
-        backups = list(backup_target_dir.glob("werkstatt_backup_*.zip"))
+        backups = list(backup_target_dir.glob(BACKUP_PATTERN))
         
         if not backups:
             return None
@@ -187,7 +549,7 @@ def cleanup_old_backups(
     try:
         # Alle Backup-Dateien finden
         backups = sorted(
-            backup_target_dir.glob("werkstatt_backup_*.zip"),
+            backup_target_dir.glob(BACKUP_PATTERN),
             key=lambda p: p.stat().st_mtime,
             reverse=True
         )
@@ -196,12 +558,61 @@ def cleanup_old_backups(
             logger.info(f"Nur {len(backups)} Backups vorhanden, keine Bereinigung nötig")
             return
         
+        # Backups, aus denen behaltene inkrementelle Backups Dateien beziehen;
+        # das neueste Archiv-Backup bleibt immer (auch bei vielen reinen DB-Backups)
+        referenced = set()
+        archive_kept = False
+        for position, candidate in enumerate(backups):
+            if position >= keep_count and archive_kept:
+                break
+            info = read_backup_info(candidate) or {}
+            is_archive = info.get('type') in ('full', 'incremental')
+            if position < keep_count or is_archive:
+                referenced.update(info.get('references', []))
+                if position >= keep_count:
+                    referenced.add(candidate.name)
+            archive_kept = archive_kept or is_archive
+        
         # Alte Backups löschen
+        deleted = 0
         for old_backup in backups[keep_count:]:
+            if old_backup.name in referenced:
+                logger.info(f"Behalte altes Backup (Teil der Kette): {old_backup.name}")
+                continue
             logger.info(f"Lösche altes Backup: {old_backup.name}")
             old_backup.unlink()
+            deleted += 1
         
-        logger.info(f"Bereinigung abgeschlossen: {len(backups) - keep_count} alte Backups gelöscht")
+        logger.info(f"Bereinigung abgeschlossen: {deleted} alte Backups gelöscht")
         
     except Exception as e:
         logger.error(f"Fehler bei der Backup-Bereinigung: {e}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Backups auflisten und wiederherstellen')
+    sub = arg_parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help='Backups eines Ordners mit Typ und Kette anzeigen')
+    list_parser.add_argument('backup_dir', type=Path)
+    restore_parser = sub.add_parser('restore', help='Stand eines Backups wiederherstellen')
+    restore_parser.add_argument('backup_zip', type=Path)
+    restore_parser.add_argument('target_dir', type=Path)
+    args = arg_parser.parse_args()
+
+    if args.command == 'list':
+        for backup_zip in sorted(args.backup_dir.glob(BACKUP_PATTERN)):
+            info = read_backup_info(backup_zip) or {}
+            print(f"{backup_zip.name}  {info.get('type', 'alt'):12} "
+                  f"{backup_zip.stat().st_size / 1024 / 1024:8.1f} MB  "
+                  f"+{info.get('stored', '-')} -{len(info.get('deleted', []))}  Basis: {info.get('base') or '-'}")
+    else:
+        try:
+            result = restore_backup(args.backup_zip, args.target_dir)
+        except (BackupError, zipfile.BadZipFile, OSError) as e:
+            print(f"❌ {e}")
+            sys.exit(2)
+        sys.exit(1 if result['errors'] else 0)
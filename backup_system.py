@@ -9,9 +9,12 @@ Exportiert Datenbank-Datensätze als CSV in jeden Auftrag-Ordner:
 Kann die komplette Datenbank aus den verteilten CSV-Dateien wiederherstellen.
 
 Verwendung:
-    # Export (alle Aufträge sichern)
+    # Export (nur geänderte Aufträge sichern)
     python3 backup_system.py export --config .archiv_config.json
     
+    # Vollständiger Export (alle Ordner neu schreiben)
+    python3 backup_system.py export --full --config .archiv_config.json
+    
     # Restore (DB aus CSV-Dateien wiederherstellen)
     python3 backup_system.py restore --config .archiv_config.json
     
@@ -28,6 +31,8 @@ import json
 import hashlib
 import logging
 import argparse
+import io
+import os
 import time
 from pathlib import Path
 from datetime import datetime
@@ -55,6 +60,15 @@ CSV_COLUMNS = [
     'updated_at'           # Änderungszeitpunkt
 ]
 
+# Export-Stand je Ordner (inkrementeller Export)
+EXPORT_STATE_TABLE = 'backup_export_state'
+
+# Zeitpunkt und Ergebnis des letzten abgeschlossenen Exports (eine Zeile)
+EXPORT_RUN_TABLE = 'backup_export_run'
+
+# Geänderte Ordner werden blockweise im Export-Stand festgehalten
+EXPORT_STATE_BATCH = 500
+
 # Logging-Setup
 logging.basicConfig(
     level=logging.INFO,
@@ -162,6 +176,30 @@ def validate_record(record: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     return True, None
 
 
+def last_export(db_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Letzter abgeschlossener Export-Lauf
+    
+    Args:
+        db_path: Pfad zur SQLite-Datenbank
+        
+    Returns:
+        Dict mit finished_at, full, exported, errors oder None (noch kein Export)
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(
+            f'SELECT finished_at, full, exported, errors FROM {EXPORT_RUN_TABLE} WHERE id = 1'
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Tabelle entsteht erst beim ersten Export
+        return None
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
 class BackupSystem:
     """Haupt-Klasse für Backup/Restore-Operationen"""
     
@@ -181,10 +219,20 @@ class BackupSystem:
         logger.info(f"  Datenbank: {db_path}")
         logger.info(f"  Archiv: {archiv_root}")
     
-    def export_all(self) -> Dict[str, Any]:
+    def export_all(self, full: bool = False) -> Dict[str, Any]:
         """
         Exportiert alle Aufträge als CSV in ihre Ordner
         
+        Standardmäßig inkrementell: Für jeden Ordner wird die Checksumme der
+        data.csv aus der DB berechnet (ohne Dateizugriff) und mit dem Stand
+        des letzten Exports verglichen. Geschrieben werden nur Ordner, deren
+        Inhalt sich geändert hat. Verwaiste Ordner ergeben sich aus dem
+        Export-Stand statt aus einem Durchlauf durchs Archiv.
+        
+        Args:
+            full: Alle Ordner neu schreiben und das Archiv nach verwaisten
+                  data.csv durchsuchen (z.B. nach manuellen Eingriffen)
+        
         Returns:
             Statistik-Dictionary mit Erfolg/Fehler-Zählern
         """
@@ -192,36 +240,160 @@ class BackupSystem:
             'exported': 0,
             'errors': 0,
             'skipped': 0,
+            'full': full,
             'start_time': datetime.now().isoformat()
         }
         
         with acquire_lock(self.lock_file):
-            logger.info("Starte Export aller Aufträge...")
+            logger.info(f"Starte {'vollständigen' if full else 'inkrementellen'} Export...")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, timeout=30)
             conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM auftraege ORDER BY id')
-            
-            for row in cursor:
-                try:
-                    self._export_single_record(dict(row))
-                    stats['exported'] += 1
-                except Exception as e:
-                    logger.error(f"Fehler bei Auftrag {row['auftrag_nr']}: {e}")
-                    stats['errors'] += 1
-            
-            conn.close()
-            
-            # Cleanup: Lösche verwaiste Backup-Ordner
-            stats['cleaned'] = self._cleanup_orphaned_backups()
+            try:
+                self._ensure_state_table(conn)
+                previous = {} if full else {
+                    row['folder']: row['checksum']
+                    for row in conn.execute(f'SELECT folder, checksum FROM {EXPORT_STATE_TABLE}')
+                }
+                
+                # Ein Ordner = eine data.csv. Teilen sich mehrere Datensätze
+                # einen Ordner, gewinnt wie bisher der mit der höchsten ID.
+                folders: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+                for row in conn.execute('SELECT * FROM auftraege ORDER BY id'):
+                    record = dict(row)
+                    is_valid, error = validate_record(record)
+                    if not is_valid:
+                        logger.error(f"Fehler bei Auftrag {record.get('auftrag_nr')}: {error}")
+                        stats['errors'] += 1
+                        continue
+                    folder = str(Path(record['file_path']).parent)
+                    folders[folder] = (record, self._render_csv(record))
+                
+                changed = []
+                for folder, (record, content) in folders.items():
+                    checksum = hashlib.sha256(content).hexdigest()
+                    if previous.get(folder) == checksum:
+                        stats['skipped'] += 1
+                    else:
+                        changed.append((folder, record, content, checksum))
+                
+                logger.info(f"  {len(folders)} Ordner, {len(changed)} geändert, {stats['skipped']} unverändert")
+                
+                if full:
+                    conn.execute(f'DELETE FROM {EXPORT_STATE_TABLE}')
+                    conn.commit()
+                
+                # Fehlende Ordner gesammelt anlegen statt je Datensatz prüfen
+                self._ensure_folders(folder for folder, _, _, _ in changed)
+                
+                done = []
+                for folder, record, content, checksum in changed:
+                    try:
+                        self._write_export(Path(folder), record, content, checksum)
+                        done.append((folder, record['id'], checksum, datetime.now().isoformat()))
+                        stats['exported'] += 1
+                    except Exception as e:
+                        logger.error(f"Fehler bei Auftrag {record['auftrag_nr']}: {e}")
+                        stats['errors'] += 1
+                    if len(done) >= EXPORT_STATE_BATCH:
+                        self._save_state(conn, done)
+                        done = []
+                self._save_state(conn, done)
+                
+                # Cleanup: Lösche verwaiste Backup-Ordner
+                if full:
+                    stats['cleaned'] = self._cleanup_orphaned_backups()
+                else:
+                    stats['cleaned'] = self._cleanup_stale_state(conn, set(folders))
+                
+                stats['end_time'] = datetime.now().isoformat()
+                self._save_run(conn, stats)
+            finally:
+                conn.close()
         
-        stats['end_time'] = datetime.now().isoformat()
-        logger.info(f"Export abgeschlossen: {stats['exported']} erfolgreich, {stats['errors']} Fehler, {stats.get('cleaned', 0)} aufgeräumt")
+        logger.info(f"Export abgeschlossen: {stats['exported']} erfolgreich, {stats['skipped']} unverändert, "
+                    f"{stats['errors']} Fehler, {stats.get('cleaned', 0)} aufgeräumt")
         
         return stats
     
+    def _ensure_state_table(self, conn: sqlite3.Connection):
+        """Legt die Tabelle für den Export-Stand an (falls nötig)"""
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {EXPORT_STATE_TABLE} (
+                folder TEXT PRIMARY KEY,
+                record_id INTEGER NOT NULL,
+                checksum TEXT NOT NULL,
+                exported_at TEXT NOT NULL
+            )
+        ''')
+        conn.commit()
+    
+    def _save_run(self, conn: sqlite3.Connection, stats: Dict[str, Any]):
+        """Merkt sich den abgeschlossenen Export-Lauf (auch wenn nichts geändert war)"""
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {EXPORT_RUN_TABLE} (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                finished_at TEXT NOT NULL,
+                full INTEGER NOT NULL,
+                exported INTEGER NOT NULL,
+                errors INTEGER NOT NULL
+            )
+        ''')
+        conn.execute(
+            f'INSERT OR REPLACE INTO {EXPORT_RUN_TABLE} (id, finished_at, full, exported, errors) '
+            f'VALUES (1, ?, ?, ?, ?)',
+            (stats['end_time'], int(stats['full']), stats['exported'], stats['errors'])
+        )
+        conn.commit()
+    
+    def _save_state(self, conn: sqlite3.Connection, rows: List[Tuple[str, int, str, str]]):
+        """Schreibt exportierte Ordner in einem Schritt in den Export-Stand"""
+        if not rows:
+            return
+        conn.executemany(
+            f'INSERT OR REPLACE INTO {EXPORT_STATE_TABLE} (folder, record_id, checksum, exported_at) '
+            f'VALUES (?, ?, ?, ?)',
+            rows
+        )
+        conn.commit()
+    
+    def _ensure_folders(self, folders):
+        """
+        Legt fehlende Zielordner an
+        
+        Jeder Ordner wird nur einmal geprüft; existiert ein Elternordner schon,
+        werden dessen weitere Unterordner ohne erneute Prüfung angelegt.
+        """
+        known_parents = set()
+        for folder in sorted(set(folders)):
+            if os.path.isdir(folder):
+                continue
+            logger.warning(f"Ordner existiert nicht: {folder}")
+            parent = os.path.dirname(folder)
+            if parent in known_parents:
+                os.mkdir(folder)
+            else:
+                os.makedirs(folder, exist_ok=True)
+                known_parents.add(parent)
+    
+    @staticmethod
+    def _render_csv(record: Dict[str, Any]) -> bytes:
+        """
+        Erzeugt den Inhalt der data.csv für einen Datensatz
+        
+        Byte-identisch zu einer mit csv.DictWriter geschriebenen Datei, damit
+        die Checksumme ohne erneutes Lesen bestimmt werden kann.
+        """
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        
+        # Bereite Daten vor (nur relevante Spalten)
+        export_data = {col: record.get(col, '') for col in CSV_COLUMNS}
+        export_data['record_id'] = record['id']  # DB-ID als record_id
+        writer.writerow(export_data)
+        return buffer.getvalue().encode('utf-8')
+    
     def _export_single_record(self, record: Dict[str, Any]):
         """
         Exportiert einen einzelnen Datensatz
@@ -235,13 +407,23 @@ class BackupSystem:
             raise ValidationError(error)
         
         # Bestimme Zielordner
-        auftrag_nr = record['auftrag_nr']
-        file_path = Path(record['file_path'])
-        target_dir = file_path.parent
+        target_dir = Path(record['file_path']).parent
+        self._ensure_folders([str(target_dir)])
+        
+        content = self._render_csv(record)
+        self._write_export(target_dir, record, content, hashlib.sha256(content).hexdigest())
+    
+    def _write_export(self, target_dir: Path, record: Dict[str, Any], content: bytes, checksum: str):
+        """
+        Schreibt data.csv und meta.json eines Ordners
         
-        if not target_dir.exists():
-            logger.warning(f"Ordner existiert nicht: {target_dir}")
-            target_dir.mkdir(parents=True, exist_ok=True)
+        Args:
+            target_dir: Auftragsordner
+            record: Datensatz
+            content: Inhalt der data.csv (aus _render_csv)
+            checksum: SHA256 von content
+        """
+        auftrag_nr = record['auftrag_nr']
         
         # Schreibe CSV atomar
         csv_file = target_dir / 'data.csv'
@@ -249,17 +431,8 @@ class BackupSystem:
         
         try:
             # Schreibe in temporäre Datei
-            with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
-                writer.writeheader()
-                
-                # Bereite Daten vor (nur relevante Spalten)
-                export_data = {col: record.get(col, '') for col in CSV_COLUMNS}
-                export_data['record_id'] = record['id']  # DB-ID als record_id
-                writer.writerow(export_data)
-            
-            # Berechne Checksumme
-            checksum = calculate_checksum(tmp_file)
+            with open(tmp_file, 'wb') as f:
+                f.write(content)
             
             # Schreibe meta.json
             meta = {
@@ -268,7 +441,7 @@ class BackupSystem:
                 'exported_at': datetime.now().isoformat(),
                 'auftrag_nr': auftrag_nr,
                 'record_id': record['id'],
-                'file_size': tmp_file.stat().st_size
+                'file_size': len(content)
             }
             
             meta_file = target_dir / 'meta.json'
@@ -276,9 +449,7 @@ class BackupSystem:
                 json.dump(meta, f, indent=2, ensure_ascii=False)
             
             # Atomares Umbenennen
-            if csv_file.exists():
-                csv_file.unlink()
-            tmp_file.rename(csv_file)
+            os.replace(tmp_file, csv_file)
             
             logger.debug(f"✓ Exportiert: {auftrag_nr} → {csv_file}")
             
@@ -420,6 +591,8 @@ class BackupSystem:
         
         # Lösche alte Tabelle
         cursor.execute('DROP TABLE IF EXISTS auftraege')
+        # Export-Stand passt nicht mehr zu den neu vergebenen IDs
+        cursor.execute(f'DROP TABLE IF EXISTS {EXPORT_STATE_TABLE}')
         
         # Erstelle Schema (identisch zu db.py)
         cursor.execute('''
@@ -589,6 +762,39 @@ class BackupSystem:
         
         return cleaned
 
+    
+    def _cleanup_stale_state(self, conn: sqlite3.Connection, current_folders: set) -> int:
+        """
+        Findet verwaiste Backup-Ordner über den Export-Stand
+        
+        Ordner, die früher exportiert wurden, aber zu keinem Datensatz mehr
+        gehören, werden nur protokolliert (wie _cleanup_orphaned_backups).
+        Existiert dort keine data.csv mehr, wird der Eintrag entfernt.
+        
+        Returns:
+            Anzahl verwaister Ordner
+        """
+        stale = [row['folder'] for row in conn.execute(f'SELECT folder FROM {EXPORT_STATE_TABLE}')
+                 if row['folder'] not in current_folders]
+        
+        orphaned = 0
+        gone = []
+        for folder in stale:
+            if os.path.exists(os.path.join(folder, 'data.csv')):
+                logger.warning(f"⚠️  Verwaister Backup-Ordner gefunden (NICHT gelöscht): {folder}")
+                orphaned += 1
+            else:
+                gone.append((folder,))
+        
+        if gone:
+            conn.executemany(f'DELETE FROM {EXPORT_STATE_TABLE} WHERE folder = ?', gone)
+            conn.commit()
+        
+        if orphaned > 0:
+            logger.warning(f"⚠️  {orphaned} verwaiste Ordner gefunden. Diese wurden NICHT automatisch gelöscht!")
+            logger.warning(f"    → Prüfe diese Ordner manuell und lösche sie nur wenn sicher, dass keine wichtigen Daten enthalten sind.")
+        
+        return orphaned
 
 def main():
     """CLI-Hauptfunktion"""
@@ -609,6 +815,12 @@ def main():
         help='Pfad zur Konfigurationsdatei'
     )
     
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Export: alle Ordner neu schreiben statt nur geänderte'
+    )
+    
     parser.add_argument(
         '--db',
         type=Path,
@@ -644,9 +856,10 @@ def main():
     # Führe Kommando aus
     try:
         if args.command == 'export':
-            stats = system.export_all()
+            stats = system.export_all(full=args.full)
             print(f"\n✓ Export abgeschlossen:")
             print(f"  Exportiert: {stats['exported']}")
+            print(f"  Unverändert: {stats['skipped']}")
             print(f"  Fehler: {stats['errors']}")
             
         elif args.command == 'restore':
@@ -14,16 +14,26 @@ Verwendung:
   python3 batch_import.py /path/to/2024
   python3 batch_import.py /path/to/Import --year 2024
   python3 batch_import.py /path/to/Import --recursive
+  python3 batch_import.py /path/to/2024 --workers 4
+  python3 batch_import.py /path/to/2024 --resume
 """
 
 import sys
+import time
 import logging
 from pathlib import Path
 from typing import List
 import argparse
+import multiprocessing
 
 from config import Config
-from folder_import import process_folder_for_import, FolderImportError
+from folder_walker import PDFFolder, iter_pdf_folders
+from folder_import import (
+    process_folder_for_import, import_folders_parallel, extract_auftrag_nr_from_folder, FolderImportError
+)
+from import_checkpoint import (
+    DEFAULT_FILENAME, ImportCheckpoint, default_path, folder_fingerprint, folder_year
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +42,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _looks_like_order(name: str) -> bool:
+    """Ordnername enthält Ziffern (potenzielle Auftragsnummer)."""
+    return any(char.isdigit() for char in name)
+
+
+def find_order_folder_entries(root: Path, recursive: bool = False) -> List[PDFFolder]:
+    """
+    Findet alle Ordner mit PDFs, die wie Auftragsnummern aussehen, samt PDF-Anzahl.
+    
+    Jeder Ordner wird nur einmal aufgelistet (folder_walker); Fehler, .trash,
+    temp_backup und versteckte Ordner werden übersprungen.
+    
+    Args:
+        root: Root-Verzeichnis
+        recursive: Rekursiv suchen?
+    
+    Returns:
+        Liste der Ordner (sortiert nach Pfad)
+    """
+    return sorted(iter_pdf_folders(root, recursive=recursive, name_filter=_looks_like_order))
+
+
 def find_order_folders(root: Path, recursive: bool = False) -> List[Path]:
     """
     Findet alle Ordner, die wie Auftragsnummern aussehen.
@@ -43,28 +75,7 @@ def find_order_folders(root: Path, recursive: bool = False) -> List[Path]:
     Returns:
         Liste der Ordner-Pfade
     """
-    folders = []
-    
-    if recursive:
-        # Rekursiv alle Unterordner durchsuchen
-        for item in root.rglob('*'):
-            if item.is_dir() and not item.name.startswith('.'):
-                # Prüfe ob Ordnername Ziffern enthält (potenzielle Auftragsnummer)
-                if any(char.isdigit() for char in item.name):
-                    # Prüfe ob PDFs im Ordner
-                    if list(item.glob('*.pdf')):
-                        folders.append(item)
-    else:
-        # Nur direkte Unterordner
-        for item in root.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                # Prüfe ob Ordnername Ziffern enthält
-                if any(char.isdigit() for char in item.name):
-                    # Prüfe ob PDFs im Ordner
-                    if list(item.glob('*.pdf')):
-                        folders.append(item)
-    
-    return sorted(folders)
+    return [entry.path for entry in find_order_folder_entries(root, recursive)]
 
 
 def batch_import(
@@ -73,7 +84,10 @@ def batch_import(
     ohne_auftrag: bool = False,
     dry_run: bool = False,
     year: int | None = None,
-    recursive: bool = False
+    recursive: bool = False,
+    workers: int = 1,
+    resume: bool = False,
+    checkpoint_path: Path | None = None
 ) -> None:
     """
     Batch-Import für verschachtelte Strukturen.
@@ -85,6 +99,12 @@ def batch_import(
         dry_run: Nur Simulation
         year: Nur Ordner in diesem Jahr verarbeiten
         recursive: Rekursiv suchen
+        workers: Parallele Import-Prozesse (1 = nacheinander). OCR und
+                 Aufteilen laufen parallel, Archivierung und Datenbank
+                 weiterhin nacheinander in Ordner-Reihenfolge.
+        resume: Bereits erfolgreich importierte Ordner (laut Checkpoint)
+                überspringen, fehlgeschlagene erneut versuchen
+        checkpoint_path: Checkpoint-Manifest (Standard: im Archiv-Root)
     """
     if not root_path.exists():
         logger.error(f"Verzeichnis nicht gefunden: {root_path}")
@@ -98,17 +118,31 @@ def batch_import(
     logger.info(f"Rekursiv: {'Ja' if recursive else 'Nein'}")
     logger.info(f"Modus: {'OA (Ohne Auftrag)' if ohne_auftrag else 'MIT Auftrag'}")
     logger.info(f"Dry-Run: {'Ja (Simulation)' if dry_run else 'Nein'}")
+    logger.info(f"Prozesse: {workers}")
+    logger.info(f"Fortsetzen: {'Ja' if resume else 'Nein'}")
     logger.info("=" * 60)
     
+    checkpoint = ImportCheckpoint(checkpoint_path or default_path(config))
+    if not dry_run:
+        # Abbruch zwischen Datenbank-Eintrag und Checkpoint: nicht doppelt importieren
+        checkpoint.recover(config.get_db_path())
+    
     # Ordner finden
     logger.info("\n🔍 Suche Ordner...")
-    folders = find_order_folders(root_path, recursive)
+    entries = find_order_folder_entries(root_path, recursive)
+    folders = [entry.path for entry in entries]
+    pdf_counts = {entry.path: entry.pdf_count for entry in entries}
     
     # Jahr-Filter anwenden
     if year:
         folders = [f for f in folders if str(year) in str(f)]
         logger.info(f"Jahr-Filter: {year}")
     
+    if resume:
+        total = len(folders)
+        folders = checkpoint.pending(folders)
+        logger.info(f"⏭️  Fortsetzen: {total - len(folders)} Ordner bereits importiert ({checkpoint.path})")
+    
     if not folders:
         logger.warning("Keine passenden Ordner gefunden")
         return
@@ -118,9 +152,8 @@ def batch_import(
     # Vorschau
     logger.info("📋 Ordner-Liste:")
     for i, folder in enumerate(folders, 1):
-        pdf_count = len(list(folder.glob('*.pdf')))
         rel_path = folder.relative_to(root_path)
-        logger.info(f"  [{i:3d}] {rel_path} ({pdf_count} PDFs)")
+        logger.info(f"  [{i:3d}] {rel_path} ({pdf_counts[folder]} PDFs)")
     
     if dry_run:
         logger.info("\n" + "=" * 60)
@@ -140,35 +173,69 @@ def batch_import(
     logger.info("STARTE VERARBEITUNG")
     logger.info("=" * 60 + "\n")
     
-    success_count = 0
-    error_count = 0
-    errors = []
+    results = []
+    # Prüfsummen vor dem Import (erfolgreiche Ordner werden danach gelöscht)
+    fingerprints = {folder: folder_fingerprint(folder) for folder in folders}
     
-    for i, folder in enumerate(folders, 1):
-        logger.info(f"\n[{i}/{len(folders)}] Verarbeite: {folder.name}")
-        logger.info("-" * 60)
-        
-        try:
-            result = process_folder_for_import(
-                folder,
-                config,
-                merge_pdfs_flag=True,
-                ohne_auftrag=ohne_auftrag
-            )
+    def archived(folder: Path, paths: list) -> None:
+        checkpoint.begin_commit(
+            folder,
+            paths,
+            auftrag_nr=extract_auftrag_nr_from_folder(folder.name),
+            fingerprint=fingerprints[folder],
+            year=folder_year(folder, year)
+        )
+    
+    def report(i: int, folder: Path, result: dict) -> None:
+        checkpoint.record(
+            folder,
+            result,
+            fingerprint=fingerprints[folder],
+            year=folder_year(folder, year)
+        )
+        if result.get('success'):
+            logger.info(f"✅ [{i}/{len(folders)}] Erfolgreich: {result['auftrag_nr']}")
+        else:
+            logger.error(f"❌ [{i}/{len(folders)}] Fehler bei {folder.name}: {result.get('error', 'Unbekannter Fehler')}")
+    
+    if workers > 1:
+        results = import_folders_parallel(
+            folders,
+            config,
+            ohne_auftrag=ohne_auftrag,
+            workers=workers,
+            on_result=report,
+            on_archived=archived
+        )
+    else:
+        for i, folder in enumerate(folders, 1):
+            logger.info(f"\n[{i}/{len(folders)}] Verarbeite: {folder.name}")
+            logger.info("-" * 60)
+            
+            start = time.monotonic()
+            try:
+                result = process_folder_for_import(
+                    folder,
+                    config,
+                    merge_pdfs_flag=True,
+                    ohne_auftrag=ohne_auftrag,
+                    on_archived=archived
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            result["seconds"] = round(time.monotonic() - start, 3)
             
-            if result.get('success'):
-                success_count += 1
-                logger.info(f"✅ Erfolgreich: {result['auftrag_nr']}")
-            else:
-                error_count += 1
-                error_msg = result.get('error', 'Unbekannter Fehler')
-                errors.append((folder.name, error_msg))
-                logger.error(f"❌ Fehler: {error_msg}")
-        
-        except Exception as e:
-            error_count += 1
-            errors.append((folder.name, str(e)))
-            logger.error(f"❌ Fehler bei {folder.name}: {e}")
+            results.append(result)
+            report(i, folder, result)
+    
+    # Zusammenfassung in Ordner-Reihenfolge (unabhängig von der Laufzeit)
+    errors = [
+        (folder.name, result.get('error', 'Unbekannter Fehler'))
+        for folder, result in zip(folders, results)
+        if not result.get('success')
+    ]
+    error_count = len(errors)
+    success_count = len(results) - error_count
     
     # Zusammenfassung
     logger.info("\n" + "=" * 60)
@@ -183,10 +250,16 @@ def batch_import(
         for folder_name, error in errors:
             logger.info(f"  - {folder_name}: {error}")
     
+    logger.info("\n📊 Durchsatz pro Jahr (alle Läufe laut Checkpoint):")
+    checkpoint.log_report()
+    logger.info(f"Checkpoint: {checkpoint.path}")
     logger.info("=" * 60)
 
 
 if __name__ == "__main__":
+    # Prozess-Pool in der gebündelten Windows-EXE
+    multiprocessing.freeze_support()
+    
     parser = argparse.ArgumentParser(
         description='Batch-Import für verschachtelte Ordnerstrukturen',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -201,9 +274,18 @@ Beispiele:
   # Ohne Auftrag (OA-Modus)
   python3 batch_import.py Import/2024/ --oa
   
+  # Abgebrochenen Lauf fortsetzen (erledigte Ordner überspringen)
+  python3 batch_import.py Import/2024/ --resume
+  
+  # Durchsatz-Bericht pro Jahr aus dem Checkpoint
+  python3 batch_import.py Import/ --report
+  
   # Simulation (kein Import)
   python3 batch_import.py Import/2024/ --dry-run
   
+  # 4 Ordner gleichzeitig verarbeiten (OCR parallel)
+  python3 batch_import.py Import/2024/ --workers 4
+  
 Strukturen:
   2024/
     ├── 076329/
@@ -244,6 +326,32 @@ Strukturen:
         help='Simulation ohne tatsächlichen Import'
     )
     
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=None,
+        help='Anzahl paralleler Import-Prozesse (Standard: import_workers aus config.json)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Abgebrochenen Lauf fortsetzen: erledigte Ordner laut Checkpoint überspringen'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        type=Path,
+        default=None,
+        help=f'Checkpoint-Manifest (Standard: <archiv_root>/{DEFAULT_FILENAME})'
+    )
+    
+    parser.add_argument(
+        '--report',
+        action='store_true',
+        help='Nur den Durchsatz-Bericht pro Jahr aus dem Checkpoint anzeigen'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -258,6 +366,10 @@ Strukturen:
     # Config laden
     config = Config()
     
+    if args.report:
+        ImportCheckpoint(args.checkpoint or default_path(config)).log_report()
+        sys.exit(0)
+    
     try:
         batch_import(
             args.path,
@@ -265,7 +377,10 @@ Strukturen:
             ohne_auftrag=args.oa,
             dry_run=args.dry_run,
             year=args.year,
-            recursive=args.recursive
+            recursive=args.recursive,
+            workers=max(1, args.workers or config.get('import_workers', 1)),
+            resume=args.resume,
+            checkpoint_path=args.checkpoint
         )
     except KeyboardInterrupt:
         logger.info("\n\nAbgebrochen durch Benutzer")
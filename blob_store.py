@@ -0,0 +1,320 @@
+"""
+Inhaltsadressierte Ablage für Archiv-PDFs (optional, `dedup_enabled`).
+
+Doppelte Aufträge sind ausdrücklich erlaubt (allow_duplicate, _v2-Versionen) -
+byte-gleiche PDFs liegen dadurch mehrfach im Archiv. Mit aktivierter Ablage
+wird jede PDF nach dem Archivieren unter ihrem SHA256 in `<archiv_root>/.blobs`
+abgelegt (`ab/cd/<hash>.pdf`), und der Eintrag im Auftragsordner ist ein
+Hardlink darauf:
+
+- Die Ordnerstruktur (Jahr/Auftragsnummer, sprechende Dateinamen) bleibt
+  unverändert; jeder Eintrag ist weiterhin eine normale PDF.
+- Eine zweite byte-gleiche PDF belegt keinen weiteren Speicher.
+- Referenzzähler ist die Linkanzahl des Dateisystems (st_nlink - 1). Ein
+  Verschieben in den Papierkorb behält die Referenz (Wiederherstellung
+  möglich); erst das endgültige Löschen (`remove_tree`) gibt sie frei und
+  entfernt den Blob, wenn niemand mehr darauf zeigt. `collect_garbage`
+  räumt Blobs auf, deren letzte Referenz anderweitig gelöscht wurde.
+- Unterstützt das Dateisystem keine Hardlinks, bleibt die Datei einfach eine
+  normale Kopie (Warnung im Log).
+
+Achtung: Hardlinks teilen sich den Inhalt. Archiv-PDFs dürfen deshalb nicht
+"an Ort und Stelle" bearbeitet werden, sondern nur über eine neue Datei und
+Umbenennen (wie alle Schreibpfade dieses Projekts).
+
+Verwendung:
+    python3 blob_store.py stats
+    python3 blob_store.py dedup [--dry-run]   # Bestehendes Archiv umstellen
+    python3 blob_store.py gc                  # Verwaiste Blobs entfernen
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DIRNAME = '.blobs'
+BLOB_SUFFIX = '.pdf'
+
+
+class BlobStoreError(Exception):
+    """Fehler in der inhaltsadressierten Ablage."""
+    pass
+
+
+def is_enabled(config: Dict[str, Any]) -> bool:
+    """Ob die Ablage laut Konfiguration aktiv ist."""
+    return bool(config.get("dedup_enabled", False))
+
+
+def store_dir(archiv_root: Path, config: Dict[str, Any]) -> Path:
+    """
+    Verzeichnis der Ablage.
+
+    Muss auf demselben Dateisystem wie das Archiv liegen (Hardlinks);
+    Standard ist daher `<archiv_root>/.blobs`.
+    """
+    custom = config.get("dedup_store_dir")
+    return Path(custom) if custom else Path(archiv_root) / DEFAULT_DIRNAME
+
+
+def blob_path(store: Path, file_hash: str) -> Path:
+    """Pfad des Blobs zu einem SHA256-Hash."""
+    file_hash = file_hash.lower()
+    return store / file_hash[:2] / file_hash[2:4] / f"{file_hash}{BLOB_SUFFIX}"
+
+
+def references(store: Path, file_hash: str) -> int:
+    """Anzahl Archiv-Einträge, die auf den Blob zeigen (0 = kein Blob)."""
+    try:
+        return os.stat(blob_path(store, file_hash)).st_nlink - 1
+    except FileNotFoundError:
+        return 0
+
+
+def adopt(path: Path, file_hash: str, store: Path) -> bool:
+    """
+    Hängt eine frisch archivierte Datei an die Ablage.
+
+    Gibt es den Blob schon, wird die Datei atomar durch einen Hardlink darauf
+    ersetzt (Speicher der Kopie wird frei). Sonst wird die Datei selbst als
+    Blob verlinkt. Fehler (z.B. keine Hardlinks auf dem Laufwerk) werden nur
+    protokolliert - die Datei bleibt dann eine normale Kopie.
+
+    Args:
+        path: Datei im Archiv
+        file_hash: SHA256 der Datei
+        store: Verzeichnis der Ablage
+
+    Returns:
+        True, wenn die Datei ein Duplikat war und jetzt auf den Blob zeigt
+    """
+    path = Path(path)
+    blob = blob_path(store, file_hash)
+    tmp_link = path.with_name(f".{path.name}.{os.getpid()}.link")
+    try:
+        for _ in range(2):
+            try:
+                blob_stat = os.stat(blob)
+            except FileNotFoundError:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, blob)
+                    return False
+                except FileExistsError:
+                    # Anderer Prozess hat denselben Inhalt gerade abgelegt
+                    continue
+
+            path_stat = os.stat(path)
+            if os.path.samestat(blob_stat, path_stat):
+                return False
+            if blob_stat.st_size != path_stat.st_size:
+                logger.warning(f"⚠️  Blob {blob.name} hat abweichende Größe - Datei bleibt eigenständig")
+                return False
+            os.link(blob, tmp_link)
+            os.replace(tmp_link, path)
+            logger.info(f"♻️  Duplikat: {path.name} verweist auf vorhandenen Inhalt ({path_stat.st_size // 1024} KB gespart)")
+            return True
+        return False
+    except OSError as e:
+        logger.warning(f"⚠️  Deduplizierung für {path.name} nicht möglich: {e}")
+        try:
+            tmp_link.unlink()
+        except OSError:
+            pass
+        return False
+
+
+def _file_hash(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _release(path: Path, store: Path) -> bool:
+    """Löscht eine Archivdatei und ihren Blob, wenn das die letzte Referenz war."""
+    blob = None
+    if os.stat(path).st_nlink > 1:
+        candidate = blob_path(store, _file_hash(path))
+        if candidate.exists() and os.path.samefile(candidate, path):
+            blob = candidate
+    path.unlink()
+    if blob is not None and os.stat(blob).st_nlink <= 1:
+        blob.unlink()
+        return True
+    return False
+
+
+def remove_tree(directory: Path, store: Path) -> int:
+    """
+    Löscht einen Ordner endgültig und gibt seine Blob-Referenzen frei.
+
+    Args:
+        directory: Ordner (z.B. Eintrag im Papierkorb)
+        store: Verzeichnis der Ablage
+
+    Returns:
+        Anzahl freigegebener Blobs
+    """
+    freed = 0
+    if store.exists():
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith(BLOB_SUFFIX):
+                    freed += _release(Path(root) / name, store)
+    shutil.rmtree(directory)
+    if freed:
+        logger.info(f"♻️  {freed} nicht mehr referenzierte Blobs entfernt")
+    return freed
+
+
+def iter_blobs(store: Path) -> Iterator[os.DirEntry]:
+    """Alle Blobs der Ablage."""
+    if not store.exists():
+        return
+    for first in os.scandir(store):
+        if not first.is_dir():
+            continue
+        for second in os.scandir(first.path):
+            if not second.is_dir():
+                continue
+            for entry in os.scandir(second.path):
+                if entry.name.endswith(BLOB_SUFFIX):
+                    yield entry
+
+
+def collect_garbage(store: Path, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Entfernt Blobs ohne Referenz (Linkanzahl 1).
+
+    Returns:
+        Statistik (removed, bytes)
+    """
+    stats = {'removed': 0, 'bytes': 0}
+    for entry in iter_blobs(store):
+        st = entry.stat()
+        if st.st_nlink > 1:
+            continue
+        stats['removed'] += 1
+        stats['bytes'] += st.st_size
+        if not dry_run:
+            os.unlink(entry.path)
+    logger.info(f"✓ Blob-GC: {stats['removed']} Blobs ({stats['bytes'] / 1024 / 1024:.1f} MB) "
+                f"{'würden entfernt' if dry_run else 'entfernt'}")
+    return stats
+
+
+def statistics(store: Path) -> Dict[str, Any]:
+    """
+    Belegung der Ablage.
+
+    Returns:
+        blobs, references, stored_mb (tatsächlich belegt), logical_mb (Summe
+        aller Archiv-Einträge), saved_mb
+    """
+    blobs = refs = stored = logical = 0
+    for entry in iter_blobs(store):
+        st = entry.stat()
+        count = max(0, st.st_nlink - 1)
+        blobs += 1
+        refs += count
+        stored += st.st_size
+        logical += st.st_size * count
+    mb = 1024 * 1024
+    return {
+        'blobs': blobs,
+        'references': refs,
+        'stored_mb': round(stored / mb, 1),
+        'logical_mb': round(logical / mb, 1),
+        'saved_mb': round(max(0, logical - stored) / mb, 1)
+    }
+
+
+def deduplicate_archive(db_path: Path, archiv_root: Path, store: Path, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Stellt ein bestehendes Archiv auf die Ablage um.
+
+    Dateiliste und bekannte Hashes kommen aus dem Archiv-Manifest; fehlende
+    Hashes werden berechnet und dort nachgetragen.
+
+    Args:
+        db_path: Pfad zur werkstatt.db
+        archiv_root: Root-Verzeichnis des Archivs
+        store: Verzeichnis der Ablage
+        dry_run: Nur zählen, nichts verlinken
+
+    Returns:
+        Statistik (files, duplicates, saved_bytes)
+    """
+    import archive_manifest
+    import db
+
+    archive_manifest.reconcile(db_path, archiv_root)
+    conn = db._get_optimized_connection(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT path, size, hash FROM archive_manifest WHERE lower(name) LIKE '%.pdf' ORDER BY path"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    stats = {'files': 0, 'duplicates': 0, 'saved_bytes': 0}
+    seen = set()
+    for row in rows:
+        path = Path(row['path'])
+        try:
+            file_hash = row['hash'] or _file_hash(path)
+        except OSError as e:
+            logger.warning(f"Übersprungen: {path} ({e})")
+            continue
+        stats['files'] += 1
+        duplicate = file_hash in seen or references(store, file_hash) > 0
+        seen.add(file_hash)
+        if dry_run:
+            if duplicate:
+                stats['duplicates'] += 1
+                stats['saved_bytes'] += row['size']
+            continue
+        if adopt(path, file_hash, store):
+            stats['duplicates'] += 1
+            stats['saved_bytes'] += row['size']
+        if not row['hash']:
+            archive_manifest.record_files(db_path, [path], hashes={path: file_hash})
+
+    logger.info(f"✓ Deduplizierung: {stats['files']} PDFs, {stats['duplicates']} Duplikate, "
+                f"{stats['saved_bytes'] / 1024 / 1024:.1f} MB {'einsparbar' if dry_run else 'gespart'}")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from config import Config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Inhaltsadressierte Ablage (Deduplizierung)')
+    arg_parser.add_argument('command', choices=['stats', 'dedup', 'gc'])
+    arg_parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts ändern')
+    arg_parser.add_argument('--config', help='Pfad zur Konfigurationsdatei')
+    args = arg_parser.parse_args()
+
+    cfg = Config(Path(args.config)) if args.config else Config()
+    store = store_dir(cfg.get_archiv_root(), cfg.config)
+
+    if args.command == 'stats':
+        for key, value in statistics(store).items():
+            print(f"  {key}: {value}")
+    elif args.command == 'dedup':
+        if not is_enabled(cfg.config) and not args.dry_run:
+            print("❌ dedup_enabled ist in der Konfiguration nicht aktiv")
+            sys.exit(1)
+        deduplicate_archive(cfg.get_db_path(), cfg.get_archiv_root(), store, dry_run=args.dry_run)
+    elif args.command == 'gc':
+        collect_garbage(store, dry_run=args.dry_run)
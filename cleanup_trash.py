@@ -15,6 +15,7 @@ from pathlib import Path
 from datetime import datetime, timedelta
 import shutil
 
+import blob_store
 import config
 
 
@@ -164,9 +165,11 @@ def empty_trash(older_than_days: int = 0):
     archiv_root = cfg.get_archiv_root()
     trash_dir = archiv_root / '.trash'
     
+    blob_dir = blob_store.store_dir(archiv_root, cfg.config)
     for item in items:
         try:
-            shutil.rmtree(item['path'])
+            # Gibt auch die Referenzen auf deduplizierte PDFs frei
+            blob_store.remove_tree(item['path'], blob_dir)
             deleted += 1
         except Exception as e:
             print(f"❌ Fehler beim Löschen von {item['name']}: {e}")
@@ -38,6 +38,50 @@ DEFAULT_CONFIG = {
     "tesseract_lang": "deu",
     "poppler_path": None,  # None = auto-detect (PATH), oder z.B. r"C:\Program Files\poppler\Library\bin"
     
+    # Request-Profiler (Web-UI, siehe /debug/profiles)
+    "profiler_sample_rate": 0.0,  # Anteil zufällig profilierter Requests (0.0 = aus, 0.01 = 1%)
+    "profiler_max_profiles": 50,  # Größe des Ringpuffers (letzte N Profile)
+    "profiler_token": "",  # Token für X-Profile-Token (leer = explizites Profilieren nur mit profiler_local_only)
+    "profiler_local_only": False,  # True = nur localhost, ohne Token (nicht hinter einem lokalen Reverse-Proxy!)
+    
+    # Such-Cache (Anzahl gecachter Suchergebnisse, 0 = deaktiviert)
+    "query_cache_size": 256,
+    
+    # OCR-Priorisierung (interaktive Aufträge vor Watcher/Import/Rescan)
+    "ocr_slots": 0,  # Gleichzeitige OCR-Seiten, 0 = automatisch min(4, CPU-Kerne) (einer bleibt für interaktive Aufträge frei)
+    "ocr_bulk_pages_per_minute": 0,  # Obergrenze für Bulk-Seiten (0 = unbegrenzt)
+    
+    # Ordnerüberwachung
+    "watcher_workers": 1,  # Parallele Verarbeitungen (OCR) im Watch-Modus
+    "watcher_settle_seconds": 1.0,  # So lange muss eine neue Datei unverändert sein
+    "watcher_settle_timeout": 30,  # Aufgeben, wenn eine Datei so lange nicht fertig wird
+    "watcher_mode": "auto",  # "auto", "events" (watchdog) oder "polling" (Netzlaufwerk/SMB)
+    "watcher_poll_interval": 2.0,  # Polling: Intervall in Sekunden bei Aktivität
+    "watcher_poll_max_interval": 30.0,  # Polling: maximales Intervall im Leerlauf
+    
+    # Cluster-Modus (mehrere Rechner überwachen denselben Eingangsordner)
+    "cluster_enabled": False,  # Dateien vor der Verarbeitung in werkstatt.db beanspruchen
+    "cluster_node_id": "",  # Leer = Rechnername-PID
+    "cluster_lease_ttl": 120,  # Sekunden ohne Heartbeat, bis ein anderer Knoten übernimmt
+    
+    # Ordner-Import
+    "import_ocr_workers": 4,  # Parallele OCR-Läufe pro Ordner (jeweils eine PDF)
+    "import_workers": 1,  # Parallele Ordner beim Batch-Import (Prozesse, 1 = nacheinander)
+    
+    # Archiv-Manifest (Dateiliste in werkstatt.db für Statistiken)
+    "manifest_refresh_seconds": 300,  # Abgleich mit dem Archiv höchstens so oft (Hintergrund)
+    "verify_workers": 4,  # Integritätsprüfung: gleichzeitig gehashte Dateien
+    "verify_max_mb_per_second": 0,  # Integritätsprüfung: Leserate begrenzen (0 = unbegrenzt)
+    # Deduplizierung: byte-gleiche PDFs als Hardlinks auf eine Ablage nach SHA256
+    "dedup_enabled": False,
+    "dedup_store_dir": "",  # Leer = <archiv_root>/.blobs (muss auf demselben Laufwerk liegen)
+    # PDF-Optimierung nach der OCR (Scan-Bilder neu kodieren, siehe pdf_optimize.py)
+    "pdf_optimize_enabled": False,
+    "pdf_optimize_jpeg_quality": 60,  # JPEG-Qualität für Graustufen-/Farbseiten
+    "pdf_optimize_max_dpi": 200,  # Graustufen/Farbe darüber werden herunterskaliert
+    "pdf_optimize_min_saving": 0.15,  # Original behalten, wenn weniger als 15% gespart
+    "pdf_optimize_bilevel": True,  # Schwarz-Weiß-Seiten als CCITT G4 (1 Bit)
+    
     # Schlagwörter für die Suche in Anhängen (Seiten 2-10)
     "keywords": [
         # Garantie / Kulanz / Rückruf / Rechtliches
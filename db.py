@@ -11,6 +11,10 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
+import time
+
+import metrics
+import query_cache
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +97,7 @@ def init_db(db_path: Path) -> None:
         
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
         
         logger.info("Datenbank erfolgreich initialisiert")
         
@@ -130,6 +135,30 @@ def _get_optimized_connection(db_path: Path, timeout: float = 30.0) -> sqlite3.C
     return conn
 
 
+def _begin_write(conn: sqlite3.Connection) -> None:
+    """
+    Startet eine Schreib-Transaktion und misst die Wartezeit auf den Lock.
+    
+    BEGIN IMMEDIATE holt den Schreib-Lock sofort; die Dauer entspricht damit
+    der Zeit, die SQLite im Busy-Handler auf andere Schreiber gewartet hat.
+    
+    Args:
+        conn: Offene Verbindung (ohne laufende Transaktion)
+    
+    Raises:
+        sqlite3.OperationalError: Wenn der Lock nach busy_timeout nicht frei wird
+    """
+    start = time.perf_counter()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+    except sqlite3.OperationalError as e:
+        if 'locked' in str(e) or 'busy' in str(e):
+            metrics.SQLITE_LOCKED_ERRORS.inc()
+        raise
+    finally:
+        metrics.SQLITE_BUSY_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
 def insert_auftrag(
     db_path: Path,
     metadata: Dict[str, Any],
@@ -172,7 +201,9 @@ def insert_auftrag(
             logger.warning(f"   Existierende Einträge: {len(existing)}")
             logger.warning(f"   Neue Datei: {file_path}")
         
+        insert_start = time.perf_counter()
         conn = _get_optimized_connection(db_path)
+        _begin_write(conn)
         cursor = conn.cursor()
         
         now = datetime.now().isoformat()
@@ -202,6 +233,8 @@ def insert_auftrag(
         auftrag_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - insert_start, stage="db_insert")
         
         if existing:
             logger.info(f"✓ Auftrag als Duplikat gespeichert: ID {auftrag_id}, "
@@ -213,6 +246,7 @@ def insert_auftrag(
         return auftrag_id
         
     except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="db_insert")
         raise DatabaseError(f"Fehler beim Einfügen des Auftrags: {e}")
 
 
@@ -288,6 +322,7 @@ def check_duplicate_auftrag_nr(db_path: Path, auftrag_nr: str) -> List[Dict[str,
         return []
 
 
+@query_cache.cached("search_by_auftrag_nr", query_cache.like_key)
 def search_by_auftrag_nr(db_path: Path, auftrag_nr: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Auftragsnummer.
@@ -321,6 +356,7 @@ def search_by_auftrag_nr(db_path: Path, auftrag_nr: str) -> List[Dict[str, Any]]
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_kunden_nr", query_cache.like_key)
 def search_by_kunden_nr(db_path: Path, kunden_nr: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Kundennummer.
@@ -354,6 +390,7 @@ def search_by_kunden_nr(db_path: Path, kunden_nr: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_name")
 def search_by_name(db_path: Path, name: str, partial: bool = True) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Kundenname.
@@ -395,6 +432,7 @@ def search_by_name(db_path: Path, name: str, partial: bool = True) -> List[Dict[
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_datum")
 def search_by_datum(db_path: Path, von: str, bis: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Datumsbereich.
@@ -429,6 +467,7 @@ def search_by_datum(db_path: Path, von: str, bis: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_kennzeichen", query_cache.like_key)
 def search_by_kennzeichen(db_path: Path, kennzeichen: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach KFZ-Kennzeichen.
@@ -462,6 +501,7 @@ def search_by_kennzeichen(db_path: Path, kennzeichen: str) -> List[Dict[str, Any
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_keyword", query_cache.like_key)
 def search_by_keyword(db_path: Path, keyword: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge, die ein bestimmtes Schlagwort enthalten.
@@ -507,6 +547,38 @@ def search_by_keyword(db_path: Path, keyword: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+def get_auftraege_by_ids(db_path: Path, ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Lädt Aufträge anhand ihrer IDs (Reihenfolge wie übergeben).
+    
+    Args:
+        db_path: Pfad zur Datenbank
+        ids: Liste von Auftrags-IDs
+    
+    Returns:
+        Liste von Dictionaries (unbekannte IDs werden ignoriert)
+    """
+    try:
+        conn = _get_optimized_connection(db_path)
+        cursor = conn.cursor()
+        
+        rows_by_id = {}
+        # SQLite erlaubt max. 999 Parameter pro Statement
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f'SELECT * FROM auftraege WHERE id IN ({placeholders})', batch)
+            for row in cursor.fetchall():
+                rows_by_id[row['id']] = dict(row)
+        
+        conn.close()
+        
+        return [rows_by_id[i] for i in ids if i in rows_by_id]
+        
+    except Exception as e:
+        raise DatabaseError(f"Fehler beim Laden der Aufträge: {e}")
+
+
 def get_statistics(db_path: Path) -> Dict[str, Any]:
     """
     Sammelt Statistiken über die Datenbank.
@@ -605,6 +677,7 @@ def export_to_csv(db_path: Path, output_path: Path) -> None:
         raise DatabaseError(f"Fehler beim CSV-Export: {e}")
 
 
+@query_cache.cached("search_by_kunde", query_cache.like_key)
 def search_by_kunde(db_path: Path, kunde_name: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Kundenname.
@@ -638,6 +711,7 @@ def search_by_kunde(db_path: Path, kunde_name: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_vin", query_cache.like_key)
 def search_by_vin(db_path: Path, vin: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach VIN (Fahrzeugidentifikationsnummer).
@@ -671,6 +745,7 @@ def search_by_vin(db_path: Path, vin: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_vis", query_cache.like_key)
 def search_by_vis(db_path: Path, vis: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach VIS (letzte 6 Zeichen der VIN).
@@ -721,6 +796,7 @@ def search_by_date_range(db_path: Path, von: str, bis: str) -> List[Dict[str, An
     return search_by_datum(db_path, von, bis)
 
 
+@query_cache.cached("search_by_month", query_cache.like_key)
 def search_by_month(db_path: Path, monat: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Monat (z.B. "2024-07").
@@ -754,6 +830,7 @@ def search_by_month(db_path: Path, monat: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached("search_by_year", query_cache.like_key)
 def search_by_year(db_path: Path, jahr: str) -> List[Dict[str, Any]]:
     """
     Sucht Aufträge nach Jahr (z.B. "2024").
@@ -787,6 +864,10 @@ def search_by_year(db_path: Path, jahr: str) -> List[Dict[str, Any]]:
         raise DatabaseError(f"Fehler bei der Suche: {e}")
 
 
+@query_cache.cached(
+    "search_multi_criteria",
+    lambda criteria: query_cache.criteria_key(criteria, exact_fields=('datum_von', 'datum_bis'))
+)
 def search_multi_criteria(db_path: Path, criteria: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     Sucht nach mehreren Kriterien gleichzeitig (UND-Verknüpfung).
@@ -908,11 +989,13 @@ def mark_auftrag_complete(db_path: Path, auftrag_id: int) -> bool:
             conn.commit()
         
         # Markiere als vollständig
+        _begin_write(conn)
         cursor.execute('UPDATE auftraege SET data_complete = 1 WHERE id = ?', (auftrag_id,))
         affected = cursor.rowcount
         
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
         
         if affected > 0:
             logger.info(f"Auftrag ID {auftrag_id} als vollständig markiert")
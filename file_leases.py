@@ -0,0 +1,462 @@
+"""
+Verteilte Verarbeitung: Leases für Dateien im gemeinsamen Eingangsordner.
+
+Laufen Watcher auf mehreren Rechnern gegen denselben SMB-Eingangsordner,
+sieht jeder Rechner dieselben neuen PDFs. Damit jede Datei genau einmal
+verarbeitet wird, beansprucht ein Knoten sie vorher in der Tabelle
+`file_leases` einer eigenen Lease-Datenbank neben der werkstatt.db
+(`werkstatt.db-leases`):
+
+- Die Lease-Datenbank läuft im Rollback-Journal-Modus (journal_mode=DELETE).
+  Die werkstatt.db nutzt WAL; dessen Sperren (`-shm`) gelten nur innerhalb
+  eines Rechners und schließen Knoten auf verschiedenen Rechnern über SMB
+  nicht gegenseitig aus. Das Rollback-Journal sperrt über Dateisperren, die
+  auch über die Freigabe wirken.
+- `claim()` trägt die Datei in einer BEGIN-IMMEDIATE-Transaktion ein - nur
+  ein Knoten gewinnt, alle anderen überspringen die Datei.
+- Ein Heartbeat-Thread verlängert die Leases des eigenen Knotens
+  regelmäßig (alle ttl/4 Sekunden).
+- Bleibt der Heartbeat aus (Absturz, Rechner aus, Netzwerk weg), läuft die
+  Lease nach `ttl` Sekunden ab. Der nächste Heartbeat eines anderen Knotens
+  räumt sie ab und reiht die Datei erneut ein. Auf demselben Rechner gilt
+  eine Lease sofort als abgelaufen, wenn der Prozess nicht mehr läuft.
+- Stellt der Heartbeat fest, dass eine eigene Lease übernommen wurde, gilt
+  sie als verloren. Die Verarbeitung prüft vor dem Archivieren und vor dem
+  Datenbank-Eintrag mit `ensure_held()` und bricht dann mit LeaseLostError
+  ab, statt die Datei ein zweites Mal abzulegen.
+
+Die Ablaufzeit wird mit der Uhr des jeweiligen Knotens berechnet; die Rechner
+sollten per Zeitsynchronisation (Windows-Domäne/NTP) auf wenige Sekunden
+genau gehen - die Standard-TTL von 2 Minuten lässt dafür reichlich Luft.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from ingest_journal import HOSTNAME, OWNER_PID, _pid_alive
+
+logger = logging.getLogger(__name__)
+
+
+# Lease-Dauer ohne Heartbeat
+DEFAULT_TTL = 120.0
+
+# Dateiname der Lease-Datenbank (neben werkstatt.db; das Muster
+# `werkstatt.db*` wird von Manifest und Backup übersprungen)
+LEASE_DB_SUFFIX = '-leases'
+
+# Wartezeit auf die Sperre der Lease-Datenbank
+LOCK_TIMEOUT = 30.0
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+class FileLeaseError(Exception):
+    """Fehler bei der Lease-Verwaltung."""
+    pass
+
+
+class LeaseLostError(FileLeaseError):
+    """Die Lease einer Datei in Arbeit wurde von einem anderen Knoten übernommen."""
+    pass
+
+
+# Lease der Datei, die der aktuelle Worker-Thread gerade verarbeitet
+_current = threading.local()
+
+
+def default_node_id() -> str:
+    """Kennung dieses Prozesses (Rechnername + PID)."""
+    return f"{HOSTNAME}-{OWNER_PID}"
+
+
+def lease_db_path(db_path: Path) -> Path:
+    """Pfad der Lease-Datenbank zur werkstatt.db."""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + LEASE_DB_SUFFIX)
+
+
+def _connect(lease_db: Path) -> sqlite3.Connection:
+    """
+    Öffnet die Lease-Datenbank im Rollback-Journal-Modus.
+
+    Bewusst nicht db._get_optimized_connection: WAL-Sperren wirken nicht
+    über Rechnergrenzen hinweg.
+    """
+    conn = sqlite3.connect(
+        lease_db,
+        timeout=LOCK_TIMEOUT,
+        isolation_level='DEFERRED',
+        check_same_thread=False
+    )
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('PRAGMA synchronous=FULL')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _ensure_table(lease_db: Path) -> None:
+    """Legt die Lease-Tabelle einmal pro Prozess an."""
+    key = str(lease_db)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        lease_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = _connect(lease_db)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS file_leases (
+                    source_path TEXT PRIMARY KEY,
+                    node_id TEXT NOT NULL,
+                    hostname TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    claimed_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_file_leases_node ON file_leases(node_id)
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+def _lease_key(path: Path) -> str:
+    """
+    Schlüssel einer Datei: nur der Dateiname.
+
+    Die Knoten binden die Freigabe unterschiedlich ein (Z:\\Eingang,
+    \\\\server\\scan, /mnt/scan) - der Dateiname im gemeinsamen Eingangsordner
+    ist auf allen Knoten gleich.
+    """
+    return Path(path).name
+
+
+class LeaseManager:
+    """Beansprucht Dateien für diesen Knoten und hält die Leases am Leben."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        node_id: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        on_recovered: Optional[Callable[[List[str]], None]] = None,
+        on_lost: Optional[Callable[[List[str]], None]] = None,
+        lease_db: Optional[Path] = None
+    ):
+        """
+        Initialisiert den Lease-Manager.
+
+        Args:
+            db_path: Pfad zur gemeinsamen werkstatt.db
+            node_id: Eindeutige Kennung des Knotens (Standard: Rechnername-PID)
+            ttl: Sekunden ohne Heartbeat, nach denen eine Lease abläuft
+            on_recovered: Erhält die Dateinamen abgelaufener Leases anderer
+                          Knoten (z.B. um sie erneut einzureihen)
+            on_lost: Erhält die Dateinamen eigener Leases, die ein anderer
+                     Knoten übernommen hat
+            lease_db: Pfad der Lease-Datenbank (Standard: werkstatt.db-leases
+                      neben db_path)
+        """
+        self.db_path = Path(db_path)
+        self.lease_db = Path(lease_db) if lease_db else lease_db_path(self.db_path)
+        self.node_id = node_id or default_node_id()
+        self.ttl = max(1.0, float(ttl))
+        self.heartbeat_interval = self.ttl / 4
+        self.on_recovered = on_recovered
+        self.on_lost = on_lost
+        self._held = set()
+        self._lost = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        _ensure_table(self.lease_db)
+
+    # --------------------------------------------------------
+    # Beanspruchen / Freigeben
+    # --------------------------------------------------------
+
+    def _is_expired(self, row, now: float) -> bool:
+        if row['expires_at'] < now:
+            return True
+        # Gleicher Rechner, Prozess beendet: nicht auf die TTL warten
+        return row['hostname'] == HOSTNAME and not _pid_alive(row['pid'])
+
+    def claim(self, path: Path) -> bool:
+        """
+        Beansprucht eine Datei für diesen Knoten.
+
+        Args:
+            path: PDF im Eingangsordner
+
+        Returns:
+            True, wenn dieser Knoten die Datei verarbeiten darf
+
+        Raises:
+            FileLeaseError: Wenn die Datenbank nicht erreichbar ist
+        """
+        key = _lease_key(path)
+        now = time.time()
+        try:
+            conn = _connect(self.lease_db)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT * FROM file_leases WHERE source_path = ?', (key,)).fetchone()
+                if row is not None and row['node_id'] != self.node_id and not self._is_expired(row, now):
+                    conn.rollback()
+                    return False
+                if row is not None and row['node_id'] != self.node_id:
+                    logger.warning(f"⏱️  Lease von {row['node_id']} für {key} abgelaufen, übernommen")
+                conn.execute('''
+                    INSERT OR REPLACE INTO file_leases (
+                        source_path, node_id, hostname, pid, claimed_at, heartbeat_at, expires_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (key, self.node_id, HOSTNAME, OWNER_PID, now, now, now + self.ttl))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise FileLeaseError(f"Lease für {key} nicht möglich: {e}")
+        with self._lock:
+            self._held.add(key)
+            self._lost.discard(key)
+        return True
+
+    def release(self, path: Path) -> None:
+        """Gibt eine Datei nach der Verarbeitung frei."""
+        key = _lease_key(path)
+        with self._lock:
+            self._held.discard(key)
+            self._lost.discard(key)
+        conn = _connect(self.lease_db)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM file_leases WHERE source_path = ? AND node_id = ?', (key, self.node_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def confirm(self, path: Path) -> None:
+        """
+        Stellt sicher, dass dieser Knoten die Datei noch hält, und verlängert
+        die Lease.
+
+        Vor Schritten aufrufen, die nicht doppelt passieren dürfen
+        (Archivieren, Datenbank-Eintrag). Nach erfolgreicher Prüfung bleibt
+        die Lease mindestens `ttl` Sekunden gültig.
+
+        Raises:
+            LeaseLostError: Wenn ein anderer Knoten die Datei übernommen hat
+            FileLeaseError: Wenn die Lease-Datenbank nicht erreichbar ist
+        """
+        key = _lease_key(path)
+        with self._lock:
+            lost = key in self._lost
+        if not lost:
+            now = time.time()
+            try:
+                conn = _connect(self.lease_db)
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    cursor = conn.execute('''
+                        UPDATE file_leases SET heartbeat_at = ?, expires_at = ?
+                        WHERE source_path = ? AND node_id = ?
+                    ''', (now, now + self.ttl, key, self.node_id))
+                    conn.commit()
+                    lost = cursor.rowcount == 0
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                raise FileLeaseError(f"Lease für {key} nicht prüfbar: {e}")
+            if lost:
+                self._mark_lost([key])
+        if lost:
+            raise LeaseLostError(f"Lease für {key} verloren - ein anderer Knoten verarbeitet die Datei")
+
+    def is_lost(self, path: Path) -> bool:
+        """Ob die Lease der Datei während der Verarbeitung verloren ging."""
+        with self._lock:
+            return _lease_key(path) in self._lost
+
+    def _mark_lost(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._held.discard(key)
+                self._lost.add(key)
+
+    def held(self) -> List[str]:
+        """Dateinamen, die dieser Knoten gerade hält."""
+        with self._lock:
+            return sorted(self._held)
+
+    def leases(self) -> List[Dict[str, Any]]:
+        """Alle Leases aller Knoten (für Statusanzeigen)."""
+        conn = _connect(self.lease_db)
+        try:
+            rows = conn.execute('SELECT * FROM file_leases ORDER BY claimed_at').fetchall()
+        finally:
+            conn.close()
+        now = time.time()
+        return [
+            {**dict(row), 'expired': self._is_expired(row, now), 'own': row['node_id'] == self.node_id}
+            for row in rows
+        ]
+
+    # --------------------------------------------------------
+    # Heartbeat und Wiederherstellung
+    # --------------------------------------------------------
+
+    def heartbeat(self) -> List[str]:
+        """
+        Verlängert die eigenen Leases.
+
+        Returns:
+            Dateinamen, deren Lease inzwischen ein anderer Knoten übernommen hat
+        """
+        held = self.held()
+        if not held:
+            return []
+        now = time.time()
+        lost = []
+        conn = _connect(self.lease_db)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for key in held:
+                cursor = conn.execute('''
+                    UPDATE file_leases SET heartbeat_at = ?, expires_at = ?
+                    WHERE source_path = ? AND node_id = ?
+                ''', (now, now + self.ttl, key, self.node_id))
+                if cursor.rowcount == 0:
+                    lost.append(key)
+            conn.commit()
+        finally:
+            conn.close()
+        if lost:
+            self._mark_lost(lost)
+        for key in lost:
+            logger.error(f"❌ Lease für {key} verloren (Heartbeat zu spät) - anderer Knoten verarbeitet die Datei")
+        return lost
+
+    def reap_expired(self) -> List[str]:
+        """
+        Entfernt abgelaufene Leases anderer Knoten.
+
+        Nur der Knoten, der eine Lease abräumt, bekommt sie zurückgeliefert -
+        so wird eine verwaiste Datei nicht von allen Knoten gleichzeitig
+        eingereiht.
+
+        Returns:
+            Dateinamen der abgeräumten Leases
+        """
+        now = time.time()
+        conn = _connect(self.lease_db)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('SELECT * FROM file_leases WHERE node_id != ?', (self.node_id,)).fetchall()
+            expired = [row['source_path'] for row in rows if self._is_expired(row, now)]
+            conn.executemany('DELETE FROM file_leases WHERE source_path = ?', [(key,) for key in expired])
+            conn.commit()
+        finally:
+            conn.close()
+        for key in expired:
+            logger.warning(f"⏱️  Abgelaufene Lease entfernt: {key}")
+        return expired
+
+    def tick(self) -> None:
+        """Ein Heartbeat-Durchlauf: eigene Leases verlängern, verwaiste abräumen."""
+        lost = self.heartbeat()
+        if lost and self.on_lost:
+            self.on_lost(lost)
+        recovered = self.reap_expired()
+        if recovered and self.on_recovered:
+            self.on_recovered(recovered)
+
+    def start(self) -> None:
+        """Startet den Heartbeat-Thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"Cluster-Modus: Knoten {self.node_id}, Lease-Dauer {self.ttl:.0f}s")
+
+    def stop(self) -> None:
+        """Stoppt den Heartbeat und gibt alle eigenen Leases frei."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for key in self.held():
+            try:
+                self.release(Path(key))
+            except Exception as e:
+                logger.warning(f"Lease für {key} konnte nicht freigegeben werden: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                # Netzlaufwerk kurz weg: beim nächsten Durchlauf erneut versuchen
+                logger.warning(f"Lease-Heartbeat fehlgeschlagen: {e}")
+
+
+@contextmanager
+def processing(leases: Optional['LeaseManager'], path: Path):
+    """
+    Markiert die Datei, die der aktuelle Thread unter einer Lease verarbeitet.
+
+    Innerhalb des Blocks prüft `ensure_held()` diese Lease. Ohne
+    LeaseManager (Einzelbetrieb) ist der Block wirkungslos.
+    """
+    previous = getattr(_current, 'lease', None)
+    _current.lease = (leases, Path(path)) if leases is not None else None
+    try:
+        yield
+    finally:
+        _current.lease = previous
+
+
+def ensure_held() -> None:
+    """
+    Prüft die Lease der Datei, die der aktuelle Thread verarbeitet.
+
+    Im Einzelbetrieb (kein `processing()`-Block aktiv) ohne Wirkung.
+
+    Raises:
+        LeaseLostError: Wenn ein anderer Knoten die Datei übernommen hat
+    """
+    current = getattr(_current, 'lease', None)
+    if current is not None:
+        leases, path = current
+        leases.confirm(path)
+
+
+def from_config(cfg) -> Optional[LeaseManager]:
+    """
+    Erstellt einen LeaseManager, wenn der Cluster-Modus aktiv ist.
+
+    Args:
+        cfg: Konfigurationsobjekt (config.Config)
+
+    Returns:
+        LeaseManager oder None (Einzelbetrieb)
+    """
+    if not cfg.get('cluster_enabled', False):
+        return None
+    return LeaseManager(
+        cfg.get_db_path(),
+        node_id=cfg.get('cluster_node_id') or None,
+        ttl=cfg.get('cluster_lease_ttl', DEFAULT_TTL)
+    )
@@ -8,16 +8,22 @@ Ordner-Name = Auftragsnummer
 - Alle PDFs werden zu einer Gesamt-PDF zusammengefügt
 """
 
+import itertools
 import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 import shutil
 import re
+import time
 from datetime import datetime
 
 # PDF-Manipulation
 try:
-    from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+    from PyPDF2 import PdfReader, PdfWriter
 except ImportError:
     print("❌ PyPDF2 nicht installiert. Führe aus: pip install PyPDF2")
     exit(1)
@@ -27,11 +33,19 @@ from config import Config
 from ocr import pdf_to_ocr_texts
 from parser import extract_auftrag_metadata, extract_keywords_from_pages
 from archive import format_auftrag_nr, move_to_archive
+import archive_manifest
+import folder_walker
 from db import insert_auftrag
+from pdf_merge import merge_pdf_files
 
 logger = logging.getLogger(__name__)
 
 
+# Parallele OCR-Läufe pro Ordner (Tesseract/Poppler laufen als eigene Prozesse,
+# Threads genügen). Jeder Lauf hält die Seitenbilder einer PDF im Speicher.
+DEFAULT_OCR_WORKERS = min(4, os.cpu_count() or 1)
+
+
 class FolderImportError(Exception):
     """Fehler beim Ordner-Import."""
     pass
@@ -75,7 +89,11 @@ def find_pdfs_in_folder(folder_path: Path) -> List[Path]:
     if not folder_path.is_dir():
         raise FolderImportError(f"Kein gültiger Ordner: {folder_path}")
     
-    pdfs = sorted(folder_path.glob("*.pdf"))
+    # Wie folder_walker: auch .PDF (Scanner unter Windows)
+    try:
+        pdfs = folder_walker.list_pdfs(folder_path)
+    except OSError as e:
+        raise FolderImportError(f"Ordner nicht lesbar: {folder_path} ({e})")
     if not pdfs:
         raise FolderImportError(f"Keine PDF-Dateien im Ordner: {folder_path}")
     
@@ -86,6 +104,9 @@ def merge_pdfs(pdf_paths: List[Path], output_path: Path) -> None:
     """
     Fügt mehrere PDFs zu einer Gesamt-PDF zusammen.
     
+    Seiten werden fortlaufend in eine Temp-Datei im Zielordner geschrieben
+    (pdf_merge), der Speicherbedarf hängt nicht von der Gesamtgröße ab.
+    
     Args:
         pdf_paths: Liste der zu mergenden PDFs
         output_path: Pfad für die Ausgabe-PDF
@@ -96,25 +117,73 @@ def merge_pdfs(pdf_paths: List[Path], output_path: Path) -> None:
     try:
         logger.info(f"Merge {len(pdf_paths)} PDFs zu: {output_path.name}")
         
-        merger = PdfMerger()
-        
-        for pdf_path in pdf_paths:
-            logger.debug(f"  + {pdf_path.name}")
-            merger.append(str(pdf_path))
+        page_counts = merge_pdf_files(pdf_paths, output_path)
         
-        # Ausgabe-Verzeichnis erstellen
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        for pdf_path, pages in zip(pdf_paths, page_counts):
+            logger.debug(f"  + {pdf_path.name}: {pages} Seiten")
         
-        # Zusammenführen
-        merger.write(str(output_path))
-        merger.close()
-        
-        logger.info(f"✓ PDFs erfolgreich zusammengefügt: {output_path.name}")
+        logger.info(f"✓ PDFs erfolgreich zusammengefügt: {output_path.name} ({sum(page_counts)} Seiten)")
         
     except Exception as e:
         raise FolderImportError(f"Fehler beim Mergen der PDFs: {e}")
 
 
+def ocr_pdfs(pdf_paths: List[Path], max_workers: Optional[int] = None) -> List[List[str]]:
+    """
+    Führt OCR für alle PDFs eines Ordners durch - jede PDF genau einmal.
+    
+    Args:
+        pdf_paths: PDFs in Verarbeitungsreihenfolge
+        max_workers: Parallele OCR-Läufe (None = DEFAULT_OCR_WORKERS)
+    
+    Returns:
+        Liste der Seitentexte pro PDF (gleiche Reihenfolge wie pdf_paths)
+    """
+    workers = max(1, min(max_workers or DEFAULT_OCR_WORKERS, len(pdf_paths)))
+    
+    def run(pdf_path: Path) -> List[str]:
+        return pdf_to_ocr_texts(pdf_path, max_pages=None)
+    
+    if workers == 1:
+        return [run(p) for p in pdf_paths]
+    
+    logger.info(f"⏳ OCR für {len(pdf_paths)} PDFs mit {workers} parallelen Läufen...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-ocr") as executor:
+        return list(executor.map(run, pdf_paths))
+
+
+def page_offsets(page_counts: List[int]) -> List[int]:
+    """
+    Seiten-Offsets der PDFs in der zusammengefügten PDF.
+    
+    Args:
+        page_counts: Seitenzahl pro PDF
+    
+    Returns:
+        Offset pro PDF (erste PDF = 0)
+    
+    Example:
+        >>> page_offsets([3, 2, 4])
+        [0, 3, 5]
+    """
+    offsets = []
+    total = 0
+    for count in page_counts:
+        offsets.append(total)
+        total += count
+    return offsets
+
+
+def _merge_keywords(keywords: Dict[str, List[int]], found: Dict[str, List[int]], offset: int) -> None:
+    """Fügt gefundene Schlagwörter mit verschobenen Seitenzahlen hinzu."""
+    for keyword, pages in found.items():
+        adjusted_pages = [p + offset for p in pages]
+        if keyword in keywords:
+            keywords[keyword] = sorted(set(keywords[keyword]) | set(adjusted_pages))
+        else:
+            keywords[keyword] = adjusted_pages
+
+
 def find_auftrag_page(texts: List[str]) -> Optional[int]:
     """
     Findet die Seite mit dem Werkstattauftrag (enthält Metadaten).
@@ -202,39 +271,26 @@ def split_pdf_extract_auftrag(pdf_path: Path, output_dir: Path, auftrag_nr: str,
         raise FolderImportError(f"Fehler beim Splitten von {pdf_path.name}: {e}")
 
 
-def process_folder_for_import(
+def prepare_folder_import(
     folder_path: Path,
     config: Config,
-    merge_pdfs_flag: bool = True,
-    ohne_auftrag: bool = False
+    ohne_auftrag: bool = False,
+    ocr_workers: Optional[int] = None
 ) -> Dict[str, Any]:
     """
-    Verarbeitet einen Ordner für den Import.
-    
-    NEUE LOGIK:
-    - Erste PDF = Auftrag (Seite 1) → separate PDF
-    - Weitere PDFs = Anhang → kombiniert in einer Anhang-PDF
-    - Keine vollständige Zusammenführung mehr!
+    Phase 1 des Imports: OCR, Metadaten, Schlagwörter und Aufteilen.
     
-    Workflow:
-    1. Auftragsnummer aus Ordnername extrahieren
-    2. Alle PDFs im Ordner finden
-    3. MIT Auftrag: 
-       - Erste PDF → Seite 1 extrahieren = Auftrag-PDF + Metadaten
-       - Rest der ersten PDF + weitere PDFs = Anhang-PDF
-    4. OHNE Auftrag: 
-       - Alle PDFs = Anhang-PDF, nur Schlagwörter
-    5. In Datenbank eintragen
-    6. Ins Archiv verschieben
+    Schreibt nur in den Temp-Ordner des Quellordners (kein Archiv, keine
+    Datenbank) und kann daher parallel in mehreren Prozessen laufen.
     
     Args:
         folder_path: Pfad zum Ordner
         config: Config-Objekt
-        merge_pdfs_flag: DEPRECATED (wird ignoriert, neue Logik immer aktiv)
         ohne_auftrag: True = Kein Auftrag, nur Schlagwörter (Dateiname: _OA.pdf)
+        ocr_workers: Parallele OCR-Läufe (None = Config "import_ocr_workers")
     
     Returns:
-        Dictionary mit Ergebnis-Informationen
+        Vorbereiteter Import für commit_folder_import (nur picklebare Werte)
     
     Raises:
         FolderImportError: Bei Fehlern
@@ -263,7 +319,13 @@ def process_folder_for_import(
         temp_dir = folder_path / ".temp_split"
         temp_dir.mkdir(exist_ok=True)
         
-        # 3. PDFs verarbeiten (abhängig von ohne_auftrag)
+        # 3. OCR: jede PDF genau einmal, Seitenzahlen aus den OCR-Ergebnissen
+        if ocr_workers is None:
+            ocr_workers = config.get("import_ocr_workers", DEFAULT_OCR_WORKERS)
+        all_texts = ocr_pdfs(pdf_paths, ocr_workers)
+        offsets = page_offsets([len(texts) for texts in all_texts])
+        
+        # PDFs verarbeiten (abhängig von ohne_auftrag)
         keywords = {}
         auftrag_pdf = None
         daten_pdf = None
@@ -284,36 +346,22 @@ def process_folder_for_import(
                 "formular_version": "oa"
             }
             
-            page_offset = 0
-            for i, pdf_path in enumerate(pdf_paths, 1):
+            for i, (pdf_path, texts, offset) in enumerate(zip(pdf_paths, all_texts, offsets), 1):
                 logger.info(f"  [{i}] {pdf_path.name}")
                 
-                # OCR (alle Seiten)
-                texts = pdf_to_ocr_texts(pdf_path, max_pages=None)
-                
-                # Schlagwörter extrahieren
+                # Schlagwörter extrahieren, Seitenzahlen anpassen
                 pdf_keywords = extract_keywords_from_pages(texts, config.get_keywords())
-                
-                # Seitenzahlen anpassen
-                for keyword, pages in pdf_keywords.items():
-                    adjusted_pages = [p + page_offset for p in pages]
-                    if keyword in keywords:
-                        keywords[keyword].extend(adjusted_pages)
-                        keywords[keyword] = sorted(list(set(keywords[keyword])))
-                    else:
-                        keywords[keyword] = adjusted_pages
+                _merge_keywords(keywords, pdf_keywords, offset)
                 
                 logger.info(f"    → {len(pdf_keywords)} Schlagwörter")
-                page_offset += len(texts)
             
         else:
             # MIT AUFTRAG: Erste PDF = Metadaten, Rest = Schlagwörter
             main_pdf = pdf_paths[0]
             logger.info(f"\n📄 Verarbeite Hauptauftrag: {main_pdf.name}")
             
-            # OCR auf erster PDF (alle Seiten)
-            logger.info(f"⏳ Starte OCR für {main_pdf.name}...")
-            main_texts = pdf_to_ocr_texts(main_pdf, max_pages=None)
+            # OCR-Ergebnis der ersten PDF (alle Seiten)
+            main_texts = all_texts[0]
             logger.info(f"✓ OCR abgeschlossen: {len(main_texts)} Seiten erkannt")
             
             # Finde die Seite mit dem Auftrag
@@ -391,10 +439,8 @@ def process_folder_for_import(
                 
                 for i, additional_pdf in enumerate(pdf_paths[1:], 2):
                     logger.info(f"  [{i}/{len(pdf_paths)}] {additional_pdf.name}")
-                    logger.info(f"      ⏳ OCR läuft...")
                     
-                    # OCR auf weiterer PDF (alle Seiten)
-                    additional_texts = pdf_to_ocr_texts(additional_pdf, max_pages=None)
+                    additional_texts = all_texts[i - 1]
                     logger.info(f"      ✓ {len(additional_texts)} Seiten erkannt")
                     
                     # Schlagwörter extrahieren
@@ -408,16 +454,7 @@ def process_folder_for_import(
                         logger.info(f"      ℹ️  Keine Schlagwörter")
                     
                     # Schlagwörter zusammenführen (Seitenzahlen anpassen)
-                    offset = sum(len(pdf_to_ocr_texts(p, max_pages=None)) 
-                               for p in pdf_paths[:i-1])
-                    
-                    for keyword, pages in additional_keywords.items():
-                        adjusted_pages = [p + offset for p in pages]
-                        if keyword in keywords:
-                            keywords[keyword].extend(adjusted_pages)
-                            keywords[keyword] = sorted(list(set(keywords[keyword])))
-                        else:
-                            keywords[keyword] = adjusted_pages
+                    _merge_keywords(keywords, additional_keywords, offsets[i - 1])
                     
                     logger.info(f"    → {len(additional_keywords)} Schlagwörter")
         
@@ -463,6 +500,57 @@ def process_folder_for_import(
         if daten_pdf:
             logger.info(f"✓ Daten-PDF: {daten_pdf.name}")
         
+        return {
+            "folder_path": folder_path,
+            "auftrag_nr": auftrag_nr,
+            "metadata": metadata,
+            "keywords": keywords,
+            "auftrag_pdf": auftrag_pdf,
+            "daten_pdf": daten_pdf,
+            "temp_dir": temp_dir,
+            "pdf_count": len(pdf_paths),
+            "ohne_auftrag": ohne_auftrag
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Fehler beim Ordner-Import: {e}")
+        raise FolderImportError(f"Import fehlgeschlagen: {e}")
+
+
+def commit_folder_import(
+    prepared: Dict[str, Any],
+    config: Config,
+    on_archived: Optional[Callable[[Path, List[Path]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Phase 2 des Imports: Archivieren, Datenbank-Eintrag, Aufräumen.
+    
+    Muss seriell laufen (Versionsnummern im Archiv, Datenbank-Schreibzugriffe).
+    
+    Args:
+        prepared: Ergebnis von prepare_folder_import
+        config: Config-Objekt
+        on_archived: Wird nach dem Archivieren und vor dem Datenbank-Eintrag
+                     mit (Ordner, archivierte Dateien) aufgerufen, z.B. für
+                     den Checkpoint des Batch-Imports
+    
+    Returns:
+        Dictionary mit Ergebnis-Informationen
+    
+    Raises:
+        FolderImportError: Bei Fehlern
+    """
+    folder_path = prepared["folder_path"]
+    auftrag_nr = prepared["auftrag_nr"]
+    metadata = prepared["metadata"]
+    keywords = prepared["keywords"]
+    auftrag_pdf = prepared["auftrag_pdf"]
+    daten_pdf = prepared["daten_pdf"]
+    temp_dir = prepared["temp_dir"]
+    ohne_auftrag = prepared["ohne_auftrag"]
+    pdf_count = prepared["pdf_count"]
+    
+    try:
         # 6. Ins Archiv verschieben (BEIDE PDFs)
         logger.info(f"\n📦 Archivierung...")
         logger.info(f"   ⏳ Berechne Ziel-Ordner...")
@@ -472,7 +560,9 @@ def process_folder_for_import(
             "auftragsnummer_pad_length": 6,
             "use_thousand_blocks": config.config.get("use_thousand_blocks", True),
             "use_year_folders": config.config.get("use_year_folders", True),
-            "dateiname_pattern": config.config.get("dateiname_pattern", "{auftrag_nr}_Auftrag{version_suffix}.pdf")
+            "dateiname_pattern": config.config.get("dateiname_pattern", "{auftrag_nr}_Auftrag{version_suffix}.pdf"),
+            "dedup_enabled": config.config.get("dedup_enabled", False),
+            "dedup_store_dir": config.config.get("dedup_store_dir", "")
         }
         
         # Auftrag-PDF archivieren
@@ -488,6 +578,7 @@ def process_folder_for_import(
         
         # Daten-PDF archivieren (falls vorhanden)
         archive_path_daten = None
+        file_hash_daten = None
         if daten_pdf:
             logger.info(f"   ⏳ Verschiebe Daten-PDF ins Archiv...")
             
@@ -495,7 +586,7 @@ def process_folder_for_import(
             archive_config_daten = archive_config.copy()
             archive_config_daten["dateiname_pattern"] = "{auftrag_nr}_Daten{version_suffix}.pdf"
             
-            archive_path_daten, _ = move_to_archive(
+            archive_path_daten, file_hash_daten = move_to_archive(
                 daten_pdf,
                 config.get_archiv_root(),
                 auftrag_nr,
@@ -505,6 +596,8 @@ def process_folder_for_import(
             logger.info(f"   ✓ Daten archiviert: {archive_path_daten.name}")
         
         logger.info(f"   ✓ Ordner: {archive_path_auftrag.parent}")
+        if on_archived:
+            on_archived(folder_path, [p for p in (archive_path_auftrag, archive_path_daten) if p])
         
         # 7. In Datenbank eintragen
         logger.info(f"\n💾 Datenbank-Eintrag...")
@@ -518,6 +611,12 @@ def process_folder_for_import(
             file_hash_auftrag
         )
         logger.info(f"   ✓ Gespeichert mit ID: {auftrag_id}")
+        archive_manifest.record_files(
+            config.get_db_path(),
+            [archive_path_auftrag, archive_path_daten],
+            auftrag_id=auftrag_id,
+            hashes={archive_path_auftrag: file_hash_auftrag, archive_path_daten: file_hash_daten}
+        )
         
         # 8. Aufräumen: Temp-Ordner und Original-Ordner löschen
         logger.info(f"\n🧹 Räume auf...")
@@ -538,7 +637,7 @@ def process_folder_for_import(
             "success": True,
             "auftrag_nr": auftrag_nr,
             "auftrag_id": auftrag_id,
-            "pdf_count": len(pdf_paths),
+            "pdf_count": pdf_count,
             "split": not ohne_auftrag,
             "ohne_auftrag": ohne_auftrag,
             "archive_path_auftrag": str(archive_path_auftrag),
@@ -558,12 +657,150 @@ def process_folder_for_import(
         raise FolderImportError(f"Import fehlgeschlagen: {e}")
 
 
+def process_folder_for_import(
+    folder_path: Path,
+    config: Config,
+    merge_pdfs_flag: bool = True,
+    ohne_auftrag: bool = False,
+    ocr_workers: Optional[int] = None,
+    on_archived: Optional[Callable[[Path, List[Path]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Verarbeitet einen Ordner für den Import.
+    
+    NEUE LOGIK:
+    - Erste PDF = Auftrag (Seite 1) → separate PDF
+    - Weitere PDFs = Anhang → kombiniert in einer Anhang-PDF
+    - Keine vollständige Zusammenführung mehr!
+    
+    Workflow:
+    1. Auftragsnummer aus Ordnername extrahieren
+    2. Alle PDFs im Ordner finden
+    3. MIT Auftrag: 
+       - Erste PDF → Seite 1 extrahieren = Auftrag-PDF + Metadaten
+       - Rest der ersten PDF + weitere PDFs = Anhang-PDF
+    4. OHNE Auftrag: 
+       - Alle PDFs = Anhang-PDF, nur Schlagwörter
+    5. In Datenbank eintragen
+    6. Ins Archiv verschieben
+    
+    Schritte 1-4: prepare_folder_import, Schritte 5-6: commit_folder_import.
+    
+    Args:
+        folder_path: Pfad zum Ordner
+        config: Config-Objekt
+        merge_pdfs_flag: DEPRECATED (wird ignoriert, neue Logik immer aktiv)
+        ohne_auftrag: True = Kein Auftrag, nur Schlagwörter (Dateiname: _OA.pdf)
+        ocr_workers: Parallele OCR-Läufe (None = Config "import_ocr_workers")
+        on_archived: Siehe commit_folder_import
+    
+    Returns:
+        Dictionary mit Ergebnis-Informationen
+    
+    Raises:
+        FolderImportError: Bei Fehlern
+    """
+    prepared = prepare_folder_import(folder_path, config, ohne_auftrag, ocr_workers)
+    return commit_folder_import(prepared, config, on_archived)
+
+
+def _init_import_worker(config: Config) -> None:
+    """Initialisiert einen Import-Prozess (Logging, Tesseract/Poppler)."""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format='%(processName)s %(levelname)s: %(message)s')
+    import ocr
+    ocr.setup_tesseract(config.get("tesseract_cmd"))
+    ocr.setup_poppler(config.get("poppler_path"))
+
+
+def _prepare_in_worker(folder_path: Path, config: Config, ohne_auftrag: bool) -> Dict[str, Any]:
+    """Phase 1 im Worker-Prozess (eine OCR pro Prozess, die Parallelität kommt vom Pool)."""
+    start = time.monotonic()
+    prepared = prepare_folder_import(folder_path, config, ohne_auftrag, ocr_workers=1)
+    prepared["prepare_seconds"] = time.monotonic() - start
+    return prepared
+
+
+def import_folders_parallel(
+    folders: List[Path],
+    config: Config,
+    ohne_auftrag: bool = False,
+    workers: int = 2,
+    on_result: Optional[Callable[[int, Path, Dict[str, Any]], None]] = None,
+    on_archived: Optional[Callable[[Path, List[Path]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Importiert mehrere Ordner mit einem Prozess-Pool.
+    
+    OCR, Metadaten und Aufteilen (prepare_folder_import) laufen parallel in
+    `workers` Prozessen. Archivierung und Datenbank-Eintrag
+    (commit_folder_import) laufen seriell im aufrufenden Prozess, und zwar
+    in der Reihenfolge von `folders` - Versionsnummern im Archiv und die
+    Ergebnisliste sind damit unabhängig von der Laufzeit der einzelnen Ordner.
+    
+    Args:
+        folders: Zu importierende Ordner (Reihenfolge bestimmt die Verarbeitung)
+        config: Config-Objekt
+        ohne_auftrag: True = Kein Auftrag (nur Schlagwörter, _OA.pdf)
+        workers: Anzahl Prozesse
+        on_result: Wird nach jedem Ordner mit (Nr., Ordner, Ergebnis) aufgerufen
+        on_archived: Siehe commit_folder_import
+    
+    Returns:
+        Liste mit Ergebnissen für jeden Ordner (gleiche Reihenfolge wie folders),
+        jeweils mit "seconds" (Vorbereitung im Worker + Archivierung)
+    """
+    results = []
+    workers = max(1, min(workers, len(folders)))
+    logger.info(f"Starte Import mit {workers} Prozessen ({len(folders)} Ordner)")
+    
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_import_worker,
+        initargs=(config,)
+    ) as executor:
+        # Begrenzter Vorlauf: nur so viele Ordner vorbereiten, wie die serielle
+        # Archivierung bald abholt (sonst stauen sich Split-PDFs in .temp_split)
+        window = workers * 2
+        futures: Deque[Any] = deque()
+        pending = iter(folders)
+        for folder in itertools.islice(pending, window):
+            futures.append(executor.submit(_prepare_in_worker, folder, config, ohne_auftrag))
+        
+        for index, folder in enumerate(folders, 1):
+            future = futures.popleft()
+            seconds = 0.0
+            try:
+                prepared = future.result()
+                seconds = prepared.get("prepare_seconds", 0.0)
+                commit_start = time.monotonic()
+                result = commit_folder_import(prepared, config, on_archived)
+                seconds += time.monotonic() - commit_start
+            except Exception as e:
+                logger.error(f"❌ Fehler bei {folder.name}: {e}")
+                result = {
+                    "success": False,
+                    "folder": folder.name,
+                    "error": str(e)
+                }
+            result.setdefault("folder", folder.name)
+            result["seconds"] = round(seconds, 3)
+            results.append(result)
+            if on_result:
+                on_result(index, folder, result)
+            for next_folder in itertools.islice(pending, 1):
+                futures.append(executor.submit(_prepare_in_worker, next_folder, config, ohne_auftrag))
+    
+    return results
+
+
 def import_multiple_folders(
     root_path: Path,
     config: Config,
     merge_pdfs_flag: bool = True,
     ohne_auftrag: bool = False,
-    dry_run: bool = False
+    dry_run: bool = False,
+    workers: int = 1
 ) -> List[Dict[str, Any]]:
     """
     Importiert alle Ordner in einem Verzeichnis.
@@ -574,6 +811,7 @@ def import_multiple_folders(
         merge_pdfs_flag: PDFs zusammenfügen?
         ohne_auftrag: True = Kein Auftrag (nur Schlagwörter, _OA.pdf)
         dry_run: Nur Simulation ohne tatsächlichen Import
+        workers: Parallele Import-Prozesse (1 = nacheinander)
     
     Returns:
         Liste mit Ergebnissen für jeden Ordner
@@ -582,7 +820,7 @@ def import_multiple_folders(
         raise FolderImportError(f"Kein gültiges Verzeichnis: {root_path}")
     
     # Alle Unterordner finden
-    folders = [f for f in root_path.iterdir() if f.is_dir()]
+    folders = sorted(f for f in root_path.iterdir() if f.is_dir())
     
     if not folders:
         logger.warning(f"Keine Ordner gefunden in: {root_path}")
@@ -590,9 +828,15 @@ def import_multiple_folders(
     
     logger.info(f"Gefunden: {len(folders)} Ordner")
     
-    results = []
-    success_count = 0
-    error_count = 0
+    if workers > 1 and not dry_run:
+        results = import_folders_parallel(folders, config, ohne_auftrag, workers)
+        success_count = sum(1 for r in results if r.get("success"))
+        error_count = len(results) - success_count
+        folders = []  # Bereits verarbeitet
+    else:
+        results = []
+        success_count = 0
+        error_count = 0
     
     for folder in folders:
         try:
@@ -629,7 +873,7 @@ def import_multiple_folders(
     logger.info(f"\n" + "=" * 60)
     logger.info(f"ZUSAMMENFASSUNG")
     logger.info(f"=" * 60)
-    logger.info(f"Gesamt:       {len(folders)}")
+    logger.info(f"Gesamt:       {len(results)}")
     logger.info(f"Erfolgreich:  {success_count}")
     logger.info(f"Fehler:       {error_count}")
     
@@ -639,6 +883,9 @@ def import_multiple_folders(
 if __name__ == "__main__":
     import sys
     
+    # Prozess-Pool in der gebündelten Windows-EXE
+    multiprocessing.freeze_support()
+    
     logging.basicConfig(
         level=logging.INFO,
         format='%(levelname)s: %(message)s'
@@ -656,6 +903,7 @@ if __name__ == "__main__":
         print("    --no-merge    : PDFs NICHT zusammenfügen")
         print("    --oa          : OHNE AUFTRAG (nur Schlagwörter, Dateiname: _OA.pdf)")
         print("    --dry-run     : Simulation ohne Import")
+        print("    --workers=N   : N Ordner parallel importieren (nur mit --batch)")
         print()
         print("  Beispiele:")
         print("    python3 folder_import.py 076329/")
@@ -673,10 +921,15 @@ if __name__ == "__main__":
     # Config laden
     config = Config()
     
+    workers = config.get("import_workers", 1)
+    for arg in sys.argv:
+        if arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+    
     try:
         if batch_mode:
             # Mehrere Ordner
-            import_multiple_folders(folder_path, config, merge, ohne_auftrag, dry_run)
+            import_multiple_folders(folder_path, config, merge, ohne_auftrag, dry_run, workers)
         else:
             # Einzelner Ordner
             if dry_run:
@@ -0,0 +1,166 @@
+"""
+Schnelles Durchsuchen von Ordnerstrukturen nach PDF-Ordnern.
+
+Gemeinsame Grundlage für den Batch-Import (find_order_folders), die
+Ordnerliste der Web-UI (/api/folders/list) und den manuellen Scan.
+
+Jeder Ordner wird genau einmal mit os.scandir aufgelistet: derselbe Durchlauf
+zählt die PDFs und findet die Unterordner. Unter Windows liefert scandir den
+Dateityp ohne zusätzliche Anfrage pro Eintrag mit - auf einer SMB-Freigabe
+mit zehntausenden Ordnern ist das der Unterschied zwischen Sekunden und
+Minuten. Ergebnisse werden als Generator geliefert, ignorierte Ordner
+(Fehler, .trash, temp_backup, versteckte Ordner) werden gar nicht erst betreten.
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Ordner, die nie als Auftragsordner gelten und nicht durchsucht werden
+IGNORED_DIRS = frozenset({'Fehler', '.trash', 'temp_backup'})
+
+PDF_SUFFIX = '.pdf'
+
+
+class PDFFolder(NamedTuple):
+    """Ein Ordner mit PDFs."""
+    path: Path
+    pdf_count: int  # Bei count=False nur 1 (= "mindestens eine PDF")
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+def is_ignored(name: str) -> bool:
+    """True für versteckte und spezielle Ordner (Fehler, .trash, temp_backup)."""
+    return name.startswith('.') or name in IGNORED_DIRS
+
+
+def is_pdf_name(name: str) -> bool:
+    """True für Dateinamen mit Endung .pdf (Groß-/Kleinschreibung egal, z.B. SCAN.PDF)."""
+    return name.lower().endswith(PDF_SUFFIX)
+
+
+def _scan_dir(folder: Path, limit: Optional[int] = None, want_subdirs: bool = False) -> Tuple[int, List[Path]]:
+    """
+    Listet einen Ordner einmal auf.
+
+    Args:
+        folder: Ordner
+        limit: Zählen nach so vielen PDFs beenden (None = alle zählen);
+               wird ignoriert, wenn Unterordner gebraucht werden
+        want_subdirs: Auch die (nicht ignorierten) Unterordner liefern
+
+    Returns:
+        (Anzahl PDFs, Unterordner)
+    """
+    pdf_count = 0
+    subdirs: List[Path] = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if is_pdf_name(entry.name):
+                        if entry.is_file():
+                            pdf_count += 1
+                            if limit is not None and not want_subdirs and pdf_count >= limit:
+                                break
+                    elif want_subdirs and not is_ignored(entry.name) and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(Path(entry.path))
+                except OSError:
+                    # Eintrag zwischen Auflisten und Prüfen verschwunden
+                    continue
+    except OSError as e:
+        logger.debug(f"Ordner nicht lesbar, übersprungen: {folder} ({e})")
+    return pdf_count, subdirs
+
+
+def count_pdfs(folder: Path, limit: Optional[int] = None) -> int:
+    """
+    Zählt die PDFs direkt in einem Ordner.
+
+    Args:
+        folder: Ordner
+        limit: Nach so vielen PDFs aufhören (z.B. 1 für "gibt es PDFs?")
+
+    Returns:
+        Anzahl PDFs (höchstens limit)
+    """
+    return _scan_dir(folder, limit)[0]
+
+
+def list_pdfs(folder: Path) -> List[Path]:
+    """
+    Listet die PDFs direkt in einem Ordner (gleiche Erkennung wie count_pdfs).
+
+    Args:
+        folder: Ordner
+
+    Returns:
+        PDF-Pfade, sortiert nach Name
+    """
+    pdfs = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if is_pdf_name(entry.name) and entry.is_file():
+                    pdfs.append(Path(entry.path))
+            except OSError:
+                continue
+    return sorted(pdfs)
+
+
+def has_pdfs(folder: Path) -> bool:
+    """True, wenn der Ordner mindestens eine PDF enthält (bricht beim ersten Treffer ab)."""
+    return count_pdfs(folder, limit=1) > 0
+
+
+def iter_pdf_folders(
+    root: Path,
+    recursive: bool = False,
+    count: bool = True,
+    name_filter: Optional[Callable[[str], bool]] = None
+) -> Iterator[PDFFolder]:
+    """
+    Liefert Unterordner von root, die PDFs enthalten.
+
+    Nicht rekursiv: nur direkte Unterordner; ein Ordner, der name_filter nicht
+    erfüllt, wird nicht einmal aufgelistet. Rekursiv: alle Ebenen, jeder Ordner
+    wird genau einmal aufgelistet (PDFs zählen und Unterordner finden in einem
+    Durchlauf); name_filter entscheidet nur, ob ein Ordner geliefert wird.
+    Symbolische Links auf Ordner werden beim rekursiven Abstieg nicht verfolgt.
+
+    Args:
+        root: Startverzeichnis (wird selbst nicht geliefert)
+        recursive: Alle Ebenen durchsuchen
+        count: PDFs vollständig zählen; False = nur prüfen, ob es PDFs gibt
+               (pdf_count ist dann 1)
+        name_filter: Nur Ordner liefern, deren Name diese Bedingung erfüllt
+
+    Yields:
+        PDFFolder in Namensreihenfolge (rekursiv: Tiefensuche)
+    """
+    limit = None if count else 1
+    _, children = _scan_dir(root, want_subdirs=True)
+
+    if not recursive:
+        for child in sorted(children):
+            if name_filter and not name_filter(child.name):
+                continue
+            pdf_count = _scan_dir(child, limit)[0]
+            if pdf_count:
+                yield PDFFolder(child, pdf_count)
+        return
+
+    stack = sorted(children, reverse=True)
+    while stack:
+        folder = stack.pop()
+        pdf_count, subdirs = _scan_dir(folder, want_subdirs=True)
+        if pdf_count and (not name_filter or name_filter(folder.name)):
+            yield PDFFolder(folder, pdf_count if count else 1)
+        stack.extend(sorted(subdirs, reverse=True))
@@ -0,0 +1,397 @@
+"""
+Checkpoint-Manifest für den Batch-Import.
+
+Jeder verarbeitete Ordner bekommt eine Zeile in einer JSON-Lines-Datei:
+
+    {"key": "...", "folder": "...", "status": "done", "fingerprint": "...", "auftrag_id": 42,
+     "auftrag_nr": "076329", "year": "2024", "seconds": 12.3, "pdf_count": 3,
+     "error": null, "finished_at": "2025-..."}
+
+Die Datei wird nur angehängt (eine Zeile pro Ergebnis, sofort geschrieben und
+mit fsync gesichert). Bricht ein Lauf ab, steht darin genau, welche Ordner
+erledigt sind. Beim Laden gewinnt die letzte Zeile pro Ordner, eine
+abgeschnittene letzte Zeile (Stromausfall) wird ignoriert.
+
+Vor dem Datenbank-Eintrag eines Ordners steht eine Zeile mit Status
+"committing" und den bereits archivierten Dateien. Bricht der Lauf zwischen
+Datenbank-Commit und "done" ab, löst `recover` das beim nächsten Start auf
+(wie das ingest_journal für den Watcher): Gibt es den Auftrag schon, wird
+der Ordner als erledigt eingetragen und gelöscht (kein doppelter Auftrag);
+sonst werden die archivierten Dateien entfernt und der Ordner gilt als
+fehlgeschlagen.
+
+Mit `--resume` werden erledigte Ordner per Dictionary-Lookup übersprungen,
+fehlgeschlagene erneut versucht. Liegt ein erledigter Ordner noch vor und hat
+sich sein Inhalt seit dem Import geändert (Prüfsumme, z.B. PDFs ergänzt oder
+ersetzt), wird er erneut importiert.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Standard-Dateiname (im Archiv-Root)
+DEFAULT_FILENAME = "batch_import_checkpoint.jsonl"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_COMMITTING = "committing"
+
+_YEAR_PATTERN = re.compile(r'^(19|20)\d{2}$')
+
+
+class ImportCheckpointError(Exception):
+    """Fehler beim Lesen/Schreiben des Checkpoint-Manifests."""
+    pass
+
+
+def folder_key(folder: Path) -> str:
+    """Eindeutiger Schlüssel eines Ordners (absoluter, normalisierter Pfad)."""
+    return os.path.normcase(os.path.abspath(str(folder)))
+
+
+def folder_fingerprint(folder: Path) -> str:
+    """
+    Prüfsumme über den Inhalt eines Ordners.
+
+    Gebildet aus Name, Größe und Änderungszeit aller PDFs (ein scandir, kein
+    Lesen der Dateien) - über SMB deutlich billiger als die PDFs zu hashen,
+    und jede Änderung an einer PDF ändert Größe oder Änderungszeit.
+
+    Args:
+        folder: Auftragsordner
+
+    Returns:
+        SHA1-Hex-String (leer, wenn der Ordner nicht lesbar ist)
+    """
+    entries = []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name.lower().endswith('.pdf') and entry.is_file():
+                    stat = entry.stat()
+                    entries.append(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    except OSError as e:
+        logger.debug(f"Prüfsumme für {folder} nicht möglich: {e}")
+        return ""
+    digest = hashlib.sha1()
+    for line in sorted(entries):
+        digest.update(line.encode('utf-8', 'surrogateescape'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def folder_year(folder: Path, fallback: Optional[int] = None) -> str:
+    """
+    Ermittelt das Jahr eines Ordners aus dem Pfad (z.B. Import/2024/076329).
+
+    Args:
+        folder: Auftragsordner
+        fallback: Jahr, falls keine Pfadkomponente wie ein Jahr aussieht
+
+    Returns:
+        Jahr als String oder "unbekannt"
+    """
+    for part in reversed(folder.parts[:-1]):
+        if _YEAR_PATTERN.match(part):
+            return part
+    return str(fallback) if fallback else "unbekannt"
+
+
+class ImportCheckpoint:
+    """Append-only Manifest der Batch-Import-Ergebnisse."""
+
+    def __init__(self, path: Path):
+        """
+        Lädt ein vorhandenes Manifest (oder beginnt ein neues).
+
+        Args:
+            path: Pfad zur JSON-Lines-Datei
+        """
+        self.path = Path(path)
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._needs_newline = False
+        self._load()
+
+    def _load(self) -> None:
+        """Liest alle Zeilen ein; die letzte Zeile pro Ordner gilt."""
+        if not self.path.exists():
+            return
+        skipped = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._needs_newline = not line.endswith("\n")
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                        self._records[record['key']] = record
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+        except OSError as e:
+            raise ImportCheckpointError(f"Checkpoint nicht lesbar: {self.path} ({e})")
+        if skipped:
+            logger.warning(f"⚠️  Checkpoint: {skipped} beschädigte Zeile(n) ignoriert")
+        logger.debug(f"Checkpoint geladen: {len(self._records)} Ordner aus {self.path}")
+
+    def get(self, folder: Path) -> Optional[Dict[str, Any]]:
+        """Letzter Eintrag eines Ordners (oder None)."""
+        return self._records.get(folder_key(folder))
+
+    def is_done(self, folder: Path, fingerprint: Optional[str] = None) -> bool:
+        """
+        True, wenn der Ordner bereits erfolgreich importiert wurde (O(1)).
+
+        Args:
+            folder: Auftragsordner
+            fingerprint: Aktuelle Prüfsumme (folder_fingerprint); weicht sie
+                         von der beim Import gespeicherten ab, gilt der Ordner
+                         als nicht erledigt
+        """
+        record = self._records.get(folder_key(folder))
+        if record is None or record.get('status') != STATUS_DONE:
+            return False
+        saved = record.get('fingerprint')
+        return not (fingerprint and saved and fingerprint != saved)
+
+    def pending(self, folders: Iterable[Path], check_fingerprint: bool = True) -> List[Path]:
+        """
+        Filtert bereits erledigte Ordner heraus (Reihenfolge bleibt erhalten).
+
+        Args:
+            folders: Gefundene Auftragsordner
+            check_fingerprint: Erledigte Ordner auf Änderungen seit dem Import
+                               prüfen (ein scandir pro erledigtem Ordner)
+
+        Returns:
+            Noch zu importierende Ordner (inkl. geänderter)
+        """
+        result = []
+        changed = 0
+        for folder in folders:
+            if not self.is_done(folder):
+                result.append(folder)
+                continue
+            if check_fingerprint and not self.is_done(folder, folder_fingerprint(folder)):
+                logger.warning(f"⚠️  {folder}: Inhalt seit dem Import geändert - wird erneut importiert")
+                changed += 1
+                result.append(folder)
+        if changed:
+            logger.warning(f"⚠️  {changed} bereits importierte Ordner haben sich geändert")
+        return result
+
+    def record(
+        self,
+        folder: Path,
+        result: Dict[str, Any],
+        fingerprint: str = "",
+        seconds: Optional[float] = None,
+        year: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Schreibt das Ergebnis eines Ordners (sofort auf die Platte).
+
+        Args:
+            folder: Auftragsordner
+            result: Ergebnis von process_folder_for_import/import_folders_parallel
+            fingerprint: Prüfsumme vor dem Import (folder_fingerprint)
+            seconds: Verarbeitungsdauer
+            year: Jahr für den Durchsatz-Bericht (Standard: aus dem Pfad)
+
+        Returns:
+            Der geschriebene Eintrag
+
+        Raises:
+            ImportCheckpointError: Wenn die Datei nicht beschreibbar ist
+        """
+        record = {
+            "key": folder_key(folder),
+            "folder": str(folder),
+            "status": STATUS_DONE if result.get('success') else STATUS_FAILED,
+            "fingerprint": fingerprint,
+            "auftrag_id": result.get('auftrag_id'),
+            "auftrag_nr": result.get('auftrag_nr'),
+            "pdf_count": result.get('pdf_count'),
+            "year": year or folder_year(folder),
+            "seconds": round(seconds, 3) if seconds is not None else result.get('seconds'),
+            "error": None if result.get('success') else result.get('error', 'Unbekannter Fehler'),
+            "finished_at": datetime.now().isoformat(timespec='seconds')
+        }
+        self._append(record)
+        return record
+
+    def begin_commit(
+        self,
+        folder: Path,
+        archived_paths: Iterable[Optional[Path]],
+        auftrag_nr: Optional[str] = None,
+        fingerprint: str = "",
+        year: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Vermerkt einen Ordner direkt vor dem Datenbank-Eintrag.
+
+        Args:
+            folder: Auftragsordner
+            archived_paths: Bereits ins Archiv verschobene Dateien
+                            (die erste ist die im Auftrag gespeicherte)
+            auftrag_nr: Auftragsnummer
+            fingerprint: Prüfsumme vor dem Import (folder_fingerprint)
+            year: Jahr für den Durchsatz-Bericht (Standard: aus dem Pfad)
+
+        Returns:
+            Der geschriebene Eintrag
+
+        Raises:
+            ImportCheckpointError: Wenn die Datei nicht beschreibbar ist
+        """
+        record = {
+            "key": folder_key(folder),
+            "folder": str(folder),
+            "status": STATUS_COMMITTING,
+            "fingerprint": fingerprint,
+            "auftrag_nr": auftrag_nr,
+            "archived_paths": [str(p) for p in archived_paths if p],
+            "year": year or folder_year(folder),
+            "finished_at": datetime.now().isoformat(timespec='seconds')
+        }
+        self._append(record)
+        return record
+
+    def recover(self, db_path: Path) -> Dict[str, int]:
+        """
+        Löst Ordner auf, deren Import zwischen Archivierung und "done" abbrach.
+
+        Args:
+            db_path: Pfad zur werkstatt.db
+
+        Returns:
+            Statistik (completed, rolled_back)
+        """
+        stats = {'completed': 0, 'rolled_back': 0}
+        for record in self.records():
+            if record.get('status') != STATUS_COMMITTING:
+                continue
+            folder = Path(record['folder'])
+            archived = [Path(p) for p in record.get('archived_paths') or []]
+            auftrag_id = _find_auftrag_id(db_path, archived[0]) if archived else None
+            result = {
+                "success": bool(auftrag_id),
+                "auftrag_id": auftrag_id,
+                "auftrag_nr": record.get('auftrag_nr')
+            }
+            if auftrag_id:
+                # Auftrag ist gespeichert: nur das Löschen des Ordners nachholen
+                logger.info(f"♻️  {folder.name}: bereits als Auftrag {auftrag_id} gespeichert")
+                if folder.exists() and folder_fingerprint(folder) == record.get('fingerprint'):
+                    shutil.rmtree(folder, ignore_errors=True)
+                    logger.info(f"  Ordner gelöscht: {folder.name}")
+                stats['completed'] += 1
+            else:
+                for path in archived:
+                    if path.exists():
+                        path.unlink()
+                        logger.info(f"  Rollback: {path.name} aus dem Archiv entfernt")
+                result["error"] = "Unterbrochen vor dem Datenbank-Eintrag"
+                stats['rolled_back'] += 1
+            self.record(folder, result, fingerprint=record.get('fingerprint') or "", year=record.get('year'))
+        if stats['completed'] or stats['rolled_back']:
+            logger.info(f"♻️  Checkpoint: {stats['completed']} unterbrochene Ordner abgeschlossen, "
+                        f"{stats['rolled_back']} zurückgerollt")
+        return stats
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Hängt einen Eintrag an (fsync) und übernimmt ihn in den Speicher."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    if self._needs_newline:
+                        # Abgeschnittene letzte Zeile eines abgebrochenen Laufs abschließen
+                        f.write("\n")
+                        self._needs_newline = False
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                raise ImportCheckpointError(f"Checkpoint nicht beschreibbar: {self.path} ({e})")
+            self._records[record['key']] = record
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Alle aktuellen Einträge (ein Eintrag pro Ordner)."""
+        with self._lock:
+            return list(self._records.values())
+
+    def throughput_by_year(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Durchsatz-Bericht pro Jahr.
+
+        Returns:
+            {Jahr: {"done", "failed", "pdfs", "seconds", "folders_per_minute"}}
+        """
+        report: Dict[str, Dict[str, Any]] = {}
+        for record in self.records():
+            year = record.get('year') or "unbekannt"
+            stats = report.setdefault(year, {"done": 0, "failed": 0, "pdfs": 0, "seconds": 0.0})
+            if record.get('status') == STATUS_DONE:
+                stats["done"] += 1
+                stats["pdfs"] += record.get('pdf_count') or 0
+            else:
+                stats["failed"] += 1
+            stats["seconds"] += record.get('seconds') or 0.0
+
+        for stats in report.values():
+            total = stats["done"] + stats["failed"]
+            stats["seconds"] = round(stats["seconds"], 1)
+            stats["folders_per_minute"] = round(total * 60 / stats["seconds"], 2) if stats["seconds"] else 0.0
+        return dict(sorted(report.items()))
+
+    def log_report(self) -> None:
+        """Gibt den Durchsatz-Bericht pro Jahr im Log aus."""
+        report = self.throughput_by_year()
+        if not report:
+            logger.info("Checkpoint enthält noch keine Ordner")
+            return
+        logger.info(f"{'Jahr':<10} {'Erledigt':>9} {'Fehler':>7} {'PDFs':>7} {'Dauer':>10} {'Ordner/min':>11}")
+        for year, stats in report.items():
+            logger.info(
+                f"{year:<10} {stats['done']:>9} {stats['failed']:>7} {stats['pdfs']:>7} "
+                f"{stats['seconds']:>9.1f}s {stats['folders_per_minute']:>11.2f}"
+            )
+
+
+def _find_auftrag_id(db_path: Path, file_path: Path) -> Optional[int]:
+    """Sucht den Auftrag zu einer archivierten Datei (Absturz direkt nach dem Insert)."""
+    import db
+
+    conn = db._get_optimized_connection(db_path)
+    try:
+        row = conn.execute(
+            'SELECT id FROM auftraege WHERE file_path = ? ORDER BY id DESC LIMIT 1', (str(file_path),)
+        ).fetchone()
+        return row['id'] if row else None
+    except sqlite3.OperationalError:
+        # auftraege-Tabelle existiert noch nicht
+        return None
+    finally:
+        conn.close()
+
+
+def default_path(config) -> Path:
+    """Standard-Pfad des Manifests (im Archiv-Root, neben werkstatt.db)."""
+    return config.get_archiv_root() / DEFAULT_FILENAME
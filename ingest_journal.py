@@ -0,0 +1,443 @@
+"""
+Crash-sicheres Verarbeitungs-Journal für eingehende PDFs.
+
+Jede Datei aus dem Eingangsordner bekommt einen Eintrag in der Tabelle
+`ingest_journal` (in werkstatt.db), der die Verarbeitungsschritte festhält:
+
+    ocr -> split -> archiving -> db -> indexed -> done
+                                         \\-> failed / rolled_back
+
+Beim Start (Watcher, Batch-Modus) werden unterbrochene Einträge aufgelöst:
+- Datenbankeintrag existiert bereits: Abschluss nachholen (Kunden-Index,
+  Original löschen, Temp-Ordner entfernen) - nichts wird doppelt archiviert.
+- Sonst: Zurückrollen (bereits archivierte Teil-PDFs und Temp-Ordner löschen);
+  das Original liegt noch im Eingangsordner und wird neu eingereiht.
+
+Einträge laufender Prozesse (gleicher Rechner, PID lebt) werden nicht angefasst.
+"""
+
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+import db
+
+logger = logging.getLogger(__name__)
+
+
+# Verarbeitungsschritte in Reihenfolge
+STAGES = ('ocr', 'split', 'archiving', 'db', 'indexed', 'done')
+TERMINAL_STAGES = ('done', 'failed', 'rolled_back')
+
+# Einträge anderer Rechner gelten erst nach dieser Zeit ohne Fortschritt als verwaist
+FOREIGN_STALE_AFTER = timedelta(hours=6)
+
+# Kennung dieses Prozesses
+HOSTNAME = socket.gethostname()
+OWNER_PID = os.getpid()
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+class IngestJournalError(Exception):
+    """Fehler im Verarbeitungs-Journal."""
+    pass
+
+
+def _ensure_table(db_path: Path) -> None:
+    """Legt die Journal-Tabelle einmal pro Prozess an."""
+    key = str(db_path)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = db._get_optimized_connection(db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_journal (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source_path TEXT NOT NULL,
+                    source_size INTEGER,
+                    source_mtime_ns INTEGER,
+                    stage TEXT NOT NULL,
+                    auftrag_nr TEXT,
+                    temp_dir TEXT,
+                    archived_paths TEXT NOT NULL DEFAULT '[]',
+                    auftrag_id INTEGER,
+                    kunden_entry TEXT,
+                    error TEXT,
+                    hostname TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ingest_journal_stage ON ingest_journal(stage)
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+def _pid_alive(pid: int) -> bool:
+    """Prüft, ob ein Prozess auf diesem Rechner noch läuft."""
+    if pid == OWNER_PID:
+        return True
+    if os.name == 'nt':
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _stat_identity(path: Path) -> Optional[tuple]:
+    """(Größe, mtime_ns) einer Datei oder None, wenn sie fehlt."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class IngestJournal:
+    """Schreibt und liest das Verarbeitungs-Journal einer Datenbank."""
+
+    def __init__(self, db_path: Path):
+        """
+        Initialisiert das Journal.
+
+        Args:
+            db_path: Pfad zu werkstatt.db
+        """
+        self.db_path = Path(db_path)
+        _ensure_table(self.db_path)
+
+    # --------------------------------------------------------
+    # Schreiben (während der Verarbeitung)
+    # --------------------------------------------------------
+
+    def begin(self, source_path: Path) -> int:
+        """
+        Legt einen Eintrag für eine neue Datei an (Schritt "ocr").
+
+        Args:
+            source_path: PDF im Eingangsordner
+
+        Returns:
+            ID des Journal-Eintrags
+        """
+        identity = _stat_identity(source_path) or (None, None)
+        now = datetime.now().isoformat()
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            db._begin_write(conn)
+            cursor = conn.execute('''
+                INSERT INTO ingest_journal (
+                    source_path, source_size, source_mtime_ns, stage,
+                    hostname, pid, created_at, updated_at
+                ) VALUES (?, ?, ?, 'ocr', ?, ?, ?, ?)
+            ''', (str(source_path), identity[0], identity[1], HOSTNAME, OWNER_PID, now, now))
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def advance(self, entry_id: int, stage: str, **fields: Any) -> None:
+        """
+        Setzt den nächsten Schritt und optionale Felder.
+
+        Args:
+            entry_id: Journal-ID
+            stage: Neuer Schritt (siehe STAGES / TERMINAL_STAGES)
+            **fields: auftrag_nr, temp_dir, auftrag_id, kunden_entry, error
+        """
+        if stage not in STAGES and stage not in TERMINAL_STAGES:
+            raise IngestJournalError(f"Unbekannter Schritt: {stage}")
+        allowed = {'auftrag_nr', 'temp_dir', 'auftrag_id', 'kunden_entry', 'error'}
+        unknown = set(fields) - allowed
+        if unknown:
+            raise IngestJournalError(f"Unbekannte Felder: {', '.join(sorted(unknown))}")
+
+        assignments = ['stage = ?', 'updated_at = ?']
+        params: List[Any] = [stage, datetime.now().isoformat()]
+        for name, value in fields.items():
+            if name == 'kunden_entry' and value is not None:
+                value = json.dumps(value, ensure_ascii=False)
+            assignments.append(f'{name} = ?')
+            params.append(str(value) if isinstance(value, Path) else value)
+        params.append(entry_id)
+
+        self._execute_write(f"UPDATE ingest_journal SET {', '.join(assignments)} WHERE id = ?", params)
+
+    def add_archived(self, entry_id: int, path: Path) -> None:
+        """Merkt sich eine ins Archiv verschobene Datei (für Rollback)."""
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            db._begin_write(conn)
+            row = conn.execute('SELECT archived_paths FROM ingest_journal WHERE id = ?', (entry_id,)).fetchone()
+            paths = json.loads(row['archived_paths']) if row else []
+            paths.append(str(path))
+            conn.execute(
+                'UPDATE ingest_journal SET archived_paths = ?, updated_at = ? WHERE id = ?',
+                (json.dumps(paths, ensure_ascii=False), datetime.now().isoformat(), entry_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute_write(self, sql: str, params: List[Any]) -> None:
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            db._begin_write(conn)
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --------------------------------------------------------
+    # Lesen
+    # --------------------------------------------------------
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Einzelner Eintrag als Dict."""
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            row = conn.execute('SELECT * FROM ingest_journal WHERE id = ?', (entry_id,)).fetchone()
+            return self._row_to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def incomplete(self) -> List[Dict[str, Any]]:
+        """Alle Einträge, die nicht abgeschlossen sind."""
+        placeholders = ','.join('?' * len(TERMINAL_STAGES))
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            rows = conn.execute(
+                f'SELECT * FROM ingest_journal WHERE stage NOT IN ({placeholders}) ORDER BY id',
+                TERMINAL_STAGES
+            ).fetchall()
+            return [self._row_to_dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    def failed_sources(self) -> Dict[str, tuple]:
+        """Fehlgeschlagene Quellen (Pfad -> (Größe, mtime_ns)) zum Überspringen beim Start."""
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT source_path, source_size, source_mtime_ns FROM ingest_journal WHERE stage = 'failed'"
+            ).fetchall()
+            return {r['source_path']: (r['source_size'], r['source_mtime_ns']) for r in rows}
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['archived_paths'] = json.loads(entry.get('archived_paths') or '[]')
+        if entry.get('kunden_entry'):
+            entry['kunden_entry'] = json.loads(entry['kunden_entry'])
+        return entry
+
+    # --------------------------------------------------------
+    # Wiederherstellung
+    # --------------------------------------------------------
+
+    def is_orphaned(self, entry: Dict[str, Any]) -> bool:
+        """Ob der verarbeitende Prozess nicht mehr läuft."""
+        if entry['hostname'] == HOSTNAME:
+            return not _pid_alive(entry['pid'])
+        updated = datetime.fromisoformat(entry['updated_at'])
+        return datetime.now() - updated > FOREIGN_STALE_AFTER
+
+    def resolve(self, entry: Dict[str, Any], failed: bool = False, error: Optional[str] = None) -> str:
+        """
+        Schließt einen unterbrochenen Eintrag ab oder rollt ihn zurück.
+
+        Args:
+            entry: Journal-Eintrag
+            failed: Zurückgerollte Einträge als "failed" markieren (Datei wird
+                    beim nächsten Start nicht erneut eingereiht)
+            error: Fehlermeldung für das Journal
+
+        Returns:
+            "completed", "rolled_back" oder "failed"
+        """
+        source = Path(entry['source_path'])
+        same_source = _stat_identity(source) == (entry['source_size'], entry['source_mtime_ns'])
+        auftrag_id = entry.get('auftrag_id') or self._find_auftrag_id(entry)
+
+        if auftrag_id:
+            # Datenbankeintrag existiert: nur noch den Abschluss nachholen
+            if entry['stage'] not in ('indexed', 'done') and entry.get('kunden_entry'):
+                self._update_kunden_index(entry['kunden_entry'])
+            if same_source:
+                source.unlink()
+                logger.info(f"  Original-PDF gelöscht: {source.name}")
+            self._remove_temp_dir(entry)
+            self.advance(entry['id'], 'done', auftrag_id=auftrag_id)
+            return 'completed'
+
+        # Noch nicht in der Datenbank: archivierte Teil-PDFs entfernen
+        for archived in entry['archived_paths']:
+            path = Path(archived)
+            if path.exists():
+                path.unlink()
+                logger.info(f"  Rollback: {path.name} aus dem Archiv entfernt")
+        self._remove_temp_dir(entry)
+
+        stage = 'failed' if failed else 'rolled_back'
+        self.advance(entry['id'], stage, error=error or f"Unterbrochen im Schritt '{entry['stage']}'")
+        return stage
+
+    def recover(self) -> Dict[str, int]:
+        """
+        Löst alle verwaisten Einträge auf.
+
+        Returns:
+            Statistik (completed, rolled_back, skipped)
+        """
+        stats = {'completed': 0, 'rolled_back': 0, 'skipped': 0}
+        for entry in self.incomplete():
+            if not self.is_orphaned(entry):
+                stats['skipped'] += 1
+                continue
+            logger.info(f"♻️  Unterbrochene Verarbeitung: {Path(entry['source_path']).name} "
+                        f"(Schritt '{entry['stage']}')")
+            try:
+                result = self.resolve(entry)
+            except Exception as e:
+                logger.error(f"Wiederherstellung von Journal-Eintrag {entry['id']} fehlgeschlagen: {e}")
+                continue
+            stats[result if result in stats else 'rolled_back'] += 1
+        return stats
+
+    def _find_auftrag_id(self, entry: Dict[str, Any]) -> Optional[int]:
+        """Sucht den Auftrag zu einer archivierten Datei (Absturz direkt nach dem Insert)."""
+        if not entry['archived_paths']:
+            return None
+        conn = db._get_optimized_connection(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT id FROM auftraege WHERE file_path = ? ORDER BY id DESC LIMIT 1',
+                (entry['archived_paths'][0],)
+            ).fetchone()
+            return row['id'] if row else None
+        except sqlite3.OperationalError:
+            # auftraege-Tabelle existiert noch nicht
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _update_kunden_index(kunden_entry: Dict[str, Any]) -> None:
+        """Holt den Kunden-Index-Eintrag nach ({"index_path": ..., "entry": {...}})."""
+        import kunden_index
+        kunden_index.update_kunden_index(Path(kunden_entry['index_path']), kunden_entry['entry'])
+
+    @staticmethod
+    def _remove_temp_dir(entry: Dict[str, Any]) -> None:
+        temp_dir = entry.get('temp_dir')
+        if temp_dir and Path(temp_dir).exists():
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def cleanup_temp_dirs(input_folder: Path, journal: IngestJournal) -> int:
+    """
+    Entfernt verwaiste `.temp_<nr>`-Ordner im Eingangsordner.
+
+    Ordner, die zu einer laufenden Verarbeitung gehören, bleiben erhalten.
+
+    Returns:
+        Anzahl gelöschter Ordner
+    """
+    active = {
+        os.path.normcase(str(e['temp_dir']))
+        for e in journal.incomplete()
+        if e.get('temp_dir') and not journal.is_orphaned(e)
+    }
+    removed = 0
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if not entry.name.startswith('.temp_') or not entry.is_dir(follow_symlinks=False):
+                continue
+            if os.path.normcase(entry.path) in active:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            logger.info(f"🧹 Verwaister Temp-Ordner entfernt: {entry.name}")
+            removed += 1
+    return removed
+
+
+def startup(db_path: Path, input_folder: Path) -> List[Path]:
+    """
+    Wiederherstellung beim Start und Liste der bereits vorhandenen PDFs.
+
+    Args:
+        db_path: Pfad zu werkstatt.db
+        input_folder: Eingangsordner
+
+    Returns:
+        PDFs im Eingangsordner, die (erneut) verarbeitet werden sollen
+        (ohne laufende und ohne unverändert bereits fehlgeschlagene Dateien)
+    """
+    failed: Dict[str, tuple] = {}
+    in_progress = set()
+    try:
+        journal = IngestJournal(db_path)
+        stats = journal.recover()
+        removed = cleanup_temp_dirs(input_folder, journal)
+        if stats['completed'] or stats['rolled_back'] or removed:
+            logger.info(f"✓ Wiederherstellung: {stats['completed']} abgeschlossen, "
+                        f"{stats['rolled_back']} zurückgerollt, {removed} Temp-Ordner entfernt")
+        failed = journal.failed_sources()
+        # Dateien, die gerade ein anderer Prozess/Thread verarbeitet
+        in_progress = {e['source_path'] for e in journal.incomplete() if not journal.is_orphaned(e)}
+    except Exception as e:
+        # Der Watcher soll trotzdem starten
+        logger.error(f"Wiederherstellung beim Start fehlgeschlagen: {e}")
+
+    pending = []
+    with os.scandir(input_folder) as entries:
+        pdfs = sorted(
+            Path(e.path) for e in entries
+            if e.name.lower().endswith('.pdf') and e.is_file(follow_symlinks=False)
+        )
+    for pdf in pdfs:
+        if str(pdf) in in_progress:
+            continue
+        if failed.get(str(pdf)) == _stat_identity(pdf):
+            logger.debug(f"Übersprungen (bereits fehlgeschlagen): {pdf.name}")
+            continue
+        pending.append(pdf)
+    if pending:
+        logger.info(f"📥 {len(pending)} vorhandene PDF(s) im Eingangsordner werden eingereiht")
+    return pending
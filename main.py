@@ -16,10 +16,15 @@ import config
 import ocr
 import parser
 import archive
+import archive_manifest
 import db
 import kunden_index
 import watcher
 import backup
+import metrics
+import ingest_journal
+import file_leases
+import ocr_scheduler
 
 
 # Logging konfigurieren
@@ -47,13 +52,72 @@ def setup_logging(verbose: bool = False) -> None:
 logger = logging.getLogger(__name__)
 
 
+def _journal_begin(cfg: config.Config, pdf_path: Path):
+    """
+    Legt den Journal-Eintrag an.
+    
+    Returns:
+        Tuple (Journal, ID) oder (None, None), wenn das Journal nicht verfügbar ist
+    """
+    try:
+        journal = ingest_journal.IngestJournal(cfg.get_db_path())
+        return journal, journal.begin(pdf_path)
+    except Exception as e:
+        logger.warning(f"Verarbeitungs-Journal nicht verfügbar ({e}), fahre ohne fort")
+        return None, None
+
+
+def _journal_step(journal, journal_id, stage: str, **fields) -> None:
+    """Schreibt einen Verarbeitungsschritt ins Journal (Fehler nur als Warnung)."""
+    if journal is None:
+        return
+    try:
+        journal.advance(journal_id, stage, **fields)
+    except Exception as e:
+        logger.warning(f"Journal-Eintrag {journal_id} nicht aktualisiert: {e}")
+
+
+def _journal_archived(journal, journal_id, path: Path) -> None:
+    """Merkt sich eine archivierte Datei im Journal (für Rollback)."""
+    if journal is None:
+        return
+    try:
+        journal.add_archived(journal_id, path)
+    except Exception as e:
+        logger.warning(f"Journal-Eintrag {journal_id} nicht aktualisiert: {e}")
+
+
+def _journal_fail(journal, journal_id, error: str) -> None:
+    """Rollt einen fehlgeschlagenen Eintrag zurück und markiert ihn als fehlgeschlagen."""
+    if journal is None:
+        return
+    try:
+        entry = journal.get(journal_id)
+        if entry:
+            journal.resolve(entry, failed=True, error=error)
+    except Exception as e:
+        logger.warning(f"Rollback für Journal-Eintrag {journal_id} fehlgeschlagen: {e}")
+
+
+def _journal_abort(journal, journal_id, error: str) -> None:
+    """Rollt einen abgebrochenen Eintrag zurück, ohne ihn als fehlgeschlagen zu markieren."""
+    if journal is None:
+        return
+    try:
+        entry = journal.get(journal_id)
+        if entry:
+            journal.resolve(entry, error=error)
+    except Exception as e:
+        logger.warning(f"Rollback für Journal-Eintrag {journal_id} fehlgeschlagen: {e}")
+
+
 def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
     """
     Verarbeitet eine einzelne PDF-Datei.
     
     Neue Logik:
     - PDF wird in Auftrag (Seite 1) und Anhang (Rest) aufgeteilt
-    - Beide PDFs werden separat archiviert
+    - Beide PDFs werden direkt an ihren Archivpfad geschrieben
     
     Args:
         pdf_path: Pfad zur PDF-Datei
@@ -66,29 +130,35 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
     logger.info(f"Verarbeite Datei: {pdf_path.name}")
     logger.info(f"=" * 60)
     
+    journal, journal_id = _journal_begin(cfg, pdf_path)
+    
     try:
         # 1. OCR durchführen (alle Seiten)
         lang = cfg.get("tesseract_lang", "deu")
         poppler_path = cfg.get("poppler_path", None)
         
-        logger.info("Schritt 1/7: OCR-Verarbeitung...")
+        logger.info("Schritt 1/5: OCR-Verarbeitung...")
         page_texts = ocr.pdf_to_ocr_texts(pdf_path, max_pages=None, lang=lang, poppler_path=poppler_path)
         
         if not page_texts:
             logger.error(f"Keine Seiten in PDF gefunden: {pdf_path.name}")
+            _journal_fail(journal, journal_id, "Keine Seiten in PDF gefunden")
             archive.move_to_error_folder(pdf_path, cfg.get_input_folder())
+            metrics.PROCESSED_FILES.inc(result="error")
             return False
         
         logger.info(f"  → {len(page_texts)} Seiten erkannt")
         
         # 2. Metadaten aus Seite 1 extrahieren
-        logger.info("Schritt 2/7: Metadaten-Extraktion...")
+        logger.info("Schritt 2/5: Metadaten-Extraktion...")
         try:
             # Dateiname als Fallback übergeben für Auftragsnummer-Extraktion
             metadata = parser.extract_auftrag_metadata(page_texts[0], fallback_filename=pdf_path.name)
         except parser.ParserError as e:
             logger.error(f"Fehler beim Extrahieren der Metadaten: {e}")
+            _journal_fail(journal, journal_id, f"Metadaten: {e}")
             archive.move_to_error_folder(pdf_path, cfg.get_input_folder())
+            metrics.PROCESSED_FILES.inc(result="error")
             return False
         
         logger.info(f"  Auftragsnummer: {metadata['auftrag_nr']}")
@@ -99,30 +169,52 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
         logger.info(f"  VIN: {metadata.get('vin', 'N/A')}")
         logger.info(f"  Formular: {metadata.get('formular_version', 'N/A')}")
         
-        # 3. PDF in Auftrag + Anhang aufteilen
-        logger.info("Schritt 3/7: PDF aufteilen (Auftrag + Anhang)...")
-        from pdf_split import split_pdf_auftrag_anhang, PDFSplitError
+        # 3. PDF aufteilen, Auftrag + Anhang direkt ins Archiv schreiben
+        logger.info("Schritt 3/5: PDF aufteilen und archivieren (Auftrag + Anhang)...")
+        from pdf_split import split_pdf_to_archive, PDFSplitError
+        
+        # Optional: Scan-Bilder verkleinern (OCR lief bereits auf dem Original)
+        split_source = pdf_path
+        if cfg.get("pdf_optimize_enabled", False):
+            import pdf_optimize
+            split_source = pdf_optimize.optimize_for_archive(pdf_path, cfg.config) or pdf_path
         
-        # Temporäres Verzeichnis für Split
-        temp_dir = pdf_path.parent / f".temp_{metadata['auftrag_nr']}"
-        temp_dir.mkdir(exist_ok=True)
+        # Cluster-Modus: nur archivieren, solange die Lease noch gilt
+        file_leases.ensure_held()
         
+        # Split und Archivierung sind ein Schritt (kein Temp-Ordner mehr)
+        _journal_step(journal, journal_id, 'archiving', auftrag_nr=metadata['auftrag_nr'])
         try:
-            auftrag_pdf, anhang_pdf = split_pdf_auftrag_anhang(
-                pdf_path,
-                temp_dir,
-                metadata['auftrag_nr']
+            placed = split_pdf_to_archive(
+                split_source,
+                cfg.get_archiv_root(),
+                metadata['auftrag_nr'],
+                cfg.config,
+                metadata,  # Übergebe Metadaten für flexiblen Dateinamen
+                on_placed=lambda path: _journal_archived(journal, journal_id, path)
             )
         except PDFSplitError as e:
             logger.error(f"Fehler beim Aufteilen der PDF: {e}")
+            _journal_fail(journal, journal_id, f"Aufteilen: {e}")
             archive.move_to_error_folder(pdf_path, cfg.get_input_folder())
+            metrics.PROCESSED_FILES.inc(result="error")
             return False
+        finally:
+            if split_source != pdf_path:
+                split_source.unlink(missing_ok=True)
+        
+        target_path_auftrag = placed.auftrag_path
+        file_hash_auftrag = placed.auftrag_hash
+        anhang_path_in_archive = placed.anhang_path
+        logger.info(f"  Archiviert als: {target_path_auftrag.name}")
+        if anhang_path_in_archive:
+            logger.info(f"  Anhang archiviert als: {anhang_path_in_archive.name}")
         
         # 4. Schlagwörter aus Anhang-Seiten extrahieren (falls vorhanden)
-        logger.info("Schritt 4/7: Schlagwort-Suche in Anhang...")
+        logger.info("Schritt 4/5: Schlagwort-Suche in Anhang...")
         keywords_found = {}
         
-        if anhang_pdf and len(page_texts) > 1:
+        if anhang_path_in_archive and len(page_texts) > 1:
             keywords = cfg.get_keywords()
             # Seiten 2-N für Keywords (page_texts[1:])
             keywords_found = parser.extract_keywords_from_pages(
@@ -138,45 +230,10 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
         else:
             logger.info("  Kein Anhang vorhanden (nur 1 Seite)")
         
-        # 5. Auftrag-PDF ins Archiv verschieben
-        logger.info("Schritt 5/7: Auftrag archivieren...")
-        archiv_root = cfg.get_archiv_root()
-        target_path_auftrag, file_hash_auftrag = archive.move_to_archive(
-            auftrag_pdf,
-            archiv_root,
-            metadata['auftrag_nr'],
-            cfg.config,
-            metadata  # Übergebe Metadaten für flexiblen Dateinamen
-        )
-        logger.info(f"  Archiviert als: {target_path_auftrag.name}")
-        
-        # 6. Anhang-PDF ins Archiv verschieben (falls vorhanden)
-        anhang_path_in_archive = None
-        if anhang_pdf:
-            logger.info("Schritt 6/7: Anhang archivieren...")
-            # Anhang in denselben Ordner wie Auftrag verschieben
-            target_dir = target_path_auftrag.parent
-            anhang_filename = anhang_pdf.name
-            target_path_anhang = target_dir / anhang_filename
-            
-            # Falls Datei bereits existiert, versionieren
-            version = 1
-            while target_path_anhang.exists():
-                version += 1
-                base_name = anhang_pdf.stem  # z.B. "076329_Anhang_S2-10"
-                anhang_filename = f"{base_name}_v{version}.pdf"
-                target_path_anhang = target_dir / anhang_filename
-            
-            import shutil
-            shutil.move(str(anhang_pdf), str(target_path_anhang))
-            anhang_path_in_archive = target_path_anhang
-            logger.info(f"  Archiviert als: {target_path_anhang.name}")
-        else:
-            logger.info("Schritt 6/7: Kein Anhang vorhanden")
-        
-        # 7. In Datenbank speichern
-        logger.info("Schritt 7/7: Datenbank-Update...")
+        # 5. In Datenbank speichern
+        logger.info("Schritt 5/5: Datenbank-Update...")
         db_path = cfg.get_db_path()
+        file_leases.ensure_held()
         auftrag_id = db.insert_auftrag(
             db_path,
             metadata,
@@ -185,10 +242,16 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
             file_hash_auftrag
         )
         logger.info(f"  Datenbank-ID: {auftrag_id}")
+        archive_manifest.record_files(
+            db_path,
+            [target_path_auftrag, anhang_path_in_archive],
+            auftrag_id=auftrag_id,
+            hashes={target_path_auftrag: file_hash_auftrag, anhang_path_in_archive: placed.anhang_hash}
+        )
         
         # Kunden-Index aktualisieren
         index_path = cfg.get_kunden_index_path()
-        kunden_index.update_kunden_index(index_path, {
+        kunden_entry = {
             "file_path": str(target_path_auftrag),
             "auftrag_nr": metadata['auftrag_nr'],
             "kunden_nr": metadata.get('kunden_nr'),
@@ -197,16 +260,16 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
             "vin": metadata.get('vin'),
             "datum": metadata.get('datum'),
             "formular_version": metadata.get('formular_version')
-        })
+        }
+        _journal_step(journal, journal_id, 'db', auftrag_id=auftrag_id,
+                      kunden_entry={"index_path": str(index_path), "entry": kunden_entry})
+        kunden_index.update_kunden_index(index_path, kunden_entry)
+        _journal_step(journal, journal_id, 'indexed')
         
         # Original-PDF löschen
         pdf_path.unlink()
         logger.info(f"  Original-PDF gelöscht: {pdf_path.name}")
-        
-        # Temp-Verzeichnis aufräumen
-        import shutil
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
+        _journal_step(journal, journal_id, 'done')
         
         logger.info("=" * 60)
         logger.info(f"✓ Erfolgreich verarbeitet: {pdf_path.name}")
@@ -216,10 +279,20 @@ def process_single_pdf(pdf_path: Path, cfg: config.Config) -> bool:
         else:
             logger.info(f"  → Auftrag: {target_path_auftrag.name} (kein Anhang)")
         logger.info("=" * 60)
+        metrics.PROCESSED_FILES.inc(result="success")
         return True
         
+    except file_leases.LeaseLostError as e:
+        # Anderer Knoten verarbeitet die Datei: eigene Teil-PDFs zurückrollen
+        logger.warning(f"⏭️  Abgebrochen: {e}")
+        _journal_abort(journal, journal_id, str(e))
+        metrics.PROCESSED_FILES.inc(result="skipped")
+        return False
+        
     except Exception as e:
         logger.error(f"Fehler bei der Verarbeitung von {pdf_path.name}: {e}", exc_info=True)
+        _journal_fail(journal, journal_id, str(e))
+        metrics.PROCESSED_FILES.inc(result="error")
         return False
 
 
@@ -236,6 +309,9 @@ def process_input_folder(cfg: config.Config) -> None:
         logger.error(f"Eingangsordner existiert nicht: {input_folder}")
         return
     
+    # Unterbrochene Verarbeitungen auflösen (Rollback/Abschluss, Temp-Ordner)
+    ingest_journal.startup(cfg.get_db_path(), input_folder)
+    
     # Alle PDF-Dateien finden
     pdf_files = list(input_folder.glob("*.pdf"))
     
@@ -281,12 +357,20 @@ def watch_input_folder(cfg: config.Config) -> None:
     logger.info(f"Ordner: {input_folder}")
     logger.info("=" * 60)
     
+    # Unterbrochene Verarbeitungen auflösen, vorhandene PDFs einreihen
+    existing_files = ingest_journal.startup(cfg.get_db_path(), input_folder)
+    
     # Callback-Funktion für neue Dateien
     def process_callback(pdf_path: Path) -> None:
         process_single_pdf(pdf_path, cfg)
     
     # Watcher starten (blockiert bis Ctrl+C)
-    watcher.start_watcher(input_folder, process_callback)
+    watcher.start_watcher(
+        input_folder,
+        process_callback,
+        initial_files=existing_files,
+        **watcher.config_options(cfg)
+    )
 
 
 def perform_search(cfg: config.Config, args: argparse.Namespace) -> None:
@@ -347,13 +431,14 @@ def perform_search(cfg: config.Config, args: argparse.Namespace) -> None:
                 logger.info(f"  Schlagwörter: {parser.format_keywords_for_display(keywords)}")
 
 
-def perform_backup(cfg: config.Config, include_archive: bool = False) -> None:
+def perform_backup(cfg: config.Config, include_archive: bool = False, full_archive: bool = False) -> None:
     """
     Erstellt ein Backup.
     
     Args:
         cfg: Konfigurationsobjekt
-        include_archive: Ob das komplette Archiv gesichert werden soll
+        include_archive: Ob das Archiv gesichert werden soll (inkrementell)
+        full_archive: Archiv vollständig neu sichern statt inkrementell
     """
     backup_target_dir = cfg.get_backup_target_dir()
     
@@ -372,7 +457,8 @@ def perform_backup(cfg: config.Config, include_archive: bool = False) -> None:
             cfg.get_db_path(),
             cfg.config_path,
             backup_target_dir,
-            include_archive=include_archive
+            include_archive=include_archive,
+            full_archive=full_archive
         )
         
         logger.info("=" * 60)
@@ -450,7 +536,9 @@ Beispiele:
     backup_group.add_argument('--backup', action='store_true',
                              help='Erstelle Backup von Datenbank und Konfiguration')
     backup_group.add_argument('--include-archive', action='store_true',
-                             help='Inkludiere komplettes Archiv im Backup (nur mit --backup)')
+                             help='Inkludiere Archiv im Backup, nur neue/geänderte Dateien (nur mit --backup)')
+    backup_group.add_argument('--full-archive', action='store_true',
+                             help='Archiv vollständig neu sichern statt inkrementell (mit --include-archive)')
     
     # Allgemein
     parser_cli.add_argument('--verbose', '-v', action='store_true',
@@ -498,6 +586,9 @@ Beispiele:
         if poppler_bin:
             logger.info("Poppler automatisch erkannt")
     
+    # OCR-Plätze und Bulk-Rate (Watcher und Batch-Modus)
+    ocr_scheduler.configure_from_config(cfg.config)
+    
     # Konfiguration setzen
     if args.set_input_folder:
         cfg.set("input_folder", args.set_input_folder)
@@ -547,7 +638,7 @@ Beispiele:
         perform_search(cfg, args)
     
     elif args.backup:
-        perform_backup(cfg, include_archive=args.include_archive)
+        perform_backup(cfg, include_archive=args.include_archive, full_archive=args.full_archive)
     
     else:
         parser_cli.print_help()
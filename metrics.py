@@ -0,0 +1,389 @@
+"""
+Interne Metriken für Werkstatt-Archiv.
+
+Dieses Modul stellt eine prozessweite Registry für Counter, Gauges und
+Histogramme (feste Buckets) bereit und rendert sie im Prometheus-Textformat
+für den `/metrics`-Endpoint.
+
+Verwendung:
+    import metrics
+
+    with metrics.time_stage("ocr_page"):
+        text = image_to_text(image)
+
+    metrics.WATCHER_QUEUE_DEPTH.inc()
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Standard-Buckets in Sekunden (von SQLite-Writes bis mehrseitiger OCR)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class MetricsError(Exception):
+    """Fehler bei der Verwaltung von Metriken."""
+    pass
+
+
+def _format_value(value: float) -> str:
+    """Formatiert einen Zahlenwert für das Prometheus-Textformat."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escaped einen Label-Wert (Backslash, Anführungszeichen, Zeilenumbruch)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    """Baut den Label-Block `{a="x",b="y"}` (leer, wenn keine Labels)."""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Gemeinsame Basis für alle Metrik-Typen (Labels + Lock)."""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Wandelt Label-Kwargs in einen Schlüssel in Label-Reihenfolge um."""
+        if set(labels) != set(self.labelnames):
+            raise MetricsError(
+                f"Metrik {self.name} erwartet Labels {self.labelnames}, erhalten: {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Gibt die Zeilen für das Prometheus-Textformat zurück."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monoton steigender Zähler."""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0  # Ohne Labels immer mit 0 exportieren
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Erhöht den Zähler um `amount` (muss >= 0 sein)."""
+        if amount < 0:
+            raise MetricsError(f"Counter {self.name} kann nicht verringert werden")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Aktueller Wert (0, wenn noch nie erhöht)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Momentanwert, der steigen und fallen kann (z.B. Queue-Tiefe)."""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0  # Ohne Labels immer mit 0 exportieren
+
+    def set(self, value: float, **labels: str) -> None:
+        """Setzt den Gauge auf einen festen Wert."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Erhöht den Gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Verringert den Gauge."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        """Aktueller Wert (0, wenn noch nie gesetzt)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Histogramm mit festen Buckets.
+
+    Pro Label-Kombination werden nur die Bucket-Zähler, die Summe und die
+    Anzahl gespeichert - der Speicherbedarf ist unabhängig von der Anzahl
+    der Beobachtungen.
+    """
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        if 'le' in self.labelnames:
+            raise MetricsError("Label 'le' ist für Histogramme reserviert")
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or bounds[-1] != float('inf'):
+            bounds.append(float('inf'))
+        self.buckets: Tuple[float, ...] = tuple(bounds)
+        # key -> [bucket_counts (nicht kumuliert), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        if not self.labelnames:
+            self._values[()] = [[0] * len(self.buckets), 0.0, 0]
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Erfasst eine Beobachtung (z.B. Dauer in Sekunden)."""
+        key = self._key(labels)
+        # Erster Bucket, dessen Obergrenze >= value ist
+        index = len(self.buckets) - 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Context-Manager, der die Laufzeit des Blocks beobachtet (auch bei Fehlern)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        """Anzahl der Beobachtungen."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def get_sum(self, **labels: str) -> float:
+        """Summe aller beobachteten Werte."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[1] if state else 0.0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-sichere Sammlung aller Metriken eines Prozesses."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str,
+                       labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls) or existing.labelnames != tuple(labelnames):
+                    raise MetricsError(f"Metrik {name} ist bereits mit anderem Typ/Labels registriert")
+                return existing
+            metric = cls(name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Holt oder registriert einen Counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Holt oder registriert einen Gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Holt oder registriert ein Histogramm."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Rendert alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Prozessweite Standard-Registry
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# ============================================================
+# Vordefinierte Metriken der Verarbeitungs-Pipeline
+# ============================================================
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'werkstatt_stage_duration_seconds',
+    'Dauer einzelner Verarbeitungsschritte (ocr_page, parse, split, hash, archive_move, db_insert)',
+    ('stage',)
+)
+
+STAGE_ERRORS = REGISTRY.counter(
+    'werkstatt_stage_errors_total',
+    'Anzahl fehlgeschlagener Verarbeitungsschritte',
+    ('stage',)
+)
+
+OCR_PAGES = REGISTRY.counter(
+    'werkstatt_ocr_pages_total',
+    'Anzahl per OCR verarbeiteter Seiten'
+)
+
+PROCESSED_FILES = REGISTRY.counter(
+    'werkstatt_processed_files_total',
+    'Verarbeitete Eingangs-PDFs nach Ergebnis',
+    ('result',)
+)
+
+WATCHER_QUEUE_DEPTH = REGISTRY.gauge(
+    'werkstatt_watcher_queue_depth',
+    'PDFs, die vom Watcher erkannt, aber noch nicht fertig verarbeitet sind'
+)
+
+WATCHER_RUNNING = REGISTRY.gauge(
+    'werkstatt_watcher_running',
+    'Ob die Ordnerüberwachung aktiv ist (1) oder nicht (0)'
+)
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'werkstatt_http_request_duration_seconds',
+    'Antwortzeit der Web-UI pro Route',
+    ('method', 'route', 'status')
+)
+
+SQLITE_BUSY_WAIT_SECONDS = REGISTRY.histogram(
+    'werkstatt_sqlite_busy_wait_seconds',
+    'Wartezeit auf den SQLite-Schreib-Lock (BEGIN IMMEDIATE)',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+
+SQLITE_LOCKED_ERRORS = REGISTRY.counter(
+    'werkstatt_sqlite_locked_errors_total',
+    'Schreibversuche, die nach Ablauf des Busy-Timeouts mit "database is locked" scheiterten'
+)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    Misst die Dauer eines Verarbeitungsschritts.
+
+    Fehler werden zusätzlich in `werkstatt_stage_errors_total` gezählt
+    und unverändert weitergereicht.
+
+    Args:
+        stage: Name des Schritts (z.B. "ocr_page", "parse", "split")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator-Variante von `time_stage` für ganze Funktionen.
+
+    Args:
+        stage: Name des Schritts
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with time_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    """Rendert die Standard-Registry im Prometheus-Textformat."""
+    return REGISTRY.render_prometheus()
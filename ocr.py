@@ -9,6 +9,9 @@ from pathlib import Path
 from typing import List, Optional
 import logging
 
+import metrics
+import ocr_scheduler
+
 try:
     from pdf2image import convert_from_path
     from PIL import Image
@@ -373,7 +376,9 @@ def pdf_to_ocr_texts(
         logger.info(f"OCR auf Seite {i}/{len(images)}: {pdf_path.name}")
         
         try:
-            text = image_to_text(image, lang=lang)
+            with ocr_scheduler.slot(), metrics.time_stage("ocr_page"):
+                text = image_to_text(image, lang=lang)
+            metrics.OCR_PAGES.inc()
             texts.append(text)
             
             # Debug: Ersten Teil des Textes loggen
@@ -481,7 +486,8 @@ def pdf_to_ocr_texts_enhanced(
             # PSM 6 als Hauptmethode für Enhanced-OCR
             # PSM 6 = Uniform block of text (optimal für Formulare mit Kästchen/Feldern)
             # Besser als PSM 3 für neue Formulare, wo Auftragsnummer in Kästchen steht
-            text = image_to_text(processed_image, lang=lang, config='--psm 6 --oem 3')
+            with ocr_scheduler.slot():
+                text = image_to_text(processed_image, lang=lang, config='--psm 6 --oem 3')
             
             texts.append(text)
             
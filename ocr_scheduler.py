@@ -0,0 +1,205 @@
+"""
+Prioritäts-Steuerung für OCR-Arbeit.
+
+Tesseract ist CPU-gebunden. Legt der Scanner 50-100 PDFs auf einmal in den
+Eingangsordner, belegen Watcher, Ordner-Import und Schlagwort-Rescan alle
+Rechenkerne - ein "PDF neu scannen" aus der Bearbeiten-Seite müsste hinter
+dem ganzen Stapel warten.
+
+Der Scheduler vergibt OCR-Plätze pro Seite:
+- Interaktive Aufträge (rescan_pdf, reprocess_auftrag) kommen immer zuerst
+  an die Reihe; wartet ein interaktiver Auftrag, startet keine neue
+  Bulk-Seite. Die Wartezeit ist damit höchstens eine laufende Seite.
+- Bulk-Arbeit (Watcher, Ordner-Import, Rescan) darf bei mehreren Plätzen
+  nie alle belegen - ein Platz bleibt für interaktive Aufträge frei.
+- Optional: Bulk-Seiten pro Minute begrenzen (ocr_bulk_pages_per_minute).
+
+Die Priorität hängt am aktuellen Kontext (Thread), Standard ist Bulk:
+
+    with ocr_scheduler.interactive():
+        texts = ocr.pdf_to_ocr_texts(pdf_path)
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Gleichzeitige OCR-Seiten (wie die parallelen OCR-Läufe im Ordner-Import)
+DEFAULT_SLOTS = min(4, os.cpu_count() or 1)
+
+
+OCR_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    'werkstatt_ocr_wait_seconds',
+    'Wartezeit auf einen OCR-Platz nach Priorität',
+    ('priority',)
+)
+
+OCR_WAITING = metrics.REGISTRY.gauge(
+    'werkstatt_ocr_waiting',
+    'Auf einen OCR-Platz wartende Seiten nach Priorität',
+    ('priority',)
+)
+
+OCR_ACTIVE = metrics.REGISTRY.gauge(
+    'werkstatt_ocr_active',
+    'Laufende OCR-Seiten nach Priorität',
+    ('priority',)
+)
+
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar('ocr_priority', default=BULK)
+
+
+class OCRScheduler:
+    """Vergibt OCR-Plätze, interaktive Aufträge vor Bulk-Arbeit."""
+
+    def __init__(self, slots: int = DEFAULT_SLOTS, bulk_pages_per_minute: float = 0.0):
+        """
+        Initialisiert den Scheduler.
+
+        Args:
+            slots: Gleichzeitige OCR-Seiten
+            bulk_pages_per_minute: Obergrenze für Bulk-Seiten (0 = unbegrenzt)
+        """
+        self._cond = threading.Condition()
+        self._active = {p: 0 for p in PRIORITIES}
+        self._waiting = {p: 0 for p in PRIORITIES}
+        self._next_bulk_start = 0.0
+        self.slots = 1
+        self.bulk_interval = 0.0
+        self.configure(slots, bulk_pages_per_minute)
+
+    def configure(self, slots: Optional[int] = None, bulk_pages_per_minute: Optional[float] = None) -> None:
+        """Ändert Plätze und Bulk-Rate zur Laufzeit."""
+        with self._cond:
+            if slots is not None:
+                self.slots = max(1, int(slots))
+            if bulk_pages_per_minute is not None:
+                rate = float(bulk_pages_per_minute)
+                self.bulk_interval = 60.0 / rate if rate > 0 else 0.0
+            self._cond.notify_all()
+
+    def _bulk_limit(self) -> int:
+        """Plätze für Bulk-Arbeit (einer bleibt für interaktive Aufträge frei)."""
+        return self.slots - 1 if self.slots > 1 else 1
+
+    def _can_start(self, priority: str, now: float) -> bool:
+        if sum(self._active.values()) >= self.slots:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        if self._waiting[INTERACTIVE] or self._active[BULK] >= self._bulk_limit():
+            return False
+        return now >= self._next_bulk_start
+
+    @contextlib.contextmanager
+    def slot(self, priority: Optional[str] = None) -> Iterator[None]:
+        """
+        Belegt einen OCR-Platz für eine Seite (blockiert, bis einer frei ist).
+
+        Args:
+            priority: INTERACTIVE oder BULK (None = aktueller Kontext)
+        """
+        priority = priority or _current_priority.get()
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            OCR_WAITING.set(self._waiting[priority], priority=priority)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._can_start(priority, now):
+                        break
+                    timeout = None
+                    if priority == BULK and self._next_bulk_start > now:
+                        timeout = self._next_bulk_start - now
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting[priority] -= 1
+                OCR_WAITING.set(self._waiting[priority], priority=priority)
+                if priority == INTERACTIVE:
+                    # Bulk-Seiten warten auf leere interaktive Warteschlange
+                    self._cond.notify_all()
+            self._active[priority] += 1
+            OCR_ACTIVE.set(self._active[priority], priority=priority)
+            if priority == BULK and self.bulk_interval:
+                self._next_bulk_start = max(now, self._next_bulk_start) + self.bulk_interval
+
+        waited = time.monotonic() - start
+        OCR_WAIT_SECONDS.observe(waited, priority=priority)
+        if priority == INTERACTIVE and waited >= 1.0:
+            logger.debug(f"Interaktive OCR wartete {waited:.1f}s auf einen Platz")
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[priority] -= 1
+                OCR_ACTIVE.set(self._active[priority], priority=priority)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aktuelle Belegung für Diagnose-Endpunkte."""
+        with self._cond:
+            return {
+                'slots': self.slots,
+                'bulk_limit': self._bulk_limit(),
+                'bulk_pages_per_minute': round(60.0 / self.bulk_interval, 1) if self.bulk_interval else 0,
+                'active': dict(self._active),
+                'waiting': dict(self._waiting)
+            }
+
+
+# Prozessweite Instanz
+SCHEDULER = OCRScheduler()
+
+
+@contextlib.contextmanager
+def interactive() -> Iterator[None]:
+    """Markiert OCR-Arbeit im aktuellen Kontext als interaktiv (Benutzer wartet)."""
+    token = _current_priority.set(INTERACTIVE)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def slot(priority: Optional[str] = None):
+    """Kurzform für SCHEDULER.slot."""
+    return SCHEDULER.slot(priority)
+
+
+def configure(slots: Optional[int] = None, bulk_pages_per_minute: Optional[float] = None) -> None:
+    """Kurzform für SCHEDULER.configure."""
+    SCHEDULER.configure(slots, bulk_pages_per_minute)
+
+
+def configure_from_config(config: Dict[str, Any]) -> None:
+    """
+    Übernimmt `ocr_slots` und `ocr_bulk_pages_per_minute` aus der Konfiguration.
+
+    `ocr_slots` 0 (Standard) = DEFAULT_SLOTS (min(4, CPU-Kerne)).
+
+    Args:
+        config: Konfigurationsdictionary (config.Config.config)
+    """
+    slots = config.get('ocr_slots') or DEFAULT_SLOTS
+    configure(slots, config.get('ocr_bulk_pages_per_minute', 0) or 0)
+    logger.debug(f"OCR-Plätze: {SCHEDULER.slots}, Bulk-Intervall: {SCHEDULER.bulk_interval:.2f}s")
+
+
+def stats() -> Dict[str, Any]:
+    """Kurzform für SCHEDULER.stats."""
+    return SCHEDULER.stats()
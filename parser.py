@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import logging
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -427,6 +429,7 @@ def extract_auftragsnummer_from_filename(filename: str) -> Optional[str]:
     return None
 
 
+@metrics.timed("parse")
 def extract_auftrag_metadata(text: str, fallback_filename: Optional[str] = None) -> Dict[str, Any]:
     """
     Extrahiert alle Metadaten aus dem OCR-Text von Seite 1.
@@ -0,0 +1,354 @@
+"""
+Speicherschonendes Zusammenfügen von PDFs.
+
+PdfMerger/PdfWriter halten alle Seiten aller Quellen bis zum Schreiben im
+Speicher - bei großen Scan-Anhängen (OA-Import mit dutzenden PDFs) mehrere
+GB. Der StreamingPDFWriter schreibt stattdessen jede Seite samt der von ihr
+referenzierten Objekte (Inhalt, Bilder, Fonts) sofort in die Ausgabedatei:
+
+- Quellen werden als Datei geöffnet (nicht komplett eingelesen) und nach
+  ihrer letzten Seite geschlossen.
+- Der Objekt-Cache des Readers wird nach jeder Seite geleert; im Speicher
+  bleiben nur die Nummern-Zuordnung und die Byte-Offsets für die xref-Tabelle.
+- Streams werden unverändert (komprimiert) kopiert, nicht neu kodiert.
+
+Ausgabe in eine Temp-Datei im Zielordner, danach fsync und atomares
+Umbenennen - eine abgebrochene Zusammenführung hinterlässt keine halbe PDF.
+Für PDFs, die der Streaming-Writer nicht verarbeiten kann (z.B. verschlüsselt),
+wird automatisch auf PdfWriter zurückgegriffen.
+"""
+
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+import logging
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+except ImportError:
+    print("❌ PyPDF2 nicht installiert. Führe aus: pip install PyPDF2")
+    exit(1)
+
+logger = logging.getLogger(__name__)
+
+
+_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+_CATALOG = 1
+_PAGES = 2
+
+
+class PDFMergeError(Exception):
+    """Fehler beim Zusammenfügen von PDFs."""
+    pass
+
+
+class StreamingPDFWriter:
+    """Schreibt Seiten mehrerer PDFs fortlaufend in eine Ausgabedatei."""
+
+    def __init__(self, out: BinaryIO):
+        """
+        Beginnt eine neue PDF.
+
+        Args:
+            out: Zum Schreiben geöffnete Binärdatei
+        """
+        self._out = out
+        self._offsets: List[int] = [0, 0, 0]  # Index = Objektnummer (1 Katalog, 2 Seitenbaum)
+        self._kids: List[int] = []
+        out.write(_HEADER)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    def _new_number(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def append(
+        self,
+        pdf_path: Path,
+        pages: Optional[Sequence[int]] = None,
+        transform: Optional[Callable[[Any], None]] = None
+    ) -> int:
+        """
+        Hängt Seiten einer PDF an.
+
+        Args:
+            pdf_path: Quell-PDF
+            pages: Seitenindizes (0-basiert, z.B. range(1, n)); None = alle
+            transform: Wird je Seite vor dem Schreiben aufgerufen und darf
+                       deren Objekte ändern (z.B. Bilder neu kodieren)
+
+        Returns:
+            Anzahl angehängter Seiten
+
+        Raises:
+            PDFMergeError: Wenn die Quelle nicht gestreamt werden kann
+        """
+        with open(pdf_path, 'rb') as fh:
+            reader = PdfReader(fh)
+            if reader.is_encrypted:
+                raise PDFMergeError(f"Verschlüsselte PDF: {pdf_path.name}")
+
+            mapping: Dict[Tuple[int, int], int] = {}
+            pending: Deque = deque()
+
+            all_pages = list(reader.pages)
+            selected = range(len(all_pages)) if pages is None else pages
+            skipped = None
+
+            # Seitennummern vorab vergeben: Verweise zwischen Seiten (z.B. Links)
+            # zeigen so auf die neue Seite statt eine Kopie nachzuziehen.
+            # Verweise auf nicht übernommene Seiten werden zu null - sonst
+            # würde über /Parent die ganze Quell-PDF mitkopiert.
+            page_numbers = {}
+            for index in selected:
+                page_numbers[index] = self._new_number()
+            for index, page in enumerate(all_pages):
+                ref = getattr(page, 'indirect_reference', None)
+                if ref is None:
+                    continue
+                if index in page_numbers:
+                    mapping[(ref.idnum, ref.generation)] = page_numbers[index]
+                else:
+                    if skipped is None:
+                        skipped = self._new_number()
+                        self._write_object(skipped, None, mapping, pending)
+                    mapping[(ref.idnum, ref.generation)] = skipped
+
+            for index, number in page_numbers.items():
+                page = all_pages[index]
+                if transform:
+                    transform(page)
+                self._write_object(number, page, mapping, pending, is_page=True)
+                while pending:
+                    obj_number, item = pending.popleft()
+                    obj = item.get_object() if isinstance(item, IndirectObject) else item
+                    self._write_object(obj_number, obj, mapping, pending)
+                self._kids.append(number)
+                # Bereits geschriebene Objekte nicht im Reader-Cache halten
+                if hasattr(reader, 'resolved_objects'):
+                    reader.resolved_objects.clear()
+
+            return len(page_numbers)
+
+    def close(self) -> int:
+        """
+        Schreibt Seitenbaum, Katalog, xref-Tabelle und Trailer.
+
+        Returns:
+            Gesamtzahl Seiten
+
+        Raises:
+            PDFMergeError: Wenn keine Seite angehängt wurde
+        """
+        if not self._kids:
+            raise PDFMergeError("Keine Seiten zum Zusammenfügen")
+        out = self._out
+
+        self._offsets[_PAGES] = out.tell()
+        out.write(b"%d 0 obj\n<< /Type /Pages /Count %d /Kids [" % (_PAGES, len(self._kids)))
+        for kid in self._kids:
+            out.write(b" %d 0 R" % kid)
+        out.write(b" ] >>\nendobj\n")
+
+        self._offsets[_CATALOG] = out.tell()
+        out.write(b"%d 0 obj\n<< /Type /Catalog /Pages %d 0 R >>\nendobj\n" % (_CATALOG, _PAGES))
+
+        xref_offset = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self._offsets))
+        for offset in self._offsets[1:]:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                  % (len(self._offsets), _CATALOG, xref_offset))
+        return len(self._kids)
+
+    # --------------------------------------------------------
+    # Serialisierung
+    # --------------------------------------------------------
+
+    def _ref(self, ref: IndirectObject, mapping: Dict, pending: Deque) -> int:
+        key = (ref.idnum, ref.generation)
+        number = mapping.get(key)
+        if number is None:
+            number = self._new_number()
+            mapping[key] = number
+            pending.append((number, ref))
+        return number
+
+    def _write_object(self, number: int, obj, mapping: Dict, pending: Deque, is_page: bool = False) -> None:
+        out = self._out
+        self._offsets[number] = out.tell()
+        out.write(b"%d 0 obj\n" % number)
+        if obj is None:
+            out.write(b"null")
+        elif isinstance(obj, StreamObject):
+            data = getattr(obj, '_data', None)
+            if data is None:
+                raise PDFMergeError("Stream ohne Rohdaten")
+            self._write_dict(obj, mapping, pending, skip=('/Length',), extra=b" /Length %d" % len(data))
+            out.write(b"\nstream\n")
+            out.write(data)
+            out.write(b"\nendstream")
+        elif is_page:
+            # Eigener Seitenbaum statt des Original-Parents (geerbte Attribute
+            # hat PdfReader beim Einlesen bereits in die Seite übernommen)
+            self._write_dict(obj, mapping, pending, skip=('/Parent',), extra=b" /Parent %d 0 R" % _PAGES)
+        else:
+            self._write_value(obj, mapping, pending)
+        out.write(b"\nendobj\n")
+
+    def _write_dict(self, obj, mapping: Dict, pending: Deque, skip: Tuple[str, ...] = (), extra: bytes = b"") -> None:
+        out = self._out
+        out.write(b"<<")
+        for key, value in dict.items(obj):
+            if key in skip:
+                continue
+            out.write(b" ")
+            key.write_to_stream(out, None)
+            out.write(b" ")
+            self._write_value(value, mapping, pending)
+        out.write(extra)
+        out.write(b" >>")
+
+    def _write_value(self, value, mapping: Dict, pending: Deque) -> None:
+        out = self._out
+        if isinstance(value, IndirectObject):
+            out.write(b"%d 0 R" % self._ref(value, mapping, pending))
+        elif isinstance(value, StreamObject):
+            # Streams dürfen nur indirekt vorkommen
+            number = self._new_number()
+            pending.append((number, value))
+            out.write(b"%d 0 R" % number)
+        elif isinstance(value, DictionaryObject):
+            self._write_dict(value, mapping, pending)
+        elif isinstance(value, ArrayObject):
+            out.write(b"[")
+            for item in list.__iter__(value):
+                out.write(b" ")
+                self._write_value(item, mapping, pending)
+            out.write(b" ]")
+        else:
+            value.write_to_stream(out, None)
+
+
+def _merge_with_pdfwriter(pdf_paths: List[Path], out: BinaryIO) -> List[int]:
+    """Rückfallweg über PdfWriter (alle Seiten im Speicher)."""
+    writer = PdfWriter()
+    counts = []
+    for pdf_path in pdf_paths:
+        reader = PdfReader(str(pdf_path))
+        for page in reader.pages:
+            writer.add_page(page)
+        counts.append(len(reader.pages))
+    writer.write(out)
+    return counts
+
+
+def write_atomic(output_path: Path, write: Callable[[BinaryIO], Any], overwrite: bool = True) -> Any:
+    """
+    Schreibt über eine Temp-Datei im Zielordner und benennt sie dann um.
+
+    Args:
+        output_path: Zieldatei
+        write: Erhält die geöffnete Temp-Datei; ihr Rückgabewert wird durchgereicht
+        overwrite: False = FileExistsError, wenn das Ziel inzwischen existiert.
+                   Veröffentlicht wird dann per os.link (schlägt atomar fehl,
+                   wenn ein anderer Prozess/Knoten den Namen schon belegt hat);
+                   ohne Hardlinks wird der Name per O_EXCL reserviert.
+
+    Returns:
+        Rückgabewert von write
+
+    Raises:
+        FileExistsError: Bei overwrite=False, wenn das Ziel existiert
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # PID + Thread: mehrere Worker können dasselbe Ziel gleichzeitig anstreben
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as out:
+            result = write(out)
+            out.flush()
+            os.fsync(out.fileno())
+        if overwrite:
+            os.replace(tmp_path, output_path)
+        else:
+            publish_exclusive(tmp_path, output_path)
+        return result
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def publish_exclusive(tmp_path: Path, output_path: Path) -> None:
+    """
+    Benennt tmp_path in output_path um, ohne ein vorhandenes Ziel zu ersetzen.
+
+    Anders als "exists() + os.replace" gibt es kein Zeitfenster, in dem ein
+    zweiter Prozess (auch auf einem anderen Rechner an derselben Freigabe)
+    dazwischenkommen kann.
+
+    Raises:
+        FileExistsError: Wenn output_path bereits existiert
+    """
+    try:
+        os.link(tmp_path, output_path)
+    except FileExistsError:
+        raise FileExistsError(f"Zieldatei existiert bereits: {output_path}")
+    except OSError:
+        # Keine Hardlinks (z.B. FAT, manche SMB-Freigaben): Namen exklusiv belegen
+        try:
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            raise FileExistsError(f"Zieldatei existiert bereits: {output_path}")
+        os.close(fd)
+        os.replace(tmp_path, output_path)
+        return
+    tmp_path.unlink()
+
+
+def merge_pdf_files(pdf_paths: List[Union[str, Path]], output_path: Path) -> List[int]:
+    """
+    Fügt PDFs speicherschonend zu einer Datei zusammen.
+
+    Args:
+        pdf_paths: Quell-PDFs in Reihenfolge
+        output_path: Ziel-PDF (wird atomar ersetzt)
+
+    Returns:
+        Seitenanzahl pro Quelle
+
+    Raises:
+        PDFMergeError: Wenn keine Quelle angegeben wurde oder das
+                       Zusammenfügen fehlschlägt
+    """
+    pdf_paths = [Path(p) for p in pdf_paths]
+    if not pdf_paths:
+        raise PDFMergeError("Keine PDFs zum Zusammenfügen")
+    output_path = Path(output_path)
+
+    def stream(out: BinaryIO) -> List[int]:
+        writer = StreamingPDFWriter(out)
+        counts = [writer.append(pdf_path) for pdf_path in pdf_paths]
+        writer.close()
+        return counts
+
+    try:
+        return write_atomic(output_path, stream)
+    except OSError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️  Streaming-Merge nicht möglich ({e}), verwende PdfWriter")
+
+    try:
+        return write_atomic(output_path, lambda out: _merge_with_pdfwriter(pdf_paths, out))
+    except Exception as e:
+        raise PDFMergeError(f"PDFs konnten nicht zusammengefügt werden: {e}")
@@ -0,0 +1,378 @@
+"""
+Verkleinerung gescannter PDFs (optional, `pdf_optimize_enabled`).
+
+Scanner liefern meist Farb-JPEGs mit 300 DPI - 1-3 MB pro Seite, obwohl die
+meisten Seiten Schwarz-Weiß-Formulare sind. Nach der OCR werden die
+Seitenbilder deshalb neu kodiert:
+
+- Schwarz-Weiß (kaum Grautöne): 1 Bit, CCITT Group 4 (wie Fax/TIFF-G4),
+  Auflösung bleibt erhalten
+- Graustufen (keine Farbe): JPEG 8 Bit grau
+- Farbe: JPEG mit `pdf_optimize_jpeg_quality`
+- Graustufen/Farbe über `pdf_optimize_max_dpi` werden herunterskaliert
+
+Die PDF wird mit dem StreamingPDFWriter neu geschrieben (Seite für Seite,
+alle übrigen Objekte unverändert). Ist die Ersparnis kleiner als
+`pdf_optimize_min_saving`, bleibt das Original in Gebrauch. Die OCR läuft
+immer auf dem Original; optimiert wird eine Kopie, aus der dann Auftrag und
+Anhang geschnitten werden. Bilder mit Transparenz, Masken oder exotischen
+Farbräumen werden nicht angefasst.
+
+Verwendung (Bericht vorher/nachher, ohne etwas zu ändern):
+    python3 pdf_optimize.py scan1.pdf scan2.pdf [--quality 60] [--max-dpi 200]
+"""
+
+import os
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+import logging
+
+try:
+    from PyPDF2.generic import DictionaryObject, NameObject, NumberObject
+except ImportError:
+    print("❌ PyPDF2 nicht installiert. Führe aus: pip install PyPDF2")
+    exit(1)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Stufe ist optional
+    Image = None
+
+import metrics
+from pdf_merge import StreamingPDFWriter, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+# Bilder unter dieser Größe lohnen das Neukodieren nicht
+MIN_IMAGE_BYTES = 32 * 1024
+# Anteil farbiger Pixel (Sättigung > COLOR_SATURATION), ab dem ein Bild farbig ist
+COLOR_SATURATION = 48
+COLOR_FRACTION = 0.003
+# Anteil mittlerer Grauwerte, unter dem ein Bild als Schwarz-Weiß gilt
+MIDTONE_FRACTION = 0.05
+
+DEFAULT_JPEG_QUALITY = 60
+DEFAULT_MAX_DPI = 200
+DEFAULT_MIN_SAVING = 0.15
+
+OPTIMIZE_BYTES = metrics.REGISTRY.counter(
+    'werkstatt_pdf_optimize_bytes_total',
+    'Dateigröße vor/nach der PDF-Optimierung',
+    ('kind',)
+)
+
+
+class PDFOptimizeError(Exception):
+    """Fehler bei der PDF-Optimierung."""
+    pass
+
+
+class OptimizeSettings(NamedTuple):
+    """Qualitätsvorgaben (siehe pdf_optimize_* in der Konfiguration)."""
+    jpeg_quality: int = DEFAULT_JPEG_QUALITY
+    max_dpi: int = DEFAULT_MAX_DPI
+    min_saving: float = DEFAULT_MIN_SAVING
+    bilevel: bool = True
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'OptimizeSettings':
+        return cls(
+            jpeg_quality=int(config.get("pdf_optimize_jpeg_quality", DEFAULT_JPEG_QUALITY)),
+            max_dpi=int(config.get("pdf_optimize_max_dpi", DEFAULT_MAX_DPI)),
+            min_saving=float(config.get("pdf_optimize_min_saving", DEFAULT_MIN_SAVING)),
+            bilevel=bool(config.get("pdf_optimize_bilevel", True))
+        )
+
+
+class OptimizeResult(NamedTuple):
+    """Ergebnis einer Optimierung (Größen in Bytes)."""
+    original_size: int
+    optimized_size: int
+    images: int
+    recoded: int
+    seconds: float
+    applied: bool  # False = Ersparnis zu gering, Original behalten
+
+    @property
+    def saving(self) -> float:
+        if not self.original_size:
+            return 0.0
+        return 1 - self.optimized_size / self.original_size
+
+
+# ============================================================
+# Bilder
+# ============================================================
+
+def _filters(obj) -> list:
+    filters = obj.get('/Filter')
+    if filters is None:
+        return []
+    filters = filters.get_object()
+    return [str(f) for f in filters] if isinstance(filters, list) else [str(filters)]
+
+
+def _components(obj) -> Optional[int]:
+    """Farbkomponenten (1 = grau, 3 = RGB) oder None bei nicht unterstützten Farbräumen."""
+    cs = obj.get('/ColorSpace')
+    cs = cs.get_object() if cs is not None else None
+    if cs == '/DeviceGray':
+        return 1
+    if cs == '/DeviceRGB':
+        return 3
+    if isinstance(cs, list) and len(cs) == 2 and cs[0] == '/ICCBased':
+        n = cs[1].get_object().get('/N')
+        return int(n) if n in (1, 3) else None
+    return None
+
+
+def _decode_image(obj):
+    """Dekodiert ein Bild-XObject mit Pillow (None = nicht unterstützt)."""
+    if obj.get('/ImageMask') or '/SMask' in obj or '/Mask' in obj or '/Decode' in obj:
+        return None
+    components = _components(obj)
+    if components is None:
+        return None
+    filters = _filters(obj)
+    width, height = int(obj['/Width']), int(obj['/Height'])
+    bits = int(obj.get('/BitsPerComponent', 8))
+
+    if filters == ['/DCTDecode']:
+        image = Image.open(BytesIO(obj._data))
+        return image if image.mode in ('L', 'RGB') else None
+    if filters in ([], ['/FlateDecode']) and bits == 8:
+        mode = 'L' if components == 1 else 'RGB'
+        return Image.frombytes(mode, (width, height), obj.get_data())
+    return None
+
+
+def _classify(image, settings: OptimizeSettings) -> str:
+    """Ordnet ein Bild ein: 'bilevel', 'gray' oder 'color'."""
+    # Stichprobe ohne Mittelung - sonst werden dünne Linien zu Grautönen
+    scale = max(1, max(image.size) // 1024)
+    sample = image.resize((image.width // scale, image.height // scale), Image.NEAREST)
+    if sample.mode == 'RGB':
+        saturation = sample.convert('HSV').getchannel('S').histogram()
+        colored = sum(saturation[COLOR_SATURATION:]) / max(1, sum(saturation))
+        if colored > COLOR_FRACTION:
+            return 'color'
+    gray = sample.convert('L').histogram()
+    midtones = sum(gray[64:192]) / max(1, sum(gray))
+    if settings.bilevel and midtones < MIDTONE_FRACTION:
+        return 'bilevel'
+    return 'gray'
+
+
+def _encode_g4(image) -> bytes:
+    """CCITT-G4-Daten (wie /CCITTFaxDecode mit K=-1, BlackIs1=false)."""
+    # Fax-Konvention: 0-Bits sind weiß, daher invertiert speichern
+    bw = ImageOps.invert(image.convert('L')).point(lambda v: 255 if v >= 128 else 0).convert('1', dither=Image.NONE)
+    buf = BytesIO()
+    bw.save(buf, format='TIFF', compression='group4', tiffinfo={278: bw.height})
+    tiff = Image.open(BytesIO(buf.getvalue()))
+    offsets, counts = tiff.tag_v2[273], tiff.tag_v2[279]
+    if len(offsets) != 1:
+        raise PDFOptimizeError("G4-Ausgabe mit mehreren Streifen")
+    return buf.getvalue()[offsets[0]:offsets[0] + counts[0]]
+
+
+def _recode_image(obj, page_width_pt: float, settings: OptimizeSettings) -> bool:
+    """
+    Kodiert ein Bild-XObject neu, wenn es dadurch kleiner wird.
+
+    Returns:
+        True, wenn das Objekt ersetzt wurde
+    """
+    if len(obj._data) < MIN_IMAGE_BYTES:
+        return False
+    image = _decode_image(obj)
+    if image is None:
+        return False
+
+    kind = _classify(image, settings)
+    if kind == 'bilevel':
+        data = _encode_g4(image)
+        entries = {
+            '/Filter': NameObject('/CCITTFaxDecode'),
+            '/ColorSpace': NameObject('/DeviceGray'),
+            '/BitsPerComponent': NumberObject(1),
+        }
+        parms = {'/K': -1, '/Columns': image.width, '/Rows': image.height}
+    else:
+        image = image.convert('L' if kind == 'gray' else 'RGB')
+        dpi = image.width * 72 / page_width_pt if page_width_pt else 0
+        if settings.max_dpi and dpi > settings.max_dpi * 1.05:
+            scale = settings.max_dpi / dpi
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+        buf = BytesIO()
+        image.save(buf, format='JPEG', quality=settings.jpeg_quality, optimize=True)
+        data = buf.getvalue()
+        entries = {
+            '/Filter': NameObject('/DCTDecode'),
+            '/ColorSpace': NameObject('/DeviceGray' if kind == 'gray' else '/DeviceRGB'),
+            '/BitsPerComponent': NumberObject(8),
+        }
+        parms = None
+
+    if len(data) >= len(obj._data):
+        return False
+
+    obj._data = data
+    if hasattr(obj, 'decoded_self'):
+        obj.decoded_self = None
+    obj.pop(NameObject('/DecodeParms'), None)
+    for key, value in entries.items():
+        obj[NameObject(key)] = value
+    obj[NameObject('/Width')] = NumberObject(image.width)
+    obj[NameObject('/Height')] = NumberObject(image.height)
+    if parms:
+        obj[NameObject('/DecodeParms')] = DictionaryObject(
+            {NameObject(k): NumberObject(v) for k, v in parms.items()})
+    return True
+
+
+# ============================================================
+# PDF
+# ============================================================
+
+def optimize_pdf(input_pdf: Path, output_pdf: Path, settings: OptimizeSettings) -> OptimizeResult:
+    """
+    Kodiert die Seitenbilder einer PDF neu.
+
+    Die Ausgabe wird nur geschrieben, wenn die Ersparnis mindestens
+    `settings.min_saving` beträgt.
+
+    Args:
+        input_pdf: Original-PDF (wird nicht verändert)
+        output_pdf: Ziel für die optimierte PDF
+        settings: Qualitätsvorgaben
+
+    Returns:
+        OptimizeResult mit Größen, Anzahl Bilder und Dauer
+
+    Raises:
+        PDFOptimizeError: Wenn Pillow fehlt oder die PDF nicht verarbeitet werden kann
+    """
+    if Image is None:
+        raise PDFOptimizeError("Pillow nicht installiert (pip install Pillow)")
+    start = time.perf_counter()
+    original_size = input_pdf.stat().st_size
+    counts = {'images': 0, 'recoded': 0}
+
+    def recode_page(page) -> None:
+        resources = page.get('/Resources')
+        xobjects = resources.get_object().get('/XObject') if resources is not None else None
+        if xobjects is None:
+            return
+        page_width = float(page.mediabox.width)
+        for ref in xobjects.get_object().values():
+            obj = ref.get_object()
+            if obj.get('/Subtype') != '/Image':
+                continue
+            counts['images'] += 1
+            try:
+                counts['recoded'] += _recode_image(obj, page_width, settings)
+            except Exception as e:
+                logger.debug(f"Bild nicht neu kodiert: {e}")
+
+    candidate = output_pdf.with_name(f".{output_pdf.name}.optimize")
+
+    def stream(out) -> int:
+        writer = StreamingPDFWriter(out)
+        writer.append(input_pdf, transform=recode_page)
+        writer.close()
+        return out.tell()
+
+    try:
+        optimized_size = write_atomic(candidate, stream)
+    except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="optimize")
+        raise PDFOptimizeError(f"PDF-Optimierung fehlgeschlagen: {e}")
+
+    applied = counts['recoded'] > 0 and optimized_size <= original_size * (1 - settings.min_saving)
+    if applied:
+        os.replace(candidate, output_pdf)
+    else:
+        candidate.unlink()
+
+    seconds = time.perf_counter() - start
+    metrics.STAGE_SECONDS.observe(seconds, stage="optimize")
+    OPTIMIZE_BYTES.inc(original_size, kind="before")
+    OPTIMIZE_BYTES.inc(optimized_size if applied else original_size, kind="after")
+    return OptimizeResult(original_size, optimized_size, counts['images'], counts['recoded'], seconds, applied)
+
+
+def optimize_for_archive(pdf_path: Path, config: Dict[str, Any]) -> Optional[Path]:
+    """
+    Pipeline-Stufe nach der OCR: optimierte Kopie für Split und Archiv.
+
+    Fehler brechen die Verarbeitung nie ab - dann wird das Original verwendet.
+
+    Args:
+        pdf_path: PDF im Eingangsordner (bleibt unverändert)
+        config: Konfigurationsdictionary
+
+    Returns:
+        Pfad der optimierten Kopie (Temp-Datei, vom Aufrufer zu löschen)
+        oder None, wenn das Original verwendet werden soll
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix='werkstatt_opt_', suffix='.pdf')
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        result = optimize_pdf(pdf_path, tmp_path, OptimizeSettings.from_config(config))
+    except Exception as e:
+        logger.warning(f"⚠️  Optimierung übersprungen: {e}")
+        tmp_path.unlink()
+        return None
+
+    mb = 1024 * 1024
+    if not result.applied:
+        logger.info(f"  ℹ Optimierung verworfen ({result.saving:.0%} Ersparnis, {result.seconds:.1f}s)")
+        tmp_path.unlink()
+        return None
+    logger.info(f"  ✓ Optimiert: {result.original_size / mb:.1f} MB → {result.optimized_size / mb:.1f} MB "
+                f"(-{result.saving:.0%}, {result.recoded}/{result.images} Bilder, {result.seconds:.1f}s)")
+    return tmp_path
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    arg_parser = argparse.ArgumentParser(description='Größenbericht für die PDF-Optimierung (ändert nichts)')
+    arg_parser.add_argument('pdfs', nargs='+', type=Path)
+    arg_parser.add_argument('--quality', type=int, default=DEFAULT_JPEG_QUALITY, help='JPEG-Qualität')
+    arg_parser.add_argument('--max-dpi', type=int, default=DEFAULT_MAX_DPI, help='Max. DPI für Grau/Farbe')
+    arg_parser.add_argument('--no-bilevel', action='store_true', help='Keine Schwarz-Weiß-Umwandlung')
+    arg_parser.add_argument('--keep', type=Path, help='Optimierte PDFs in diesem Ordner ablegen')
+    args = arg_parser.parse_args()
+
+    cli_settings = OptimizeSettings(args.quality, args.max_dpi, 0.0, not args.no_bilevel)
+    total_before = total_after = total_seconds = 0.0
+    print(f"{'Datei':40} {'vorher':>9} {'nachher':>9} {'Ersparnis':>9} {'Bilder':>7} {'Zeit':>7}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pdf in args.pdfs:
+            target = (args.keep or Path(tmp_dir)) / pdf.name
+            if args.keep:
+                args.keep.mkdir(parents=True, exist_ok=True)
+            try:
+                res = optimize_pdf(pdf, target, cli_settings)
+            except (PDFOptimizeError, OSError) as e:
+                print(f"{pdf.name[:40]:40} ❌ {e}")
+                continue
+            total_before += res.original_size
+            total_after += res.optimized_size
+            total_seconds += res.seconds
+            print(f"{pdf.name[:40]:40} {res.original_size / 1024:>7.0f}KB {res.optimized_size / 1024:>7.0f}KB "
+                  f"{res.saving:>9.0%} {res.recoded:>3}/{res.images:<3} {res.seconds:>6.1f}s")
+    if total_before:
+        print(f"{'Gesamt':40} {total_before / 1024 / 1024:>7.1f}MB {total_after / 1024 / 1024:>7.1f}MB "
+              f"{1 - total_after / total_before:>9.0%} {'':>7} {total_seconds:>6.1f}s")
+    sys.exit(0)
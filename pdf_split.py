@@ -5,11 +5,17 @@ PDF-Splitting: Trennt PDFs in Auftrag (Seite 1) und Anhang (Rest).
 Neue Logik:
 - Auftrag = Seite 1 → separate PDF (z.B. 076329_Auftrag.pdf)
 - Anhang = Seiten 2-N → separate PDF (z.B. 076329_Anhang_S2-10.pdf)
+
+split_pdf_to_archive() schreibt beide Teile direkt an ihren endgültigen
+Archivpfad (Temp-Datei + atomares Umbenennen) und berechnet den SHA256-Hash
+beim Schreiben - ohne Umweg über einen Temp-Ordner im Eingangsordner.
 """
 
+import hashlib
 import logging
+import time
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Any, BinaryIO, Callable, Dict, NamedTuple, Tuple, Optional
 
 try:
     from PyPDF2 import PdfReader, PdfWriter
@@ -17,14 +23,32 @@ except ImportError:
     print("❌ PyPDF2 nicht installiert. Führe aus: pip install PyPDF2")
     exit(1)
 
+import archive
+import blob_store
+import metrics
+from pdf_merge import StreamingPDFWriter, merge_pdf_files, write_atomic
+
 logger = logging.getLogger(__name__)
 
 
+# Versuche, einen freien Zielnamen zu belegen (gleichzeitige Scans desselben Auftrags)
+PLACE_ATTEMPTS = 10
+
+
 class PDFSplitError(Exception):
     """Fehler beim Aufteilen einer PDF."""
     pass
 
 
+class PlacedSplit(NamedTuple):
+    """Ergebnis von split_pdf_to_archive."""
+    auftrag_path: Path
+    auftrag_hash: str
+    anhang_path: Optional[Path]
+    num_pages: int
+    anhang_hash: Optional[str] = None
+
+
 def split_pdf_auftrag_anhang(
     input_pdf: Path,
     output_dir: Path,
@@ -46,6 +70,7 @@ def split_pdf_auftrag_anhang(
         PDFSplitError: Bei Fehlern beim Aufteilen
     """
     try:
+        split_start = time.perf_counter()
         logger.info(f"📄 Teile PDF auf: {input_pdf.name}")
         
         # PDF öffnen
@@ -86,13 +111,167 @@ def split_pdf_auftrag_anhang(
         else:
             logger.info(f"  ℹ Kein Anhang (nur 1 Seite)")
         
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - split_start, stage="split")
         return auftrag_pdf_path, anhang_pdf_path
         
     except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="split")
         logger.error(f"Fehler beim Aufteilen der PDF: {e}")
         raise PDFSplitError(f"PDF-Split fehlgeschlagen: {e}")
 
 
+class _HashingWriter:
+    """Leitet Schreibzugriffe weiter und berechnet dabei den SHA256-Hash."""
+
+    def __init__(self, out: BinaryIO):
+        self._out = out
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self._sha256.update(data)
+        return self._out.write(data)
+
+    def tell(self) -> int:
+        return self._out.tell()
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def _place_pages(input_pdf: Path, pages: range, target: Path) -> str:
+    """
+    Schreibt Seiten einer PDF atomar an den Zielpfad.
+
+    Returns:
+        SHA256-Hash der geschriebenen Datei
+    """
+    def stream(out: BinaryIO) -> str:
+        hashing = _HashingWriter(out)
+        writer = StreamingPDFWriter(hashing)
+        writer.append(input_pdf, pages)
+        writer.close()
+        return hashing.hexdigest()
+
+    def fallback(out: BinaryIO) -> str:
+        hashing = _HashingWriter(out)
+        reader = PdfReader(str(input_pdf))
+        writer = PdfWriter()
+        for index in pages:
+            writer.add_page(reader.pages[index])
+        writer.write(hashing)
+        return hashing.hexdigest()
+
+    try:
+        return write_atomic(target, stream, overwrite=False)
+    except OSError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️  Streaming nicht möglich ({e}), verwende PdfWriter")
+    return write_atomic(target, fallback, overwrite=False)
+
+
+def split_pdf_to_archive(
+    input_pdf: Path,
+    archiv_root: Path,
+    auftrag_nr: str,
+    config: Dict[str, Any],
+    metadata: Optional[Dict[str, Any]] = None,
+    on_placed: Optional[Callable[[Path], None]] = None
+) -> PlacedSplit:
+    """
+    Teilt eine PDF auf und schreibt Auftrag und Anhang direkt ins Archiv.
+
+    Die Zielnamen (inkl. Version) werden aus einer Auflistung des
+    Archivordners bestimmt (archive.resolve_split_targets). Jede Ausgabe wird
+    in eine Temp-Datei im Archivordner gestreamt, per fsync gesichert und
+    atomar umbenannt; der Hash entsteht beim Schreiben. Gegenüber
+    split_pdf_auftrag_anhang + move_to_archive entfallen das Schreiben in den
+    Eingangsordner und das erneute Lesen für Hash und Kopie.
+
+    Args:
+        input_pdf: Eingabe-PDF
+        archiv_root: Root-Verzeichnis des Archivs
+        auftrag_nr: Auftragsnummer (roh)
+        config: Konfigurationsdictionary
+        metadata: Metadaten für Dateinamen und Jahr-Ordner
+        on_placed: Wird nach jeder fertig geschriebenen Datei aufgerufen
+                   (z.B. Journal-Eintrag für den Rollback)
+
+    Returns:
+        PlacedSplit mit Archivpfaden und SHA256-Hashes
+
+    Raises:
+        PDFSplitError: Wenn die PDF nicht gelesen/aufgeteilt werden kann
+        OSError: Bei Schreibfehlern im Archiv (z.B. Ziel existiert bereits)
+    """
+    split_start = time.perf_counter()
+    logger.info(f"📄 Teile PDF auf und archiviere: {input_pdf.name}")
+    try:
+        num_pages = len(PdfReader(str(input_pdf)).pages)
+    except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="split")
+        raise PDFSplitError(f"PDF-Split fehlgeschlagen: {e}")
+    if num_pages == 0:
+        metrics.STAGE_ERRORS.inc(stage="split")
+        raise PDFSplitError("PDF-Split fehlgeschlagen: PDF hat keine Seiten")
+    logger.info(f"  → {num_pages} Seiten erkannt")
+
+    auftrag_path, anhang_path = archive.resolve_split_targets(
+        archiv_root, auftrag_nr, config, metadata, num_pages
+    )
+
+    def place(pages: range, target: Path, index: int) -> Tuple[Path, str]:
+        # Gleichzeitiger Scan desselben Auftrags (weiterer Worker/Knoten) kann
+        # denselben Namen gewählt haben: dann mit der nächsten Version erneut
+        for attempt in range(1, PLACE_ATTEMPTS + 1):
+            try:
+                return target, _place_pages(input_pdf, pages, target)
+            except FileExistsError:
+                if attempt == PLACE_ATTEMPTS:
+                    raise
+                retry = archive.resolve_split_targets(archiv_root, auftrag_nr, config, metadata, num_pages)[index]
+                logger.warning(f"⚠️  {target.name} inzwischen vergeben, verwende {retry.name}")
+                target = retry
+
+    placed = []
+    anhang_hash = None
+    try:
+        auftrag_path, auftrag_hash = place(range(0, 1), auftrag_path, 0)
+        placed.append(auftrag_path)
+        logger.info(f"  ✓ Auftrag-PDF: {auftrag_path} (Seite 1)")
+        if on_placed:
+            on_placed(auftrag_path)
+
+        if anhang_path:
+            anhang_path, anhang_hash = place(range(1, num_pages), anhang_path, 1)
+            placed.append(anhang_path)
+            logger.info(f"  ✓ Anhang-PDF: {anhang_path.name} (Seiten 2-{num_pages})")
+            if on_placed:
+                on_placed(anhang_path)
+        else:
+            logger.info(f"  ℹ Kein Anhang (nur 1 Seite)")
+    except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="split")
+        # Keine halben Aufträge im Archiv lassen
+        for path in placed:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        if isinstance(e, OSError):
+            raise
+        raise PDFSplitError(f"PDF-Split fehlgeschlagen: {e}")
+
+    if blob_store.is_enabled(config):
+        store = blob_store.store_dir(archiv_root, config)
+        blob_store.adopt(auftrag_path, auftrag_hash, store)
+        if anhang_path:
+            blob_store.adopt(anhang_path, anhang_hash, store)
+
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - split_start, stage="split")
+    return PlacedSplit(auftrag_path, auftrag_hash, anhang_path, num_pages, anhang_hash)
+
+
 def combine_pdfs_to_anhang(
     pdf_paths: list[Path],
     output_path: Path,
@@ -101,6 +280,8 @@ def combine_pdfs_to_anhang(
     """
     Kombiniert mehrere PDFs zu einer Anhang-PDF.
     
+    Speicherschonend über pdf_merge (Seite für Seite, Temp-Datei + Umbenennen).
+    
     Args:
         pdf_paths: Liste der zu kombinierenden PDFs
         output_path: Pfad für Ausgabe-PDF
@@ -112,23 +293,12 @@ def combine_pdfs_to_anhang(
     try:
         logger.info(f"📑 Kombiniere {len(pdf_paths)} PDFs zu Anhang...")
         
-        writer = PdfWriter()
-        total_pages = 0
+        page_counts = merge_pdf_files(pdf_paths, output_path)
+        total_pages = sum(page_counts)
         
-        for pdf_path in pdf_paths:
-            reader = PdfReader(str(pdf_path))
-            num_pages = len(reader.pages)
-            
-            for page_num in range(num_pages):
-                writer.add_page(reader.pages[page_num])
-            
-            total_pages += num_pages
+        for pdf_path, num_pages in zip(pdf_paths, page_counts):
             logger.info(f"  + {pdf_path.name}: {num_pages} Seiten")
         
-        # Speichern
-        with open(output_path, 'wb') as f:
-            writer.write(f)
-        
         logger.info(f"  ✓ Anhang-PDF: {output_path.name} (Gesamt: {total_pages} Seiten)")
         
     except Exception as e:
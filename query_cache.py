@@ -0,0 +1,313 @@
+"""
+Ergebnis-Cache für Datenbank-Suchen.
+
+LRU-Cache vor den Suchfunktionen in db.py. Wiederholte Suchen (z.B. "Garantie",
+Stammkunden, heutige Aufträge) werden aus dem Speicher beantwortet, statt
+jedes Mal SQLite über das Netzlaufwerk abzufragen.
+
+Invalidierung:
+- Generationszähler pro Datenbank: jeder Schreibpfad ruft `invalidate(db_path)`
+  auf, danach sind alle älteren Einträge unerreichbar.
+- `PRAGMA data_version` auf einer eigenen, nur lesenden Verbindung erkennt
+  Schreibzugriffe anderer Prozesse (CLI-Skripte, zweite Server-Instanz).
+  Abgefragt wird höchstens alle `DATA_VERSION_INTERVAL` Sekunden und ohne
+  den Cache-Lock - über SMB dauert das PRAGMA einen Netzwerk-Roundtrip, und
+  Treffer anderer Threads sollen darauf nicht warten.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Standardgröße (Anzahl gecachter Suchergebnisse); 0 = Cache deaktiviert
+DEFAULT_MAX_ENTRIES = 256
+
+# Mindestabstand zwischen zwei data_version-Abfragen pro Datenbank (Sekunden)
+DATA_VERSION_INTERVAL = 0.2
+
+
+CACHE_REQUESTS = metrics.REGISTRY.counter(
+    'werkstatt_query_cache_requests_total',
+    'Zugriffe auf den Such-Cache (hit, miss, bypass)',
+    ('result',)
+)
+
+CACHE_ENTRIES = metrics.REGISTRY.gauge(
+    'werkstatt_query_cache_entries',
+    'Anzahl Einträge im Such-Cache'
+)
+
+CACHE_INVALIDATIONS = metrics.REGISTRY.counter(
+    'werkstatt_query_cache_invalidations_total',
+    'Invalidierungen des Such-Caches nach Ursache (write, data_version)',
+    ('reason',)
+)
+
+
+def _db_key(db_path: Path) -> str:
+    """Normalisierter Schlüssel für eine Datenbank (ohne Dateisystemzugriff)."""
+    return os.path.normcase(os.path.abspath(str(db_path)))
+
+
+class QueryCache:
+    """Thread-sicherer LRU-Cache mit Generationszähler pro Datenbank."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            max_entries: Maximale Anzahl Einträge (0 = deaktiviert)
+        """
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._data_versions: Dict[str, int] = {}
+        self._watch_connections: Dict[str, sqlite3.Connection] = {}
+        self._watch_locks: Dict[str, threading.Lock] = {}
+        self._version_checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries: int) -> None:
+        """Ändert die Größe (überzählige Einträge werden sofort verdrängt)."""
+        with self._lock:
+            self.max_entries = max(0, int(max_entries))
+            self._evict_locked()
+
+    def invalidate(self, db_path: Optional[Path] = None, reason: str = 'write') -> None:
+        """
+        Macht alle Einträge einer Datenbank (oder aller Datenbanken) ungültig.
+
+        Args:
+            db_path: Datenbank, None = alle
+            reason: Ursache für die Metrik
+        """
+        with self._lock:
+            keys = [_db_key(db_path)] if db_path is not None else list(self._generations)
+            for key in keys:
+                self._bump_locked(key)
+        CACHE_INVALIDATIONS.inc(reason=reason)
+
+    def get_or_load(self, db_path: Path, name: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Liefert ein gecachtes Ergebnis oder lädt es über `loader`.
+
+        Args:
+            db_path: Pfad zur Datenbank
+            name: Name der Suchfunktion
+            key: Normalisierte Suchparameter
+            loader: Führt die eigentliche Abfrage aus
+
+        Returns:
+            Ergebnis (bei Listen von Dicts als flache Kopie)
+        """
+        if self.max_entries == 0 or not Path(db_path).exists():
+            CACHE_REQUESTS.inc(result='bypass')
+            return loader()
+
+        db_key = _db_key(db_path)
+        self._check_data_version(db_key, db_path)
+
+        with self._lock:
+            generation = self._generations.get(db_key, 0)
+            cache_key = (db_key, generation, name, key)
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                value = self._entries[cache_key]
+                self.hits += 1
+                CACHE_REQUESTS.inc(result='hit')
+                return _copy_result(value)
+            self.misses += 1
+        CACHE_REQUESTS.inc(result='miss')
+
+        value = loader()
+
+        with self._lock:
+            # Nur speichern, wenn während der Abfrage nicht invalidiert wurde
+            if self._generations.get(db_key, 0) == generation:
+                self._entries[cache_key] = value
+                self._entries.move_to_end(cache_key)
+                self._evict_locked()
+        return _copy_result(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Trefferstatistik für Diagnose-Endpunkte."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.max_entries > 0,
+                'max_entries': self.max_entries,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'generations': dict(self._generations)
+            }
+
+    def clear(self) -> None:
+        """Leert den Cache und schließt die Überwachungsverbindungen."""
+        with self._lock:
+            self._entries.clear()
+            for conn in self._watch_connections.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._watch_connections.clear()
+            self._data_versions.clear()
+            self._version_checked.clear()
+            CACHE_ENTRIES.set(0)
+
+    def _check_data_version(self, db_key: str, db_path: Path) -> None:
+        """
+        Invalidiert, wenn ein anderer Prozess/eine andere Verbindung geschrieben hat.
+
+        Das PRAGMA läuft außerhalb des Cache-Locks und höchstens alle
+        DATA_VERSION_INTERVAL Sekunden; der Lock wird nur zum Vergleichen
+        und Leeren genommen. Läuft für die Datenbank schon eine Abfrage,
+        wird nicht gewartet.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._version_checked.get(db_key, float('-inf')) < DATA_VERSION_INTERVAL:
+                return
+            self._version_checked[db_key] = now
+            watch_lock = self._watch_locks.setdefault(db_key, threading.Lock())
+            conn = self._watch_connections.get(db_key)
+
+        if not watch_lock.acquire(blocking=False):
+            return
+        try:
+            try:
+                if conn is None:
+                    conn = sqlite3.connect(str(db_path), timeout=5.0, check_same_thread=False)
+                    with self._lock:
+                        self._watch_connections[db_key] = conn
+                version = conn.execute('PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error as e:
+                logger.debug(f"data_version nicht lesbar ({e}), Cache wird geleert")
+                with self._lock:
+                    self._watch_connections.pop(db_key, None)
+                    self._data_versions.pop(db_key, None)
+                    self._bump_locked(db_key)
+                return
+
+            with self._lock:
+                previous = self._data_versions.get(db_key)
+                self._data_versions[db_key] = version
+                if previous is not None and previous != version:
+                    self._bump_locked(db_key)
+                    CACHE_INVALIDATIONS.inc(reason='data_version')
+        finally:
+            watch_lock.release()
+
+    def _bump_locked(self, db_key: str) -> None:
+        """Erhöht die Generation und entfernt veraltete Einträge (Lock muss gehalten werden)."""
+        self._generations[db_key] = self._generations.get(db_key, 0) + 1
+        for cache_key in [k for k in self._entries if k[0] == db_key]:
+            del self._entries[cache_key]
+        CACHE_ENTRIES.set(len(self._entries))
+
+    def _evict_locked(self) -> None:
+        """Verdrängt die ältesten Einträge über der Größengrenze."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        CACHE_ENTRIES.set(len(self._entries))
+
+
+def _copy_result(value: Any) -> Any:
+    """Flache Kopie, damit Aufrufer gecachte Zeilen nicht verändern."""
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _fold_ascii(value: Any) -> Any:
+    """
+    Kleinschreibung nur für reine ASCII-Strings.
+
+    SQLite LIKE ist nur für ASCII case-insensitiv ("Müller" ≠ "MÜLLER"),
+    daher dürfen nur solche Werte auf denselben Schlüssel fallen.
+    """
+    if isinstance(value, str) and value.isascii():
+        return value.lower()
+    return value
+
+
+def like_key(*args: Any, **kwargs: Any) -> Tuple:
+    """Schlüssel für LIKE-Suchen (ASCII case-insensitiv)."""
+    return tuple(_fold_ascii(a) for a in args) + tuple(sorted(kwargs.items()))
+
+
+def exact_key(*args: Any, **kwargs: Any) -> Tuple:
+    """Schlüssel für exakte Vergleiche (=, BETWEEN, >=)."""
+    return tuple(args) + tuple(sorted(kwargs.items()))
+
+
+def criteria_key(criteria: Dict[str, Any], exact_fields: Tuple[str, ...] = ()) -> Tuple:
+    """
+    Schlüssel für Multi-Kriterien-Suchen.
+
+    Leere Kriterien werden entfernt (sie verändern die Abfrage nicht), die
+    Reihenfolge der Felder spielt keine Rolle.
+
+    Args:
+        criteria: Suchkriterien
+        exact_fields: Felder mit exaktem Vergleich (nicht case-normalisieren)
+    """
+    return tuple(sorted(
+        (field, value if field in exact_fields else _fold_ascii(value))
+        for field, value in criteria.items()
+        if value
+    ))
+
+
+# Prozessweite Instanz
+CACHE = QueryCache()
+
+
+def cached(name: str, key_func: Callable[..., Hashable] = exact_key) -> Callable:
+    """
+    Decorator für Suchfunktionen mit Signatur (db_path, *args).
+
+    Args:
+        name: Eindeutiger Name der Suchfunktion
+        key_func: Bildet aus den Suchparametern einen normalisierten Schlüssel
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(db_path, *args, **kwargs):
+            key = (key_func(*args, **kwargs),)
+            return CACHE.get_or_load(db_path, name, key, lambda: func(db_path, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def invalidate(db_path: Optional[Path] = None) -> None:
+    """Kurzform für CACHE.invalidate (für alle Schreibpfade)."""
+    CACHE.invalidate(db_path)
+
+
+def configure(max_entries: int) -> None:
+    """Kurzform für CACHE.configure."""
+    CACHE.configure(max_entries)
+
+
+def stats() -> Dict[str, Any]:
+    """Kurzform für CACHE.stats."""
+    return CACHE.stats()
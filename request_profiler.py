@@ -0,0 +1,338 @@
+"""
+Request-Profiler für die Web-UI.
+
+Profiliert einzelne Flask-Requests mit cProfile und misst zusätzlich die
+Laufzeit jeder SQL-Anweisung. Die letzten N Profile werden in einem
+Ringpuffer gehalten und sind unter `/debug/profiles` abrufbar.
+
+Aktivierung (mit gültigem `X-Profile-Token`; ohne Token nur von localhost,
+wenn `profiler_local_only` gesetzt ist):
+    - Header `X-Profile: 1` oder Query-Parameter `?_profile=1`
+    - Stichprobe: Config-Wert `profiler_sample_rate` (z.B. 0.01 = 1%)
+
+Ohne aktives Profil entsteht kein Overhead außer einer Thread-Local-Abfrage
+pro SQL-Verbindung.
+"""
+
+import cProfile
+import hmac
+import itertools
+import marshal
+import pstats
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Adressen, die im Modus local_only ohne Token profilieren dürfen
+LOCAL_ADDRESSES = {'127.0.0.1', '::1', 'localhost'}
+
+# Maximale Länge einer gespeicherten SQL-Anweisung
+MAX_SQL_LENGTH = 500
+
+# Anzahl Funktionen, die pro Profil für die Übersicht aufbewahrt werden
+MAX_STORED_FUNCTIONS = 200
+
+
+# Thread-lokaler Zustand des gerade laufenden Profils (SQL-Liste)
+_active = threading.local()
+_original_connect = sqlite3.connect
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+# cProfile darf prozessweit nur einmal gleichzeitig laufen (ab Python 3.12
+# wirft ein zweites enable() ValueError). Wer den Lock nicht bekommt,
+# läuft ohne Profil weiter.
+_profile_lock = threading.Lock()
+
+
+def _record_sql(sql: str, duration: float) -> None:
+    """Hängt eine SQL-Messung an das Profil des aktuellen Threads an."""
+    statements = getattr(_active, 'sql', None)
+    if statements is not None:
+        statements.append({
+            'sql': ' '.join(str(sql).split())[:MAX_SQL_LENGTH],
+            'duration_ms': round(duration * 1000, 3)
+        })
+
+
+class _ProfilingCursor(sqlite3.Cursor):
+    """Cursor, der die Laufzeit jeder Anweisung erfasst."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(sql, time.perf_counter() - start)
+
+
+class _ProfilingConnection(sqlite3.Connection):
+    """Connection, deren Cursor SQL-Laufzeiten erfassen."""
+
+    def cursor(self, factory=_ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _profiling_connect(*args, **kwargs):
+    """Ersatz für sqlite3.connect: nur während eines Profils instrumentiert."""
+    if getattr(_active, 'sql', None) is not None and 'factory' not in kwargs and len(args) <= 5:
+        kwargs['factory'] = _ProfilingConnection
+    return _original_connect(*args, **kwargs)
+
+
+def _install_sql_hook() -> None:
+    """Ersetzt sqlite3.connect einmalig durch die profilierende Variante."""
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sqlite3.connect = _profiling_connect
+            _hook_installed = True
+            logger.info("SQL-Profiling für sqlite3.connect aktiviert")
+
+
+def _summarize_stats(stats: pstats.Stats, limit: int = MAX_STORED_FUNCTIONS) -> List[Dict[str, Any]]:
+    """
+    Wandelt pstats-Daten in eine nach kumulierter Zeit sortierte Liste um.
+
+    Args:
+        stats: pstats-Objekt
+        limit: Maximale Anzahl Funktionen
+
+    Returns:
+        Liste von Dicts (function, file, line, calls, tottime_ms, cumtime_ms)
+    """
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            'function': func,
+            'file': filename,
+            'line': line,
+            'calls': nc,
+            'primitive_calls': cc,
+            'tottime_ms': round(tt * 1000, 3),
+            'cumtime_ms': round(ct * 1000, 3)
+        })
+    rows.sort(key=lambda r: r['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class RequestProfiler:
+    """Profiliert ausgewählte Requests und hält die letzten N Profile vor."""
+
+    def __init__(self, max_profiles: int = 50, sample_rate: float = 0.0, token: str = "",
+                 local_only: bool = False):
+        """
+        Initialisiert den Profiler.
+
+        Args:
+            max_profiles: Größe des Ringpuffers
+            sample_rate: Anteil zufällig profilierter Requests (0.0 - 1.0)
+            token: Token für den Zugriff (Header X-Profile-Token)
+            local_only: Nur localhost, dafür ohne Token. Nur setzen, wenn kein
+                        Reverse-Proxy auf demselben Rechner davor steht -
+                        dessen Clients kämen sonst alle als localhost an.
+        """
+        self._lock = threading.Lock()
+        self._profiles: deque = deque(maxlen=max(1, int(max_profiles)))
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self.sample_rate = float(sample_rate or 0.0)
+        self.token = token or ""
+        self.local_only = bool(local_only)
+
+    def configure(self, max_profiles: int, sample_rate: float, token: str, local_only: bool = False) -> None:
+        """Übernimmt geänderte Einstellungen (Ringpuffer behält die neuesten Einträge)."""
+        max_profiles = max(1, int(max_profiles))
+        with self._lock:
+            if self._profiles.maxlen != max_profiles:
+                self._profiles = deque(self._profiles, maxlen=max_profiles)
+        self.sample_rate = float(sample_rate or 0.0)
+        self.token = token or ""
+        self.local_only = bool(local_only)
+
+    def is_authorized(self, remote_addr: Optional[str], headers: Mapping[str, str]) -> bool:
+        """
+        Prüft, ob der Aufrufer profilieren bzw. Profile abrufen darf.
+
+        Args:
+            remote_addr: Client-Adresse
+            headers: Request-Header
+
+        Returns:
+            True im Modus local_only für localhost, sonst nur bei passendem
+            X-Profile-Token (ohne konfiguriertes Token: nie)
+        """
+        if self.local_only:
+            return remote_addr in LOCAL_ADDRESSES
+        if not self.token:
+            return False
+        supplied = headers.get('X-Profile-Token') or ''
+        return hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8'))
+
+    def should_profile(self, remote_addr: Optional[str], headers: Mapping[str, str],
+                       args: Mapping[str, str]) -> Optional[str]:
+        """
+        Entscheidet, ob der aktuelle Request profiliert wird.
+
+        Returns:
+            "explicit", "sampled" oder None
+        """
+        requested = headers.get('X-Profile') == '1' or args.get('_profile') == '1'
+        if requested and self.is_authorized(remote_addr, headers):
+            return 'explicit'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def start(self, trigger: str) -> bool:
+        """
+        Startet cProfile und SQL-Messung für den aktuellen Thread.
+
+        Läuft bereits ein Profil (anderer Request), wird dieser Request nicht
+        profiliert - der Request selbst läuft normal weiter.
+
+        Returns:
+            True, wenn das Profil gestartet wurde
+        """
+        if not _profile_lock.acquire(blocking=False):
+            logger.debug("Profil übersprungen: anderer Request wird bereits profiliert")
+            return False
+        try:
+            _install_sql_hook()
+            profile = cProfile.Profile()
+            profile.enable()
+        except ValueError as e:
+            # Anderes Profiling-Werkzeug aktiv (z.B. Debugger, sys.monitoring)
+            _profile_lock.release()
+            logger.debug(f"Profil übersprungen: {e}")
+            return False
+        except BaseException:
+            _profile_lock.release()
+            raise
+        self._local.profile = profile
+        self._local.trigger = trigger
+        self._local.started = time.perf_counter()
+        _active.sql = []
+        return True
+
+    def is_active(self) -> bool:
+        """Ob im aktuellen Thread ein Profil läuft."""
+        return getattr(self._local, 'profile', None) is not None
+
+    def stop(self, method: str, path: str, status: int) -> Optional[Dict[str, Any]]:
+        """
+        Beendet das Profil des aktuellen Threads und legt es im Ringpuffer ab.
+
+        Args:
+            method: HTTP-Methode
+            path: Request-Pfad
+            status: HTTP-Statuscode
+
+        Returns:
+            Übersicht des gespeicherten Profils oder None, wenn keines lief
+        """
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return None
+
+        try:
+            profile.disable()
+        finally:
+            _profile_lock.release()
+        duration = time.perf_counter() - self._local.started
+        sql_statements = getattr(_active, 'sql', None) or []
+        self._local.profile = None
+        _active.sql = None
+
+        stats = pstats.Stats(profile)
+        entry = {
+            'id': next(self._ids),
+            'timestamp': datetime.now().isoformat(),
+            'method': method,
+            'path': path,
+            'status': status,
+            'trigger': self._local.trigger,
+            'duration_ms': round(duration * 1000, 3),
+            'sql_count': len(sql_statements),
+            'sql_ms': round(sum(s['duration_ms'] for s in sql_statements), 3),
+            'sql': sql_statements,
+            'functions': _summarize_stats(stats),
+            'raw_stats': marshal.dumps(stats.stats)
+        }
+
+        with self._lock:
+            self._profiles.append(entry)
+
+        logger.info(f"🔬 Profil #{entry['id']}: {method} {path} "
+                    f"({entry['duration_ms']:.1f} ms, {entry['sql_count']} SQL)")
+        return self._public(entry, top_n=10, include_sql=False)
+
+    def discard(self) -> None:
+        """Verwirft ein noch laufendes Profil des aktuellen Threads (z.B. nach Abbruch)."""
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return
+        try:
+            profile.disable()
+        finally:
+            self._local.profile = None
+            _active.sql = None
+            _profile_lock.release()
+
+    @staticmethod
+    def _public(entry: Dict[str, Any], top_n: int, include_sql: bool) -> Dict[str, Any]:
+        """Baut die JSON-Darstellung eines Profils (ohne Rohdaten)."""
+        result = {k: v for k, v in entry.items() if k not in ('raw_stats', 'functions', 'sql')}
+        result['top_functions'] = entry['functions'][:top_n]
+        if include_sql:
+            result['sql'] = entry['sql']
+        return result
+
+    def list_profiles(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """Alle gespeicherten Profile, neueste zuerst."""
+        with self._lock:
+            entries = list(self._profiles)
+        return [self._public(e, top_n, include_sql=False) for e in reversed(entries)]
+
+    def get_profile(self, profile_id: int, top_n: int = 30) -> Optional[Dict[str, Any]]:
+        """Einzelnes Profil inkl. SQL-Anweisungen."""
+        entry = self._find(profile_id)
+        return self._public(entry, top_n, include_sql=True) if entry else None
+
+    def get_raw_stats(self, profile_id: int) -> Optional[bytes]:
+        """pstats-kompatible Rohdaten (ladbar mit pstats.Stats / snakeviz)."""
+        entry = self._find(profile_id)
+        return entry['raw_stats'] if entry else None
+
+    def clear(self) -> None:
+        """Leert den Ringpuffer."""
+        with self._lock:
+            self._profiles.clear()
+
+    def _find(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry in self._profiles:
+                if entry['id'] == profile_id:
+                    return entry
+        return None
@@ -25,26 +25,12 @@ def main():
     logger.info("=" * 60)
     
     try:
-        # Web-App importieren
+        # Web-App importieren (OCR-Module werden erst bei Bedarf geladen)
         logger.info("Lade Web-Anwendung...")
-        from web_app import app
+        from web_app import app, warmup_ocr_in_background
         
-        # Konfiguration laden
-        logger.info("Lade Konfiguration...")
-        import config
-        import ocr
-        
-        cfg = config.Config()
-        
-        # Tesseract und Poppler setup
-        tesseract_cmd = cfg.get("tesseract_cmd")
-        if tesseract_cmd:
-            ocr.setup_tesseract(tesseract_cmd)
-        
-        poppler_path = cfg.get("poppler_path")
-        poppler_bin = ocr.setup_poppler(poppler_path)
-        if poppler_bin:
-            logger.info(f"Poppler konfiguriert: {poppler_bin}")
+        # Tesseract und Poppler im Hintergrund einrichten, Server startet sofort
+        warmup_ocr_in_background()
         
         # Server-Einstellungen
         host = '0.0.0.0'  # Auf allen Netzwerk-Interfaces
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für die Umstellung der Archivstruktur (archive_migrate.py).
+
+Altes Archiv mit Tausender-Blöcken und einem Auftragsordner direkt im Root;
+Ziel ist die Jahr-Struktur. Auftrag 000123 liegt in zwei Ordnern, die im
+selben Zielordner zusammengeführt werden (Einträge einzeln).
+
+Szenario A: Migration bricht mitten in der Zusammenführung ab (ein Eintrag
+schon verschoben) -> Fortsetzen -> vollständig -> Rollback -> Ausgangsstand.
+Szenario B: Migration bricht ebenso ab -> direkt Rollback -> Ausgangsstand
+(auch die teilweise verschobenen Einträge kommen zurück).
+
+Geprüft werden jeweils Dateien (Pfade + Hashes) und alle file_path der DB.
+
+Verwendung:
+    python test_archive_migrate.py
+
+Exit-Code 1 bei Fehlschlag.
+"""
+
+import hashlib
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Lokale Module
+try:
+    import archive_migrate
+    import db
+except ImportError as e:
+    print(f"❌ Fehler: Module nicht gefunden ({e}). Führen Sie das Skript im Projekt-Verzeichnis aus.")
+    sys.exit(1)
+
+
+CONFIG = {'use_year_folders': True, 'use_thousand_blocks': False, 'auftragsnummer_pad_length': 6}
+# Beim ersten Lauf schlägt das Verschieben dieses Eintrags fehl (Abbruch)
+FAIL_ENTRY = "000123_Auftrag.pdf"
+
+
+def setup(tmp: Path) -> Tuple[Path, Path]:
+    """Legt Archiv und Datenbank im alten Layout an."""
+    archiv_root = tmp / "Archiv"
+    db_path = archiv_root / "werkstatt.db"
+    archiv_root.mkdir(parents=True)
+    db.init_db(db_path)
+
+    files = [
+        # (Ordner, Datei, Auftragsnummer, Datum)
+        ("000000-000999/000123", "000123_Auftrag.pdf", "123", "2024-03-01"),
+        ("000000-000999/000123", "000123_Anhang.pdf", None, None),
+        ("000123", "000123_Auftrag_v2.pdf", "123", "2024-06-01"),
+        ("000000-000999/000456", "000456_Auftrag.pdf", "456", "2023-01-15"),
+        ("001000-001999/001789", "001789_Auftrag.pdf", "1789", "2022-11-30"),
+        ("001000-001999/001789", "001789_Daten.csv", None, None),
+    ]
+    for folder, name, auftrag_nr, datum in files:
+        path = archiv_root / folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(f"{folder}/{name}".encode() * 200)
+        if auftrag_nr:
+            db.insert_auftrag(db_path, {'auftrag_nr': auftrag_nr, 'datum': datum}, {}, path)
+    return archiv_root, db_path
+
+
+def snapshot(archiv_root: Path, db_path: Path) -> Tuple[Dict[str, str], Dict[int, str]]:
+    """(Archivdateien -> SHA256, Auftrag-ID -> file_path)."""
+    files = {
+        path.relative_to(archiv_root).as_posix(): hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in archiv_root.rglob('*')
+        if path.is_file() and not path.name.startswith("werkstatt.db")
+    }
+    conn = db._get_optimized_connection(db_path)
+    try:
+        paths = {row['id']: row['file_path'] for row in conn.execute('SELECT id, file_path FROM auftraege')}
+    finally:
+        conn.close()
+    return files, paths
+
+
+def interrupted_migrate(archiv_root: Path, db_path: Path) -> Dict:
+    """Migration, bei der ein Eintrag der Zusammenführung fehlschlägt."""
+    original_rename = archive_migrate._rename
+
+    def failing_rename(src: Path, dst: Path) -> None:
+        if src.name == FAIL_ENTRY and src.parent.parent.name == "000000-000999":
+            raise OSError("simulierter Abbruch")
+        original_rename(src, dst)
+
+    archive_migrate._rename = failing_rename
+    try:
+        return archive_migrate.migrate(db_path, archiv_root, CONFIG, workers=2)
+    finally:
+        archive_migrate._rename = original_rename
+
+
+def check(label: str, condition: bool) -> bool:
+    print(f"  {'✓' if condition else '❌'} {label}")
+    return condition
+
+
+def scenario(tmp: Path, resume: bool) -> bool:
+    archiv_root, db_path = setup(tmp)
+    original = snapshot(archiv_root, db_path)
+    ok = True
+
+    print("▶ Migration mit Abbruch...")
+    report = interrupted_migrate(archiv_root, db_path)
+    ok &= check(f"ein Ordner fehlgeschlagen (failed={report.get('failed')})", report.get('failed') == 1)
+    ok &= check("Anhang schon verschoben (Zusammenführung halb fertig)",
+                (archiv_root / "2024" / "000123" / "000123_Anhang.pdf").exists())
+
+    if resume:
+        print("▶ Fortsetzen...")
+        report = archive_migrate.migrate(db_path, archiv_root, CONFIG, workers=2)
+        ok &= check(f"fortgesetzt ohne Fehler (resumed={report.get('resumed')}, failed={report.get('failed')})",
+                    report.get('resumed') is True and not report.get('failed'))
+        files, paths = snapshot(archiv_root, db_path)
+        ok &= check("alle Dateien erhalten", sorted(files.values()) == sorted(original[0].values()))
+        ok &= check("alle file_path zeigen auf vorhandene Dateien in Jahr-Ordnern",
+                    all(Path(p).exists() and Path(p).parent.parent.name.isdigit()
+                        and len(Path(p).parent.parent.name) == 4 for p in paths.values()))
+
+    print("▶ Rollback...")
+    report = archive_migrate.rollback(db_path, archiv_root, workers=2)
+    ok &= check(f"Rollback ohne Fehler (failed={report.get('failed')})", not report.get('failed'))
+    files, paths = snapshot(archiv_root, db_path)
+    ok &= check("Dateien wie vor der Migration", files == original[0])
+    ok &= check("file_path wie vor der Migration", paths == original[1])
+
+    report = archive_migrate.migrate(db_path, archiv_root, CONFIG, dry_run=True)
+    ok &= check("kein offener Lauf mehr", report.get('resumed') is False)
+    return ok
+
+
+def main() -> int:
+    ok = True
+    for label, resume in (("A: Abbruch, Fortsetzen, Rollback", True), ("B: Abbruch, Rollback", False)):
+        print(f"\n=== Szenario {label} ===")
+        tmp = Path(tempfile.mkdtemp(prefix="werkstatt_migrate_test_"))
+        try:
+            ok &= scenario(tmp, resume)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✓ Archiv-Migration OK" if ok else "\n❌ Archiv-Migration fehlerhaft")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für das inkrementelle Archiv-Backup.
+
+Ablauf in einem temporären Ordner:
+1. reines Datenbank-Backup (ältestes, darf bei der Bereinigung weg)
+2. vollständiges Archiv-Backup
+3. Datei ändern (an Ort und Stelle), Ordner umbenennen, Datei löschen,
+   Datei hinzufügen -> inkrementelles Backup
+4. noch eine Änderung -> zweites inkrementelles Backup
+5. cleanup_old_backups mit keep_count=2: das DB-Backup wird gelöscht, das
+   vollständige Backup bleibt als Teil der Kette erhalten
+6. jeden Zeitpunkt (voll, inkrementell 1 und 2) wiederherstellen und die
+   Hashes mit dem damaligen Archivstand vergleichen
+
+Verwendung:
+    python test_backup.py
+
+Exit-Code 1 bei Fehlschlag.
+"""
+
+import hashlib
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+# Lokale Module
+try:
+    import backup
+    import db
+except ImportError as e:
+    print(f"❌ Fehler: Module nicht gefunden ({e}). Führen Sie das Skript im Projekt-Verzeichnis aus.")
+    sys.exit(1)
+
+
+ARCHIVE_NAME = "Archiv"
+
+
+def snapshot(archiv_root: Path) -> Dict[str, str]:
+    """SHA256 aller Archivdateien (relativer Pfad -> Hash)."""
+    return {
+        path.relative_to(archiv_root).as_posix(): hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in sorted(archiv_root.rglob('*'))
+        if path.is_file()
+    }
+
+
+def write(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def make_backup(archiv_root: Path, db_path: Path, config_path: Path, backup_dir: Path,
+                include_archive: bool = True, full_archive: bool = False) -> Path:
+    # Dateinamen haben Sekundenauflösung
+    time.sleep(1.1)
+    return backup.create_backup(archiv_root, db_path, config_path, backup_dir,
+                                include_archive=include_archive, full_archive=full_archive)
+
+
+def main() -> int:
+    tmp = Path(tempfile.mkdtemp(prefix="werkstatt_backup_test_"))
+    ok = True
+    try:
+        archiv_root = tmp / ARCHIVE_NAME
+        db_path = archiv_root / "werkstatt.db"
+        config_path = tmp / "config.json"
+        backup_dir = tmp / "backups"
+        archiv_root.mkdir()
+        db.init_db(db_path)
+        config_path.write_text("{}", encoding="utf-8")
+
+        write(archiv_root / "000" / "000001_Auftrag.pdf", b"%PDF-1 " * 500)
+        write(archiv_root / "000" / "000002_Auftrag.pdf", b"%PDF-2 " * 500)
+        write(archiv_root / "001" / "001001_Auftrag.pdf", b"%PDF-3 " * 500)
+        write(archiv_root / "001" / "001002_Auftrag.pdf", b"%PDF-4 " * 500)
+
+        print("▶ Reines Datenbank-Backup...")
+        db_only = make_backup(archiv_root, db_path, config_path, backup_dir, include_archive=False)
+
+        print("▶ Vollständiges Archiv-Backup...")
+        states = []
+        full = make_backup(archiv_root, db_path, config_path, backup_dir, full_archive=True)
+        states.append((full, snapshot(archiv_root)))
+
+        print("▶ Ändern, umbenennen, löschen, hinzufügen -> inkrementell...")
+        write(archiv_root / "000" / "000001_Auftrag.pdf", b"%PDF-1 geaendert " * 500)
+        (archiv_root / "001").rename(archiv_root / "2024")
+        (archiv_root / "000" / "000002_Auftrag.pdf").unlink()
+        write(archiv_root / "002" / "002001_Auftrag.pdf", b"%PDF-5 " * 500)
+        inc1 = make_backup(archiv_root, db_path, config_path, backup_dir)
+        states.append((inc1, snapshot(archiv_root)))
+
+        info = backup.read_backup_info(inc1) or {}
+        print(f"  {info.get('type')}: {info.get('stored')} gespeichert, "
+              f"{info.get('referenced')} referenziert, {len(info.get('deleted', []))} gelöscht")
+        if info.get('type') != 'incremental' or info.get('stored') != 2:
+            print("❌ Erwartet: inkrementell mit 2 gespeicherten Dateien (geändert + neu)")
+            ok = False
+
+        print("▶ Zweites inkrementelles Backup...")
+        write(archiv_root / "2024" / "001001_Auftrag.pdf", b"%PDF-3 neu " * 700)
+        inc2 = make_backup(archiv_root, db_path, config_path, backup_dir)
+        states.append((inc2, snapshot(archiv_root)))
+
+        print("▶ Bereinigung (keep_count=2)...")
+        backup.cleanup_old_backups(backup_dir, keep_count=2)
+        remaining = {p.name for p in backup_dir.glob(backup.BACKUP_PATTERN)}
+        if db_only.name in remaining:
+            print("❌ Altes Datenbank-Backup wurde nicht gelöscht")
+            ok = False
+        missing = [b.name for b, _ in states if b.name not in remaining]
+        if missing:
+            print(f"❌ Backups der Kette gelöscht: {missing}")
+            ok = False
+
+        for index, (backup_zip, expected) in enumerate(states):
+            if backup_zip.name not in remaining:
+                continue
+            print(f"▶ Wiederherstellen: {backup_zip.name}...")
+            target = tmp / f"restore_{index}"
+            try:
+                stats = backup.restore_backup(backup_zip, target)
+            except backup.BackupError as e:
+                print(f"❌ Wiederherstellung fehlgeschlagen: {e}")
+                ok = False
+                continue
+            restored = {rel: sha for rel, sha in snapshot(target / ARCHIVE_NAME).items()
+                        if not rel.startswith("werkstatt.db")}
+            expected = {rel: sha for rel, sha in expected.items() if not rel.startswith("werkstatt.db")}
+            if stats['errors'] or restored != expected:
+                print(f"❌ Stand weicht ab: fehlt {sorted(set(expected) - set(restored))}, "
+                      f"zu viel {sorted(set(restored) - set(expected))}, "
+                      f"anders {sorted(r for r in expected if r in restored and restored[r] != expected[r])}")
+                ok = False
+            else:
+                print(f"  ✓ {len(restored)} Dateien, Hashes stimmen")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("✓ Backup OK" if ok else "❌ Backup fehlerhaft")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für die Lease-basierte Verteilung (Cluster-Modus).
+Simuliert mehrere Watcher-Knoten als lokale Prozesse auf einer gemeinsamen
+Datenbank und einem gemeinsamen Eingangsordner.
+
+Knoten:
+- N normale Knoten: beanspruchen Dateien, "verarbeiten" sie (kurze Pause,
+  Protokoll-Eintrag, Datei löschen) und geben sie frei
+- ein abstürzender Knoten: beansprucht Dateien und beendet sich hart
+  (Lease bleibt stehen, Prozess tot -> sofort übernehmbar)
+- ein hängender Knoten: beansprucht Dateien und sendet keinen Heartbeat mehr
+  (Prozess lebt -> Übernahme erst nach Ablauf der TTL)
+
+Vorab: verlorene Lease - ein Knoten, dessen Lease übernommen wurde, muss
+mit LeaseLostError abbrechen (ensure_held), statt weiterzuarbeiten.
+
+Verwendung:
+    python test_file_leases.py
+    python test_file_leases.py --nodes 4 --files 200 --ttl 2
+
+Exit-Code 1, wenn eine Datei mehrfach oder gar nicht verarbeitet wurde.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# Lokale Module
+try:
+    import file_leases
+except ImportError as e:
+    print(f"❌ Fehler: Module nicht gefunden ({e}). Führen Sie das Skript im Projekt-Verzeichnis aus.")
+    sys.exit(1)
+
+
+def normal_node(db_path: str, inbox: str, log_dir: str, ttl: float, deadline: float) -> None:
+    """Verarbeitet Dateien, bis der Eingangsordner leer ist."""
+    leases = file_leases.LeaseManager(Path(db_path), ttl=ttl)
+    log = open(Path(log_dir) / f"{os.getpid()}.log", "a", encoding="utf-8")
+    last_tick = 0.0
+    while time.time() < deadline:
+        files = sorted(Path(inbox).glob("*.pdf"))
+        if not files and not leases.leases():
+            break
+        random.shuffle(files)
+        for pdf in files:
+            if time.time() - last_tick >= leases.heartbeat_interval:
+                leases.tick()
+                last_tick = time.time()
+            if not leases.claim(pdf):
+                continue
+            try:
+                if not pdf.exists():
+                    continue
+                time.sleep(0.01)  # "OCR"
+                log.write(pdf.name + "\n")
+                log.flush()
+                pdf.unlink()
+            finally:
+                leases.release(pdf)
+        leases.tick()
+        time.sleep(0.05)
+    log.close()
+
+
+def crashing_node(db_path: str, inbox: str, count: int) -> None:
+    """Beansprucht Dateien und beendet sich ohne Freigabe."""
+    leases = file_leases.LeaseManager(Path(db_path), node_id="crash-node")
+    for pdf in sorted(Path(inbox).glob("*.pdf"))[:count]:
+        leases.claim(pdf)
+    os._exit(1)
+
+
+def hanging_node(db_path: str, inbox: str, count: int, ttl: float, ready) -> None:
+    """Beansprucht Dateien und hängt dann (kein Heartbeat)."""
+    leases = file_leases.LeaseManager(Path(db_path), node_id="hang-node", ttl=ttl)
+    for pdf in sorted(Path(inbox).glob("*.pdf"))[-count:]:
+        leases.claim(pdf)
+    ready.set()
+    time.sleep(ttl * 4)
+
+
+def check_lost_lease(tmp: Path, ttl: float) -> bool:
+    """Knoten A verliert seine Lease an B und darf nicht weiterarbeiten."""
+    db_path = tmp / "lost" / "werkstatt.db"
+    pdf = tmp / "lost" / "scan.pdf"
+    slow = file_leases.LeaseManager(db_path, node_id="slow-node", ttl=ttl)
+    other = file_leases.LeaseManager(db_path, node_id="other-node", ttl=ttl)
+    lost = []
+    slow.on_lost = lost.extend
+
+    assert slow.claim(pdf)
+    assert not other.claim(pdf)
+    time.sleep(ttl + 0.2)  # slow-node sendet keinen Heartbeat
+    assert other.claim(pdf)
+    slow.tick()
+
+    aborted = False
+    with file_leases.processing(slow, pdf):
+        try:
+            file_leases.ensure_held()
+        except file_leases.LeaseLostError:
+            aborted = True
+    with file_leases.processing(other, pdf):
+        file_leases.ensure_held()
+
+    conn = file_leases._connect(slow.lease_db)
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+
+    ok = aborted and lost == [pdf.name] and slow.is_lost(pdf) and journal_mode == "delete"
+    print(f"{'✓' if ok else '❌'} Verlorene Lease: Abbruch={aborted}, gemeldet={lost}, "
+          f"Lease-DB journal_mode={journal_mode}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Test für Lease-basierte Verteilung")
+    parser.add_argument("--nodes", type=int, default=3, help="Normale Knoten (Standard: 3)")
+    parser.add_argument("--files", type=int, default=100, help="Anzahl PDFs (Standard: 100)")
+    parser.add_argument("--ttl", type=float, default=2.0, help="Lease-Dauer in Sekunden (Standard: 2)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Maximale Laufzeit in Sekunden")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="lease_test_"))
+    try:
+        db_path = tmp / "werkstatt.db"
+        inbox = tmp / "eingang"
+        log_dir = tmp / "logs"
+        inbox.mkdir()
+        log_dir.mkdir()
+        for i in range(args.files):
+            (inbox / f"scan_{i:04d}.pdf").write_bytes(b"%PDF-1.4\n")
+
+        print("=" * 60)
+        print(f"  Lease-Test: {args.nodes} Knoten, {args.files} PDFs, TTL {args.ttl:.1f}s")
+        print("=" * 60)
+
+        if not check_lost_lease(tmp, min(args.ttl, 1.0)):
+            return 1
+
+        ctx = multiprocessing.get_context("spawn")
+        stuck = max(1, args.files // 20)
+
+        crasher = ctx.Process(target=crashing_node, args=(str(db_path), str(inbox), stuck))
+        crasher.start()
+        crasher.join()
+        print(f"💥 Abstürzender Knoten hat {stuck} Leases hinterlassen")
+
+        ready = ctx.Event()
+        hanger = ctx.Process(target=hanging_node, args=(str(db_path), str(inbox), stuck, args.ttl, ready))
+        hanger.start()
+        ready.wait(10)
+        print(f"🧊 Hängender Knoten hält {stuck} Leases ohne Heartbeat")
+
+        start = time.time()
+        deadline = start + args.timeout
+        nodes = [
+            ctx.Process(target=normal_node, args=(str(db_path), str(inbox), str(log_dir), args.ttl, deadline))
+            for _ in range(args.nodes)
+        ]
+        for node in nodes:
+            node.start()
+        for node in nodes:
+            node.join()
+        elapsed = time.time() - start
+        hanger.terminate()
+        hanger.join()
+
+        counts = Counter()
+        per_node = {}
+        for log_file in log_dir.glob("*.log"):
+            names = log_file.read_text(encoding="utf-8").split()
+            per_node[log_file.stem] = len(names)
+            counts.update(names)
+
+        duplicates = {name: n for name, n in counts.items() if n > 1}
+        missing = args.files - len(counts)
+        print(f"\n⏱️  Dauer: {elapsed:.1f}s")
+        for node, n in sorted(per_node.items()):
+            print(f"   Knoten {node}: {n} Dateien")
+
+        failed = False
+        if duplicates:
+            print(f"❌ Mehrfach verarbeitet: {duplicates}")
+            failed = True
+        if missing:
+            print(f"❌ Nicht verarbeitet: {missing} Dateien ({sorted(p.name for p in inbox.glob('*.pdf'))[:10]})")
+            failed = True
+        if not failed:
+            print(f"✓ Jede Datei genau einmal verarbeitet (inkl. {2 * stuck} übernommener Leases)")
+        print("=" * 60)
+        return 1 if failed else 0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
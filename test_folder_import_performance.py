@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für die Performance des Ordner-Imports.
+Erstellt einen synthetischen Auftragsordner mit mehreren PDFs, importiert ihn
+und prüft, dass jede PDF genau einmal per OCR verarbeitet wird.
+
+Standardmäßig wird die OCR simuliert (feste Zeit pro Seite), damit der
+Benchmark ohne Tesseract läuft und reproduzierbar ist. Mit --real-ocr wird
+die echte OCR verwendet (Tesseract + Poppler erforderlich).
+
+Verwendung:
+    python test_folder_import_performance.py
+    python test_folder_import_performance.py --pdfs 10 --pages 3 --ocr-ms 200 --workers 4
+    python test_folder_import_performance.py --real-ocr
+
+Exit-Code 1, wenn eine PDF mehrfach per OCR verarbeitet wurde oder die
+Schlagwort-Seitenzahlen nicht stimmen.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+# Lokale Module
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    import folder_import
+    import db
+    from config import Config
+except ImportError as e:
+    print(f"❌ Fehler: Module nicht gefunden ({e}). Führen Sie das Skript im Projekt-Verzeichnis aus.")
+    sys.exit(1)
+
+
+KEYWORD = "Garantie"
+AUFTRAG_TEXT = "Werkstattauftrag Auftrag Nr 076329 Kd. Nr 12345 Kennzeichen: AB-C 123"
+
+
+def create_synthetic_folder(root: Path, pdf_count: int, pages: int) -> Path:
+    """Erstellt einen Auftragsordner mit leeren A4-PDFs."""
+    folder = root / "076329"
+    folder.mkdir(parents=True)
+    for i in range(1, pdf_count + 1):
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=595, height=842)
+        with open(folder / f"{i:02d}_scan.pdf", "wb") as f:
+            writer.write(f)
+    return folder
+
+
+class SimulatedOCR:
+    """Ersatz für pdf_to_ocr_texts: feste Zeit pro Seite, zählt Aufrufe pro PDF."""
+
+    def __init__(self, ms_per_page: float):
+        self.ms_per_page = ms_per_page
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, pdf_path: Path, max_pages=None, **kwargs) -> List[str]:
+        with self._lock:
+            self.calls[pdf_path.name] += 1
+        page_count = len(PdfReader(str(pdf_path)).pages)
+        time.sleep(self.ms_per_page * page_count / 1000)
+        # Seite 1 = Auftrag (nur erste PDF), Seite 2 enthält das Schlagwort
+        texts = [f"Seite {n}" for n in range(1, page_count + 1)]
+        if pdf_path.name.startswith("01_"):
+            texts[0] = AUFTRAG_TEXT
+        if page_count >= 2:
+            texts[1] = f"Hinweis: {KEYWORD} beantragt"
+        return texts
+
+
+class CountingOCR:
+    """Zählt Aufrufe der echten OCR pro PDF."""
+
+    def __init__(self, original):
+        self.original = original
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, pdf_path: Path, *args, **kwargs) -> List[str]:
+        with self._lock:
+            self.calls[pdf_path.name] += 1
+        return self.original(pdf_path, *args, **kwargs)
+
+
+def run_import(pdf_count: int, pages: int, workers: int, ocr_ms: float, real_ocr: bool) -> Dict:
+    """Importiert einen frischen synthetischen Ordner und misst die Zeit."""
+    tmp = Path(tempfile.mkdtemp(prefix="folder_import_bench_"))
+    original_ocr = folder_import.pdf_to_ocr_texts
+    try:
+        archiv_root = tmp / "archiv"
+        archiv_root.mkdir()
+        cfg = Config(config_path=tmp / "config.json")
+        cfg.set("archiv_root", str(archiv_root))
+        cfg.set("db_path", str(archiv_root / "werkstatt.db"))
+        cfg.set("keywords", [KEYWORD])
+        db.init_db(cfg.get_db_path())
+
+        folder = create_synthetic_folder(tmp / "import", pdf_count, pages)
+
+        ocr = CountingOCR(original_ocr) if real_ocr else SimulatedOCR(ocr_ms)
+        folder_import.pdf_to_ocr_texts = ocr
+
+        start = time.time()
+        result = folder_import.process_folder_for_import(folder, cfg, ocr_workers=workers)
+        elapsed = time.time() - start
+
+        rows = db.get_auftraege_by_ids(cfg.get_db_path(), [result["auftrag_id"]])
+        keywords = json.loads(rows[0].get("keywords_json") or "{}") if rows else {}
+        return {
+            "elapsed": elapsed,
+            "calls": ocr.calls,
+            "keywords": keywords
+        }
+    finally:
+        folder_import.pdf_to_ocr_texts = original_ocr
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def expected_keyword_pages(pdf_count: int, pages: int) -> List[int]:
+    """Seite 2 jeder PDF, verschoben um die Seiten der vorherigen PDFs."""
+    return [i * pages + 2 for i in range(pdf_count)] if pages >= 2 else []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark für den Ordner-Import")
+    parser.add_argument("--pdfs", type=int, default=10, help="Anzahl PDFs im Ordner (Standard: 10)")
+    parser.add_argument("--pages", type=int, default=3, help="Seiten pro PDF (Standard: 3)")
+    parser.add_argument("--ocr-ms", type=float, default=200.0, help="Simulierte OCR-Zeit pro Seite in ms")
+    parser.add_argument("--workers", type=int, default=folder_import.DEFAULT_OCR_WORKERS,
+                        help="Parallele OCR-Läufe für den Vergleich")
+    parser.add_argument("--real-ocr", action="store_true", help="Echte OCR statt Simulation")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"  Ordner-Import-Benchmark: {args.pdfs} PDFs × {args.pages} Seiten")
+    print(f"  OCR: {'echt' if args.real_ocr else f'simuliert ({args.ocr_ms:.0f}ms/Seite)'}")
+    print("=" * 60)
+
+    failed = False
+    timings = {}
+    for workers in sorted({1, args.workers}):
+        print(f"\n⏱️  Import mit {workers} OCR-Worker(n)...")
+        run = run_import(args.pdfs, args.pages, workers, args.ocr_ms, args.real_ocr)
+        timings[workers] = run["elapsed"]
+        print(f"   Dauer: {run['elapsed']:.2f}s")
+
+        total_calls = sum(run["calls"].values())
+        repeated = {name: n for name, n in run["calls"].items() if n != 1}
+        print(f"   OCR-Aufrufe: {total_calls} (erwartet: {args.pdfs})")
+        if repeated or total_calls != args.pdfs:
+            print(f"   ❌ PDFs mehrfach per OCR verarbeitet: {repeated}")
+            failed = True
+        else:
+            print("   ✓ Jede PDF genau einmal per OCR verarbeitet")
+
+        if not args.real_ocr:
+            expected = expected_keyword_pages(args.pdfs, args.pages)
+            found = run["keywords"].get(KEYWORD, [])
+            if found != expected:
+                print(f"   ❌ Schlagwort-Seiten falsch: {found} (erwartet: {expected})")
+                failed = True
+            else:
+                print(f"   ✓ Schlagwort-Seiten korrekt ({len(found)} Treffer)")
+
+    if len(timings) > 1:
+        speedup = timings[1] / timings[args.workers]
+        print(f"\n🚀 Speedup mit {args.workers} Workern: {speedup:.1f}x")
+
+    print("=" * 60)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für den Request-Profiler.
+
+Schickt zwei profilierte Requests gleichzeitig an die Web-UI. cProfile darf
+prozessweit nur einmal laufen (ab Python 3.12 sonst ValueError); erwartet
+wird deshalb:
+- beide Requests antworten mit 200 (kein 500 durch den Profiler)
+- genau einer der beiden liefert ein Profil (X-Profile-Id)
+- danach wird wieder profiliert (Sperre freigegeben)
+- ohne bzw. mit falschem Token wird nicht profiliert, auch nicht von
+  localhost (Reverse-Proxy); ohne Token nur mit profiler_local_only
+
+Verwendung:
+    python test_request_profiler.py
+
+Exit-Code 1 bei Fehlschlag.
+"""
+
+import sys
+import threading
+import time
+
+# Lokale Module
+try:
+    import web_app
+except ImportError as e:
+    print(f"❌ Fehler: Module nicht gefunden ({e}). Führen Sie das Skript im Projekt-Verzeichnis aus.")
+    sys.exit(1)
+
+
+TOKEN = 'test-token'
+
+# Beide Requests sollen gleichzeitig im View stehen
+_barrier = threading.Barrier(2, timeout=10)
+
+
+@web_app.app.route('/_test/profiled')
+def _test_profiled():
+    try:
+        _barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    time.sleep(0.05)
+    return 'ok'
+
+
+def _request(results: list, token: str = TOKEN) -> None:
+    client = web_app.app.test_client()
+    headers = {'X-Profile': '1'}
+    if token:
+        headers['X-Profile-Token'] = token
+    response = client.get('/_test/profiled', headers=headers)
+    results.append((response.status_code, response.headers.get('X-Profile-Id')))
+
+
+def _check_authorization() -> bool:
+    """Token-Pflicht auch für localhost, außer im Modus local_only."""
+    ok = True
+    settings = web_app.get_config().config
+    for label, token, local_only, expected in (
+        ("ohne Token", None, False, False),
+        ("falsches Token", 'falsch', False, False),
+        ("richtiges Token", TOKEN, False, True),
+        ("ohne Token, profiler_local_only", None, True, True),
+    ):
+        settings['profiler_local_only'] = local_only
+        results: list = []
+        _request(results, token)
+        status, profile_id = results[0]
+        print(f"  {label}: Status {status}, Profil: {profile_id}")
+        if status != 200 or bool(profile_id) != expected:
+            print(f"❌ {label}: Profil {'erwartet' if expected else 'nicht erwartet'}")
+            ok = False
+    settings['profiler_local_only'] = False
+    return ok
+
+
+def main() -> int:
+    settings = web_app.get_config().config
+    settings['profiler_token'] = TOKEN
+    settings['profiler_local_only'] = False
+    settings['profiler_sample_rate'] = 0.0
+    web_app.profiler.clear()
+
+    print("▶ Zwei gleichzeitige profilierte Requests...")
+    results: list = []
+    threads = [threading.Thread(target=_request, args=(results,)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    statuses = sorted(status for status, _ in results)
+    profiled = [pid for _, pid in results if pid]
+    print(f"  Status: {statuses}, Profile: {len(profiled)}")
+
+    ok = True
+    if statuses != [200, 200]:
+        print("❌ Ein Request ist wegen des Profilers fehlgeschlagen")
+        ok = False
+    if len(profiled) != 1:
+        print(f"❌ Erwartet genau 1 Profil, erhalten: {len(profiled)}")
+        ok = False
+
+    print("▶ Folgender Request wird wieder profiliert...")
+    _barrier.abort()
+    results = []
+    _request(results)
+    status, profile_id = results[0]
+    print(f"  Status: {status}, Profil: {profile_id}")
+    if status != 200 or not profile_id:
+        print("❌ Profiler nach gleichzeitigen Requests blockiert")
+        ok = False
+
+    print("▶ Zugriffsschutz...")
+    ok = _check_authorization() and ok
+
+    print("✓ Request-Profiler OK" if ok else "❌ Request-Profiler fehlerhaft")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
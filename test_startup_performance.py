@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für die Startzeit der Web-UI.
+Misst die Import-Zeit von web_app per `python -X importtime` und prüft,
+dass schwere OCR-/PDF-Module nicht beim Start geladen werden.
+
+Verwendung:
+    python test_startup_performance.py
+    python test_startup_performance.py --max-ms 800 --top 15
+    python test_startup_performance.py --module server
+
+Exit-Code 1, wenn das Budget überschritten oder ein verbotenes Modul
+beim Import geladen wird (für CI / vor dem EXE-Build).
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+# Module, die erst bei Bedarf geladen werden dürfen (OCR, PDF, Watcher)
+LAZY_MODULES = [
+    'pytesseract',
+    'pdf2image',
+    'PIL',
+    'PyPDF2',
+    'watchdog',
+    'ocr',
+    'pdf_split',
+    'folder_import',
+    'backup_system',
+]
+
+# Zeilenformat: "import time:       123 |       456 |     package.module"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parst die Ausgabe von `-X importtime`.
+
+    Args:
+        stderr: stderr des Python-Prozesses
+
+    Returns:
+        Liste von Dicts (module, self_us, cumulative_us, depth)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            'module': module,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            # Python rückt verschachtelte Imports um je 2 Leerzeichen ein
+            'depth': max(0, (len(indent) - 1) // 2)
+        })
+    return entries
+
+
+def measure_import(module: str) -> Tuple[List[Dict], float]:
+    """
+    Importiert ein Modul in einem frischen Interpreter.
+
+    Args:
+        module: Modulname (z.B. "web_app")
+
+    Returns:
+        Tuple (Import-Einträge, Gesamtzeit des Moduls in ms)
+    """
+    project_dir = Path(__file__).parent
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=project_dir,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise RuntimeError(f"Import von {module} fehlgeschlagen (Exit-Code {proc.returncode})")
+
+    entries = parse_importtime(proc.stderr)
+    total = next((e['cumulative_us'] for e in reversed(entries) if e['module'] == module), 0)
+    return entries, total / 1000
+
+
+def find_lazy_violations(entries: List[Dict]) -> List[str]:
+    """Findet Module aus LAZY_MODULES, die beim Import geladen wurden."""
+    loaded = {e['module'] for e in entries}
+    return [m for m in LAZY_MODULES if m in loaded]
+
+
+def print_top(entries: List[Dict], top: int) -> None:
+    """Zeigt die Module mit der höchsten Eigen-Importzeit."""
+    print(f"\n🐢 Top {top} Module (Eigenzeit):")
+    for e in sorted(entries, key=lambda e: e['self_us'], reverse=True)[:top]:
+        print(f"   {e['self_us'] / 1000:8.1f}ms  (kumuliert {e['cumulative_us'] / 1000:8.1f}ms)  {e['module']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Startzeit-Benchmark für die Web-UI')
+    parser.add_argument('--module', default='web_app', help='Zu importierendes Modul (Standard: web_app)')
+    parser.add_argument('--max-ms', type=float, default=1000.0, help='Budget für die Import-Zeit in ms')
+    parser.add_argument('--runs', type=int, default=3, help='Anzahl Messungen (Median wird bewertet)')
+    parser.add_argument('--top', type=int, default=10, help='Anzahl der langsamsten Module in der Ausgabe')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"  Startzeit-Benchmark: import {args.module}")
+    print("=" * 60)
+
+    timings = []
+    entries: List[Dict] = []
+    for run in range(1, args.runs + 1):
+        entries, total_ms = measure_import(args.module)
+        timings.append(total_ms)
+        print(f"   Lauf {run}: {total_ms:.1f}ms")
+
+    median_ms = sorted(timings)[len(timings) // 2]
+    print_top(entries, args.top)
+
+    failed = False
+    print(f"\n⏱️  Median: {median_ms:.1f}ms (Budget: {args.max_ms:.0f}ms)")
+    if median_ms > args.max_ms:
+        print("   ❌ Budget überschritten!")
+        failed = True
+    else:
+        print("   ✓ Innerhalb des Budgets")
+
+    violations = find_lazy_violations(entries)
+    if violations:
+        print(f"\n❌ Beim Start geladen (sollte lazy sein): {', '.join(violations)}")
+        failed = True
+    else:
+        print("✓ Keine OCR-/PDF-Module beim Start geladen")
+
+    print("=" * 60)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
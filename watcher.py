@@ -2,145 +2,700 @@
 Ordnerüberwachung für automatische PDF-Verarbeitung.
 
 Dieses Modul überwacht einen Eingangsordner und verarbeitet neue PDFs automatisch.
+
+Ablauf (entkoppelt, damit der Watchdog-Thread nie blockiert):
+1. PDFHandler nimmt Dateisystem-Events entgegen und reiht nur ein.
+2. SettleTracker prüft alle wartenden Dateien gemeinsam, bis Größe und
+   Änderungszeit stabil sind (Datei vollständig geschrieben).
+3. Ein Pool von Worker-Threads verarbeitet die fertigen Dateien.
+
+Backends für Schritt 1:
+- "events": watchdog (inotify/ReadDirectoryChangesW) für lokale Ordner
+- "polling": PollingObserver mit os.scandir-Snapshots für Netzlaufwerke (SMB),
+  auf denen Events anderer Rechner nicht zuverlässig ankommen
+
+Cluster-Modus (mehrere Rechner, gleicher Eingangsordner): vor der
+Verarbeitung beansprucht der Worker die Datei über file_leases; Dateien, die
+ein anderer Knoten hält, werden übersprungen. Geht die Lease während der
+Verarbeitung verloren, bricht die Verarbeitung vor dem Archivieren bzw. vor
+dem Datenbank-Eintrag ab (file_leases.ensure_held).
 """
 
+import os
+import threading
 import time
 from pathlib import Path
-from typing import Callable
+from queue import Queue, Empty
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 import logging
 
 try:
     from watchdog.observers import Observer
     from watchdog.events import FileSystemEventHandler, FileSystemEvent
+    WATCHDOG_AVAILABLE = True
 except ImportError:
-    logging.error("watchdog nicht installiert. Bitte installieren mit: pip install watchdog")
-    raise
+    # Polling funktioniert auch ohne watchdog
+    logging.warning("watchdog nicht installiert, nur Polling-Modus verfügbar (pip install watchdog)")
+    Observer = None
+    FileSystemEventHandler = object
+    FileSystemEvent = object
+    WATCHDOG_AVAILABLE = False
+
+import file_leases
+import metrics
 
 logger = logging.getLogger(__name__)
 
 
+# Standardwerte (überschreibbar über die Config)
+DEFAULT_WORKERS = 1
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_SETTLE_TIMEOUT = 30.0
+POLL_INTERVAL = 0.5
+
+# Polling-Backend
+WATCHER_MODES = ('auto', 'events', 'polling')
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_POLL_MAX_INTERVAL = 30.0
+POLL_BACKOFF_FACTOR = 1.5
+
+
+# Dateiname -> (Größe, mtime_ns)
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+class SnapshotDiff(NamedTuple):
+    """Unterschied zwischen zwei Ordner-Snapshots (Dateinamen)."""
+    created: List[str]
+    modified: List[str]
+    deleted: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.modified or self.deleted)
+
+
+def scan_folder(folder: Path, suffix: str = '.pdf') -> Snapshot:
+    """
+    Erstellt einen Snapshot eines Ordners (nicht rekursiv).
+
+    Ein einziger os.scandir-Durchlauf; unter Windows liefert scandir Größe und
+    Änderungszeit ohne zusätzliche Netzwerk-Anfragen pro Datei mit.
+
+    Args:
+        folder: Zu scannender Ordner
+        suffix: Nur Dateien mit dieser Endung (klein geschrieben)
+
+    Returns:
+        Dict Dateiname -> (Größe, mtime_ns)
+
+    Raises:
+        OSError: Wenn der Ordner nicht lesbar ist (z.B. Freigabe offline)
+    """
+    snapshot: Snapshot = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(suffix):
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                # Datei zwischen Auflisten und stat() verschwunden
+                continue
+            snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> SnapshotDiff:
+    """
+    Vergleicht zwei Snapshots.
+
+    Args:
+        old: Vorheriger Snapshot
+        new: Aktueller Snapshot
+
+    Returns:
+        SnapshotDiff mit neuen, geänderten und gelöschten Dateinamen
+    """
+    created = [name for name in new if name not in old]
+    modified = [name for name, info in new.items() if name in old and old[name] != info]
+    deleted = [name for name in old if name not in new]
+    return SnapshotDiff(sorted(created), sorted(modified), sorted(deleted))
+
+
+def resolve_mode(mode: str, input_folder: Path) -> str:
+    """
+    Bestimmt das Backend.
+
+    "auto" wählt Polling für UNC-Pfade (\\\\Server\\Freigabe) und wenn watchdog
+    fehlt, sonst Events.
+
+    Args:
+        mode: "auto", "events" oder "polling"
+        input_folder: Überwachter Ordner
+
+    Returns:
+        "events" oder "polling"
+    """
+    mode = (mode or 'auto').lower()
+    if mode not in WATCHER_MODES:
+        logger.warning(f"Unbekannter Watcher-Modus '{mode}', verwende 'auto'")
+        mode = 'auto'
+
+    if mode == 'auto':
+        path_str = str(input_folder)
+        is_unc = path_str.startswith('\\\\') or path_str.startswith('//')
+        mode = 'polling' if is_unc else 'events'
+
+    if mode == 'events' and not WATCHDOG_AVAILABLE:
+        logger.warning("watchdog nicht verfügbar, verwende Polling")
+        mode = 'polling'
+    return mode
+
+
+class SettleTracker:
+    """
+    Wartet auf vollständig geschriebene Dateien.
+
+    Ein einzelner Thread prüft alle wartenden Dateien in einem Durchlauf,
+    statt pro Datei in einer Schleife zu schlafen.
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[Path], None],
+        on_discard: Callable[[Path, str], None],
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        timeout: float = DEFAULT_SETTLE_TIMEOUT,
+        poll_interval: float = POLL_INTERVAL
+    ):
+        """
+        Initialisiert den Tracker.
+
+        Args:
+            on_ready: Wird für jede fertige Datei aufgerufen
+            on_discard: Wird mit (Pfad, Grund) aufgerufen, wenn eine Datei
+                        verschwindet oder nicht fertig wird
+            settle_seconds: So lange müssen Größe/Änderungszeit stabil sein
+            timeout: Maximale Zeit ohne Fortschritt, bevor aufgegeben wird
+            poll_interval: Prüfintervall in Sekunden
+        """
+        self.on_ready = on_ready
+        self.on_discard = on_discard
+        self.settle_seconds = settle_seconds
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # Pfad -> (Größe, mtime_ns, Zeitpunkt der letzten Änderung)
+        self._pending: Dict[Path, Tuple[int, int, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, file_path: Path) -> None:
+        """Nimmt eine Datei in die Beobachtung auf."""
+        with self._lock:
+            if file_path not in self._pending:
+                self._pending[file_path] = (-1, -1, time.monotonic())
+
+    def pending_count(self) -> int:
+        """Anzahl der Dateien, die noch geschrieben werden."""
+        with self._lock:
+            return len(self._pending)
+
+    def start(self) -> None:
+        """Startet den Prüf-Thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watcher-settle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Beendet den Prüf-Thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                logger.error(f"Fehler im SettleTracker: {e}")
+
+    def check_once(self, now: Optional[float] = None) -> None:
+        """
+        Prüft alle wartenden Dateien einmal.
+
+        Args:
+            now: Aktueller Zeitpunkt (time.monotonic), für Tests überschreibbar
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            snapshot = list(self._pending.items())
+
+        ready = []
+        discarded = []
+        for file_path, (last_size, last_mtime, last_change) in snapshot:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                discarded.append((file_path, "Datei nicht mehr vorhanden"))
+                continue
+            except OSError as e:
+                # Z.B. Sperre durch den Scanner - später erneut versuchen
+                logger.debug(f"Datei {file_path.name} noch nicht lesbar: {e}")
+                stat = None
+
+            if stat is not None and (stat.st_size, stat.st_mtime_ns) != (last_size, last_mtime):
+                with self._lock:
+                    if file_path in self._pending:
+                        self._pending[file_path] = (stat.st_size, stat.st_mtime_ns, now)
+                continue
+
+            if stat is not None and stat.st_size > 0 and now - last_change >= self.settle_seconds:
+                logger.debug(f"Datei vollständig: {file_path.name} ({stat.st_size} Bytes)")
+                ready.append(file_path)
+            elif now - last_change >= self.timeout:
+                discarded.append((file_path, "Timeout beim Warten auf vollständige Datei"))
+
+        with self._lock:
+            for file_path in ready:
+                self._pending.pop(file_path, None)
+            for file_path, _reason in discarded:
+                self._pending.pop(file_path, None)
+
+        for file_path in ready:
+            self.on_ready(file_path)
+        for file_path, reason in discarded:
+            self.on_discard(file_path, reason)
+
+
+class FileDispatcher:
+    """Nimmt neue Dateien entgegen und verteilt sie auf einen Worker-Pool."""
+
+    def __init__(
+        self,
+        callback: Callable[[Path], None],
+        workers: int = DEFAULT_WORKERS,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        settle_timeout: float = DEFAULT_SETTLE_TIMEOUT,
+        leases: Optional[file_leases.LeaseManager] = None
+    ):
+        """
+        Initialisiert den Dispatcher.
+
+        Args:
+            callback: Verarbeitung einer fertigen PDF (läuft im Worker-Thread)
+            workers: Anzahl paralleler Verarbeitungen
+            settle_seconds: Stabilitätszeit bis eine Datei als fertig gilt
+            settle_timeout: Maximale Wartezeit ohne Fortschritt
+            leases: Cluster-Modus - Dateien vor der Verarbeitung beanspruchen
+        """
+        self.callback = callback
+        self.leases = leases
+        self.workers = max(1, int(workers))
+        self.tracker = SettleTracker(
+            on_ready=self._on_ready,
+            on_discard=self._on_discard,
+            settle_seconds=settle_seconds,
+            timeout=settle_timeout
+        )
+        self._ready: Queue = Queue()
+        self._known = set()  # wartend, eingereiht oder in Arbeit
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def submit(self, file_path: Path) -> bool:
+        """
+        Reiht eine Datei ein (kehrt sofort zurück).
+
+        Returns:
+            False, wenn die Datei bereits bekannt ist
+        """
+        key = str(file_path)
+        with self._lock:
+            if key in self._known:
+                return False
+            self._known.add(key)
+        self.tracker.add(file_path)
+        self._update_metric()
+        return True
+
+    def start(self) -> None:
+        """Startet Tracker und Worker-Threads."""
+        self._stop.clear()
+        self.tracker.start()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"watcher-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Watcher-Worker gestartet: {self.workers}")
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stoppt die Verarbeitung.
+
+        Laufende Dateien werden fertig verarbeitet; noch nicht begonnene
+        bleiben im Eingangsordner liegen.
+
+        Args:
+            wait: Auf das Ende der laufenden Verarbeitungen warten
+        """
+        self._stop.set()
+        self.tracker.stop()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def status(self) -> Dict[str, int]:
+        """Aktueller Zustand der Warteschlange (für UI und Metriken)."""
+        with self._lock:
+            active = len(self._active)
+            known = len(self._known)
+        return {
+            'settling': self.tracker.pending_count(),
+            'queued': self._ready.qsize(),
+            'processing': active,
+            'total': known,
+            'workers': self.workers,
+            'processed': self.processed,
+            'failed': self.failed,
+            'skipped': self.skipped
+        }
+
+    def _on_ready(self, file_path: Path) -> None:
+        self._ready.put(file_path)
+
+    def _on_discard(self, file_path: Path, reason: str) -> None:
+        logger.warning(f"Datei {file_path.name} verworfen: {reason}")
+        self._forget(file_path)
+
+    def _forget(self, file_path: Path) -> None:
+        with self._lock:
+            self._known.discard(str(file_path))
+            self._active.discard(str(file_path))
+        self._update_metric()
+
+    def on_leases_lost(self, names: List[str]) -> None:
+        """
+        Heartbeat meldet verlorene Leases (Cluster-Modus).
+
+        Betroffene Dateien in Arbeit brechen beim nächsten
+        file_leases.ensure_held() ab - vor Archivierung und DB-Eintrag.
+        """
+        with self._lock:
+            active = {Path(key).name for key in self._active}
+        for name in names:
+            if name in active:
+                logger.warning(f"⚠️  {name}: Lease verloren, Verarbeitung wird abgebrochen")
+
+    def _update_metric(self) -> None:
+        with self._lock:
+            metrics.WATCHER_QUEUE_DEPTH.set(len(self._known))
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                file_path = self._ready.get(timeout=POLL_INTERVAL)
+            except Empty:
+                continue
+
+            with self._lock:
+                self._active.add(str(file_path))
+            claimed = False
+            try:
+                if self.leases is not None:
+                    claimed = self.leases.claim(file_path)
+                    if not claimed or not file_path.exists():
+                        # Anderer Knoten verarbeitet sie (oder hat sie schon erledigt)
+                        logger.info(f"⏭️  {file_path.name} wird von einem anderen Knoten verarbeitet")
+                        with self._lock:
+                            self.skipped += 1
+                        continue
+                with file_leases.processing(self.leases, file_path):
+                    self.callback(file_path)
+                if claimed and self.leases.is_lost(file_path):
+                    # Abgebrochen, ein anderer Knoten hat übernommen
+                    with self._lock:
+                        self.skipped += 1
+                    continue
+                with self._lock:
+                    self.processed += 1
+            except file_leases.LeaseLostError as e:
+                with self._lock:
+                    self.skipped += 1
+                logger.warning(f"⏭️  {e}")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.error(f"Fehler bei der Verarbeitung von {file_path.name}: {e}")
+            finally:
+                if claimed:
+                    try:
+                        self.leases.release(file_path)
+                    except Exception as e:
+                        logger.warning(f"Lease für {file_path.name} nicht freigegeben (läuft ab): {e}")
+                self._forget(file_path)
+
+
+class PollingObserver:
+    """
+    Überwacht einen Ordner durch regelmäßige scandir-Snapshots.
+
+    Gleiche Schnittstelle wie der watchdog-Observer (start/stop/join). Bleibt
+    der Ordner unverändert, wird das Intervall schrittweise bis
+    `max_interval` verlängert; bei der ersten Änderung fällt es zurück auf
+    `interval`. So bleiben CPU-Last und SMB-Anfragen im Leerlauf gering.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        on_file: Callable[[Path], None],
+        interval: float = DEFAULT_POLL_INTERVAL,
+        max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+        backoff_factor: float = POLL_BACKOFF_FACTOR
+    ):
+        """
+        Initialisiert den Observer.
+
+        Args:
+            folder: Überwachter Ordner
+            on_file: Wird für jede neue oder geänderte PDF aufgerufen
+            interval: Basis-Intervall in Sekunden
+            max_interval: Maximales Intervall bei Leerlauf
+            backoff_factor: Faktor, um den das Intervall im Leerlauf wächst
+        """
+        self.folder = Path(folder)
+        self.on_file = on_file
+        self.interval = max(0.1, float(interval))
+        self.max_interval = max(self.interval, float(max_interval))
+        self.backoff_factor = max(1.0, float(backoff_factor))
+        self.current_interval = self.interval
+        self._snapshot: Optional[Snapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Erstellt den Basis-Snapshot und startet den Polling-Thread."""
+        self._snapshot = self._scan() or {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watcher-polling", daemon=True)
+        self._thread.start()
+        logger.info(f"Polling-Watcher gestartet ({len(self._snapshot)} PDFs im Ordner, "
+                    f"Intervall {self.interval:.1f}-{self.max_interval:.0f}s)")
+
+    def stop(self) -> None:
+        """Beendet das Polling."""
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wartet auf das Ende des Polling-Threads."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll_once(self) -> SnapshotDiff:
+        """
+        Erstellt einen neuen Snapshot und meldet neue/geänderte Dateien.
+
+        Returns:
+            Unterschied zum vorherigen Snapshot (leer, wenn der Ordner nicht
+            lesbar war)
+        """
+        new_snapshot = self._scan()
+        if new_snapshot is None:
+            return SnapshotDiff([], [], [])
+
+        diff = diff_snapshots(self._snapshot or {}, new_snapshot)
+        self._snapshot = new_snapshot
+
+        # Geänderte Dateien ebenfalls melden (Dispatcher ignoriert Doppelte)
+        for name in diff.created + diff.modified:
+            self.on_file(self.folder / name)
+        return diff
+
+    def _scan(self) -> Optional[Snapshot]:
+        try:
+            return scan_folder(self.folder)
+        except OSError as e:
+            logger.warning(f"Eingangsordner nicht lesbar ({e}), nächster Versuch in {self.current_interval:.0f}s")
+            return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.current_interval):
+            try:
+                diff = self.poll_once()
+            except Exception as e:
+                logger.error(f"Fehler im Polling-Watcher: {e}")
+                diff = SnapshotDiff([], [], [])
+
+            if diff:
+                self.current_interval = self.interval
+            else:
+                self.current_interval = min(self.max_interval, self.current_interval * self.backoff_factor)
+
+
 class PDFHandler(FileSystemEventHandler):
     """Event-Handler für neue PDF-Dateien (nur einzelne PDFs, keine Ordner)."""
-    
-    def __init__(self, callback: Callable[[Path], None]):
+
+    def __init__(self, dispatcher: FileDispatcher, input_folder: Path):
         """
         Initialisiert den Handler.
-        
+
         Args:
-            callback: Funktion, die für jede neue PDF aufgerufen wird
+            dispatcher: Nimmt erkannte PDFs zur Verarbeitung entgegen
+            input_folder: Überwachter Eingangsordner
         """
-        self.callback = callback
-        self.processing_files = set()
-    
+        self.dispatcher = dispatcher
+        self.input_folder = Path(input_folder).resolve()
+
     def on_created(self, event: FileSystemEvent) -> None:
         """Wird aufgerufen, wenn eine neue Datei erstellt wird."""
         # Ignoriere Ordner - diese werden nur manuell verarbeitet
         if event.is_directory:
             return
-        
-        file_path = Path(event.src_path)
-        
+        self.handle_path(Path(event.src_path))
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        """Umbenennungen in den Ordner (Scanner schreiben oft erst eine Temp-Datei)."""
+        if event.is_directory:
+            return
+        self.handle_path(Path(event.dest_path))
+
+    def handle_path(self, file_path: Path) -> None:
+        """Filtert und reiht ein - darf nie blockieren."""
         # Nur PDFs verarbeiten
         if file_path.suffix.lower() != '.pdf':
             return
-        
+
         # Ignoriere PDFs in Unterordnern - diese werden nur manuell verarbeitet
         # Nur PDFs direkt im Eingangsordner werden automatisch verarbeitet
-        if file_path.parent.name != file_path.parents[1].name:
-            # PDF ist in einem Unterordner
-            logger.info(f"📁 PDF in Unterordner ignoriert (nur manuelle Verarbeitung): {file_path.relative_to(file_path.parents[1])}")
-            return
-        
-        # Vermeiden, dass die gleiche Datei mehrfach verarbeitet wird
-        if str(file_path) in self.processing_files:
+        if file_path.resolve().parent != self.input_folder:
+            logger.info(f"📁 PDF in Unterordner ignoriert (nur manuelle Verarbeitung): {file_path.name}")
             return
-        
-        self.processing_files.add(str(file_path))
-        
-        logger.info(f"📄 Neue PDF erkannt: {file_path.name}")
-        
-        # Warten, bis die Datei vollständig geschrieben wurde
-        if self._wait_for_file_complete(file_path):
-            try:
-                self.callback(file_path)
-            except Exception as e:
-                logger.error(f"Fehler bei der Verarbeitung von {file_path.name}: {e}")
-            finally:
-                self.processing_files.discard(str(file_path))
-        else:
-            logger.warning(f"Datei {file_path.name} konnte nicht vollständig gelesen werden")
-            self.processing_files.discard(str(file_path))
-    
-    def _wait_for_file_complete(self, file_path: Path, timeout: int = 30) -> bool:
-        """
-        Wartet, bis eine Datei vollständig geschrieben wurde.
-        
-        Args:
-            file_path: Pfad zur Datei
-            timeout: Maximale Wartezeit in Sekunden
-        
-        Returns:
-            True wenn Datei vollständig, False bei Timeout
-        """
-        start_time = time.time()
-        last_size = -1
-        
-        while time.time() - start_time < timeout:
-            try:
-                if not file_path.exists():
-                    return False
-                
-                current_size = file_path.stat().st_size
-                
-                # Wenn die Größe stabil bleibt, ist die Datei fertig
-                if current_size == last_size and current_size > 0:
-                    logger.debug(f"Datei vollständig: {file_path.name} ({current_size} Bytes)")
-                    return True
-                
-                last_size = current_size
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.warning(f"Fehler beim Prüfen der Datei {file_path.name}: {e}")
-                time.sleep(0.5)
-        
-        logger.warning(f"Timeout beim Warten auf vollständige Datei: {file_path.name}")
-        return False
+
+        if self.dispatcher.submit(file_path):
+            logger.info(f"📄 Neue PDF erkannt: {file_path.name}")
+
+
+def config_options(cfg) -> Dict[str, object]:
+    """
+    Liest die Watcher-Einstellungen aus der Config.
+
+    Args:
+        cfg: Konfigurationsobjekt (config.Config)
+
+    Returns:
+        Keyword-Argumente für start_watcher
+    """
+    return {
+        'workers': cfg.get('watcher_workers', DEFAULT_WORKERS),
+        'settle_seconds': cfg.get('watcher_settle_seconds', DEFAULT_SETTLE_SECONDS),
+        'settle_timeout': cfg.get('watcher_settle_timeout', DEFAULT_SETTLE_TIMEOUT),
+        'mode': cfg.get('watcher_mode', 'auto'),
+        'poll_interval': cfg.get('watcher_poll_interval', DEFAULT_POLL_INTERVAL),
+        'poll_max_interval': cfg.get('watcher_poll_max_interval', DEFAULT_POLL_MAX_INTERVAL),
+        'leases': file_leases.from_config(cfg)
+    }
 
 
 def start_watcher(
     input_folder: Path,
-    process_file_callback: Callable[[Path], None]
+    process_file_callback: Callable[[Path], None],
+    workers: int = DEFAULT_WORKERS,
+    settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+    settle_timeout: float = DEFAULT_SETTLE_TIMEOUT,
+    stop_event: Optional[threading.Event] = None,
+    on_dispatcher: Optional[Callable[[FileDispatcher], None]] = None,
+    mode: str = 'auto',
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    poll_max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+    initial_files: Optional[Iterable[Path]] = None,
+    leases: Optional[file_leases.LeaseManager] = None
 ) -> None:
     """
     Startet die Ordnerüberwachung.
-    
-    Diese Funktion blockiert und läuft, bis sie mit Ctrl+C unterbrochen wird.
-    
+
+    Diese Funktion blockiert und läuft, bis sie mit Ctrl+C oder über
+    `stop_event` beendet wird.
+
     Args:
         input_folder: Zu überwachender Ordner
         process_file_callback: Funktion, die für jede neue PDF aufgerufen wird
-    
+        workers: Anzahl paralleler Verarbeitungen
+        settle_seconds: Stabilitätszeit bis eine Datei als fertig gilt
+        settle_timeout: Maximale Wartezeit ohne Fortschritt
+        stop_event: Optionales Event zum Beenden (z.B. aus der Web-UI)
+        on_dispatcher: Erhält den Dispatcher (z.B. für Statusanzeigen)
+        mode: "auto", "events" (watchdog) oder "polling" (Netzlaufwerke)
+        poll_interval: Basis-Intervall im Polling-Modus
+        poll_max_interval: Maximales Intervall im Polling-Modus (Leerlauf)
+        initial_files: Bereits vorhandene PDFs, die sofort eingereiht werden
+                       (z.B. aus ingest_journal.startup)
+        leases: Cluster-Modus (file_leases.from_config); abgelaufene Leases
+                anderer Knoten werden automatisch erneut eingereiht
+
     Raises:
         FileNotFoundError: Wenn der Eingangsordner nicht existiert
     """
     if not input_folder.exists():
         raise FileNotFoundError(f"Eingangsordner nicht gefunden: {input_folder}")
-    
-    logger.info(f"Starte Ordnerüberwachung: {input_folder}")
+
+    mode = resolve_mode(mode, input_folder)
+    logger.info(f"Starte Ordnerüberwachung ({mode}): {input_folder}")
     logger.info("Drücke Ctrl+C zum Beenden...")
-    
-    event_handler = PDFHandler(process_file_callback)
-    observer = Observer()
-    observer.schedule(event_handler, str(input_folder), recursive=False)
+
+    dispatcher = FileDispatcher(
+        process_file_callback,
+        workers=workers,
+        settle_seconds=settle_seconds,
+        settle_timeout=settle_timeout,
+        leases=leases
+    )
+    if on_dispatcher is not None:
+        on_dispatcher(dispatcher)
+    dispatcher.start()
+
+    event_handler = PDFHandler(dispatcher, input_folder)
+    if mode == 'polling':
+        observer = PollingObserver(
+            input_folder,
+            event_handler.handle_path,
+            interval=poll_interval,
+            max_interval=poll_max_interval
+        )
+    else:
+        observer = Observer()
+        observer.schedule(event_handler, str(input_folder), recursive=False)
     observer.start()
-    
+    metrics.WATCHER_RUNNING.set(1)
+
+    if leases is not None:
+        leases.on_recovered = lambda names: [event_handler.handle_path(input_folder / name) for name in names]
+        leases.on_lost = dispatcher.on_leases_lost
+        leases.start()
+
+    for file_path in initial_files or ():
+        event_handler.handle_path(Path(file_path))
+
+    stop_event = stop_event or threading.Event()
     try:
-        while True:
-            time.sleep(1)
+        while not stop_event.wait(1):
+            pass
     except KeyboardInterrupt:
-        logger.info("Ordnerüberwachung wird beendet...")
-        observer.stop()
-    
+        pass
+
+    logger.info("Ordnerüberwachung wird beendet...")
+    observer.stop()
     observer.join()
+    dispatcher.stop()
+    if leases is not None:
+        leases.stop()
+    metrics.WATCHER_RUNNING.set(0)
     logger.info("Ordnerüberwachung beendet")
@@ -30,15 +30,18 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from queue import Queue, Empty
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, g, Response
 from werkzeug.serving import make_server
 
 import config
 import db
 import parser as auftrag_parser
-import ocr
 import archive
-import watcher
+import archive_manifest
+import metrics
+import request_profiler
+import query_cache
+import ocr_scheduler
 
 # Flask App
 app = Flask(__name__)
@@ -52,21 +55,145 @@ cfg: Optional[config.Config] = None  # Wird bei Start initialisiert
 processing_queue = Queue()
 watcher_thread: Optional[threading.Thread] = None
 watcher_running = False
+watcher_stop_event: Optional[threading.Event] = None
+watcher_dispatcher = None  # watcher.FileDispatcher des laufenden Watchers
 server_thread: Optional[threading.Thread] = None
 
+# Request-Profiler (Opt-in, siehe /debug/profiles)
+profiler = request_profiler.RequestProfiler()
+
 # Cache für API-Responses (vermeidet zu viele DB-Zugriffe)
 stats_cache = {'data': None, 'timestamp': 0}
 CACHE_DURATION = 5  # Sekunden
 
 
+def _apply_runtime_config(c: config.Config) -> None:
+    """Überträgt Config-Werte auf Laufzeit-Komponenten (Such-Cache, OCR-Plätze)"""
+    query_cache.configure(c.get('query_cache_size', query_cache.DEFAULT_MAX_ENTRIES))
+    ocr_scheduler.configure_from_config(c.config)
+
+
 def get_config() -> config.Config:
     """Hole oder erstelle Config-Instanz"""
     global cfg
     if cfg is None:
         cfg = config.Config()
+        _apply_runtime_config(cfg)
     return cfg
 
 
+# OCR-Modul (pytesseract, pdf2image, PIL) wird erst beim ersten Gebrauch geladen,
+# damit der Server sofort Requests annimmt (wichtig für den Kaltstart der EXE)
+_ocr_module = None
+_ocr_lock = threading.Lock()
+
+
+def get_ocr():
+    """
+    Lädt das OCR-Modul beim ersten Aufruf und richtet Tesseract/Poppler ein.
+    
+    Returns:
+        Das importierte ocr-Modul
+    """
+    global _ocr_module
+    if _ocr_module is None:
+        with _ocr_lock:
+            if _ocr_module is None:
+                start = time.perf_counter()
+                import ocr
+                c = get_config()
+                ocr.setup_tesseract(c.get('tesseract_cmd'))
+                ocr.setup_poppler(c.get('poppler_path'))
+                _ocr_module = ocr
+                logger.info(f"✓ OCR-Modul geladen ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return _ocr_module
+
+
+def warmup_ocr_in_background() -> threading.Thread:
+    """
+    Lädt das OCR-Modul in einem Hintergrund-Thread und prüft Tesseract.
+    
+    Der Server ist währenddessen bereits erreichbar; die Warnung bei fehlendem
+    Tesseract erscheint wie bisher in der Konsole, nur ohne den Start zu blockieren.
+    
+    Returns:
+        Der gestartete Thread
+    """
+    def _warmup():
+        try:
+            ocr = get_ocr()
+            if not ocr.test_tesseract():
+                print("")
+                print("!" * 60)
+                print("  WARNUNG: Tesseract OCR nicht gefunden!")
+                print("  PDF-Verarbeitung wird nicht funktionieren.")
+                print("")
+                print("  Windows: Führe 'install_tesseract.bat' aus")
+                print("  macOS:   brew install tesseract tesseract-lang")
+                print("!" * 60)
+                print("")
+        except Exception as e:
+            logger.error(f"OCR-Modul konnte nicht geladen werden: {e}")
+
+    thread = threading.Thread(target=_warmup, name='ocr-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+@app.before_request
+def _metrics_start_timer():
+    """Merkt sich den Startzeitpunkt für die Latenz-Messung"""
+    g.metrics_start = time.perf_counter()
+
+
+@app.after_request
+def _metrics_observe_request(response):
+    """Erfasst die Antwortzeit pro Route (Route-Template statt URL, z.B. /api/archive/view/<int:auftrag_id>)"""
+    start = getattr(g, 'metrics_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route,
+            status=str(response.status_code)
+        )
+    return response
+
+
+@app.before_request
+def _profiler_start():
+    """Startet den Profiler, wenn per Header/Query angefordert oder per Stichprobe gewählt"""
+    if request.path.startswith('/debug/') or request.path.startswith('/static/'):
+        return
+    c = get_config()
+    profiler.configure(
+        max_profiles=c.get('profiler_max_profiles', 50),
+        sample_rate=c.get('profiler_sample_rate', 0.0),
+        token=c.get('profiler_token', ''),
+        local_only=c.get('profiler_local_only', False)
+    )
+    trigger = profiler.should_profile(request.remote_addr, request.headers, request.args)
+    if trigger:
+        profiler.start(trigger)
+
+
+@app.after_request
+def _profiler_stop(response):
+    """Beendet ein laufendes Profil und verweist per Header auf das Ergebnis"""
+    if profiler.is_active():
+        summary = profiler.stop(request.method, request.path, response.status_code)
+        if summary:
+            response.headers['X-Profile-Id'] = str(summary['id'])
+    return response
+
+
+@app.teardown_request
+def _profiler_teardown(exc):
+    """Gibt den Profiler frei, falls after_request nicht mehr gelaufen ist"""
+    profiler.discard()
+
+
 # ============================================================
 # ROUTES - Dashboard
 # ============================================================
@@ -88,6 +215,7 @@ def get_stats():
         # Cache noch gültig
         cached_data = stats_cache['data'].copy()
         cached_data['watcher_running'] = watcher_running  # Immer aktuellen Watcher-Status
+        cached_data['watcher_queue'] = get_watcher_queue_status()
         return jsonify(cached_data)
 
     try:
@@ -152,6 +280,7 @@ def get_stats():
             'today_auftraege': today_count,
             'recent_auftraege': recent,
             'watcher_running': watcher_running,
+            'watcher_queue': get_watcher_queue_status(),
             'config_valid': c.validate()
         }
 
@@ -268,8 +397,13 @@ def update_settings():
         if structure_changed:
             archiv_root = c.get_archiv_root()
             if archiv_root and archiv_root.exists():
-                # Zähle PDF-Dateien im Archiv (rekursiv)
-                pdf_count = len(list(archiv_root.rglob('*.pdf')))
+                # Zähle PDF-Dateien im Archiv. Das Manifest bestätigt nur den
+                # positiven Fall; meldet es 0 (oder wurde noch nie abgeglichen),
+                # kann es veraltet sein (Wiederherstellung, manuell kopiert) -
+                # dann entscheidet die erste tatsächlich gefundene PDF.
+                pdf_count = archive_manifest.count_pdfs(archiv_root / "werkstatt.db")
+                if not pdf_count:
+                    pdf_count = 1 if next(archiv_root.rglob('*.pdf'), None) else 0
                 if pdf_count > 0:
                     return jsonify({
                         'success': False, 
@@ -284,6 +418,7 @@ def update_settings():
         
         # Speichern
         c.save()
+        _apply_runtime_config(c)
         
         # Initialisiere Datenbank
         db_path = c.get_archiv_root() / "werkstatt.db"
@@ -354,6 +489,7 @@ def test_tesseract_api():
         tesseract_cmd = c.get('tesseract_cmd')
         
         # Setup aufrufen (findet Tesseract automatisch auf Windows)
+        ocr = get_ocr()
         ocr.setup_tesseract(tesseract_cmd)
         
         # Aktuellen Pfad ermitteln
@@ -715,7 +851,7 @@ def get_system_info():
         tesseract_version = "Nicht installiert"
         try:
             # Versuche Tesseract über ocr.py zu finden
-            import ocr
+            ocr = get_ocr()
             if hasattr(ocr.pytesseract.pytesseract, 'tesseract_cmd') and ocr.pytesseract.pytesseract.tesseract_cmd:
                 tesseract_cmd = ocr.pytesseract.pytesseract.tesseract_cmd
             else:
@@ -753,6 +889,33 @@ def search_page():
     return render_template('search.html')
 
 
+def _run_search(db_path: Path, search_type: str, query: str) -> List[Dict[str, Any]]:
+    """Führt eine Einzel-Suche nach Suchtyp aus (gemeinsam für Suche und Export)"""
+    if search_type == 'auftrag':
+        return db.search_by_auftrag_nr(db_path, query)
+    elif search_type == 'kunde':
+        return db.search_by_kunde(db_path, query)
+    elif search_type == 'kennzeichen':
+        return db.search_by_kennzeichen(db_path, query)
+    elif search_type == 'vin':
+        # VIN-Suche (komplette VIN)
+        return db.search_by_vin(db_path, query)
+    elif search_type == 'vis':
+        # VIS-Suche (letzte 6 Zeichen der VIN)
+        return db.search_by_vis(db_path, query)
+    elif search_type == 'keyword':
+        return db.search_by_keyword(db_path, query)
+    elif search_type == 'datum':
+        return db.search_by_date_range(db_path, query, query)
+    elif search_type == 'monat':
+        # Monat-Suche (z.B. "2024-07")
+        return db.search_by_month(db_path, query)
+    elif search_type == 'jahr':
+        # Jahr-Suche (z.B. "2024")
+        return db.search_by_year(db_path, query)
+    return []
+
+
 @app.route('/api/search', methods=['POST'])
 def search():
     """API: Suche durchführen"""
@@ -770,31 +933,8 @@ def search():
         if not db_path.exists():
             return jsonify({'results': [], 'error': 'Datenbank nicht gefunden'})
         
-        results = []
         sort_order = data.get('sort', 'datum_desc')
-        
-        if search_type == 'auftrag':
-            results = db.search_by_auftrag_nr(db_path, query)
-        elif search_type == 'kunde':
-            results = db.search_by_kunde(db_path, query)
-        elif search_type == 'kennzeichen':
-            results = db.search_by_kennzeichen(db_path, query)
-        elif search_type == 'vin':
-            # VIN-Suche (komplette VIN)
-            results = db.search_by_vin(db_path, query)
-        elif search_type == 'vis':
-            # VIS-Suche (letzte 6 Zeichen der VIN)
-            results = db.search_by_vis(db_path, query)
-        elif search_type == 'keyword':
-            results = db.search_by_keyword(db_path, query)
-        elif search_type == 'datum':
-            results = db.search_by_date_range(db_path, query, query)
-        elif search_type == 'monat':
-            # Monat-Suche (z.B. "2024-07")
-            results = db.search_by_month(db_path, query)
-        elif search_type == 'jahr':
-            # Jahr-Suche (z.B. "2024")
-            results = db.search_by_year(db_path, query)
+        results = _run_search(db_path, search_type, query)
         
         # Formatiere Ergebnisse
         formatted_results = []
@@ -899,6 +1039,84 @@ def api_search_multi():
         return jsonify({'error': str(e)}), 500
 
 
+# ============================================================
+# ROUTES - Export
+# ============================================================
+
+@app.route('/api/export/zip', methods=['GET', 'POST'])
+def export_zip():
+    """
+    API: PDFs als ZIP herunterladen (Streaming, ohne Zwischendatei)
+    
+    Parameter (Query-String bei GET, JSON bei POST):
+        ids: Liste von Auftrags-IDs (GET: "1,2,3")
+        type + query: Einzel-Suche wie /api/search
+        criteria: Multi-Kriterien-Suche wie /api/search/multi (nur POST)
+        manifest: CSV-Manifest beilegen (Standard: ja)
+        anhang: Anhänge im Auftragsordner mitliefern (Standard: ja)
+    """
+    try:
+        import zip_export
+        from flask import stream_with_context
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+        else:
+            data = request.args.to_dict()
+            if data.get('ids'):
+                data['ids'] = [i for i in data['ids'].split(',') if i.strip()]
+        
+        def _flag(name: str) -> bool:
+            return str(data.get(name, '1')).lower() not in ('0', 'false', 'nein', 'no')
+        
+        c = get_config()
+        db_path = c.get_archiv_root() / "werkstatt.db"
+        
+        if not db_path.exists():
+            return jsonify({'error': 'Datenbank nicht gefunden'}), 404
+        
+        if data.get('ids'):
+            try:
+                ids = [int(i) for i in data['ids']]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Ungültige Auftrags-ID'}), 400
+            rows = db.get_auftraege_by_ids(db_path, ids)
+            label = f"{len(ids)}_auftraege"
+        elif data.get('criteria'):
+            criteria = {k: v for k, v in data['criteria'].items() if v and str(v).strip()}
+            rows = db.search_multi_criteria(db_path, criteria) if criteria else []
+            label = 'suche'
+        elif data.get('query', '').strip():
+            search_type = data.get('type', 'auftrag')
+            rows = _run_search(db_path, search_type, data['query'].strip())
+            label = f"{search_type}_{data['query'].strip()}"
+        else:
+            return jsonify({'error': 'ids, query oder criteria erforderlich'}), 400
+        
+        if not rows:
+            return jsonify({'error': 'Keine Aufträge gefunden'}), 404
+        
+        entries = zip_export.collect_export_files(rows, include_anhang=_flag('anhang'), db_path=db_path)
+        include_manifest = _flag('manifest')
+        
+        safe_label = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in label)[:60]
+        filename = f"werkstatt_export_{safe_label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        logger.info(f"📦 ZIP-Export gestartet: {len(rows)} Aufträge → {filename}")
+        
+        return Response(
+            stream_with_context(zip_export.stream_zip(entries, include_manifest=include_manifest)),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Fehler beim ZIP-Export: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 # ============================================================
 # ROUTES - Archiv
 # ============================================================
@@ -1411,6 +1629,7 @@ def update_auftrag():
         
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
         
         return jsonify({'success': True})
         
@@ -1524,7 +1743,9 @@ def rescan_pdf(auftrag_id):
 
         # PDF neu scannen (OCR)
         logger.info(f"Scanne PDF neu: {pdf_path.name} (Auftrag {auftrag_id})")
-        texts = ocr.pdf_to_ocr_texts(pdf_path, max_pages=1, dpi=300)
+        ocr = get_ocr()
+        with ocr_scheduler.interactive():
+            texts = ocr.pdf_to_ocr_texts(pdf_path, max_pages=1, dpi=300)
 
         # Metadaten neu extrahieren
         new_metadata = auftrag_parser.extract_auftrag_metadata(texts[0], fallback_filename=pdf_path.name)
@@ -1698,6 +1919,7 @@ def update_customer():
 
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
 
         logger.info(f"Kundendaten aktualisiert: {old_kunde_name} -> {new_kunde_name} ({updated_count} Aufträge)")
 
@@ -1772,12 +1994,12 @@ def manual_scan():
         # Scanne nach PDFs (nur direkte Kinder, keine Unterordner)
         pdf_files = list(input_folder.glob('*.pdf'))
         
-        # Prüfe auch ob es Unterordner mit PDFs gibt
+        # Unterordner mit PDFs nur zählen, wenn es keine einzelnen PDFs gibt
+        # (pro Ordner nur bis zur ersten PDF)
         folder_count = 0
-        for item in input_folder.iterdir():
-            if item.is_dir() and not item.name.startswith('.') and item.name not in ['Fehler', 'temp_backup', '.trash']:
-                if list(item.glob('*.pdf')):
-                    folder_count += 1
+        if not pdf_files:
+            from folder_walker import iter_pdf_folders
+            folder_count = sum(1 for _ in iter_pdf_folders(input_folder, count=False))
 
         if not pdf_files and folder_count > 0:
             return jsonify({
@@ -1826,6 +2048,7 @@ def manual_scan():
                 })
                 
                 # Verarbeite PDF mit process_single_pdf aus main.py
+                get_ocr()  # Tesseract/Poppler einrichten (einmalig)
                 from main import process_single_pdf
                 
                 success = process_single_pdf(pdf_file, c)
@@ -1890,10 +2113,23 @@ def manual_scan():
 # ROUTES - Watcher-Steuerung
 # ============================================================
 
+def get_watcher_queue_status() -> Dict[str, int]:
+    """Warteschlange des Watchers (wartend, eingereiht, in Arbeit)"""
+    if watcher_dispatcher is None:
+        return {'settling': 0, 'queued': 0, 'processing': 0, 'total': 0}
+    return watcher_dispatcher.status()
+
+
+@app.route('/api/watcher/status')
+def watcher_status():
+    """API: Watcher-Status inkl. Warteschlange"""
+    return jsonify({'running': watcher_running, 'queue': get_watcher_queue_status()})
+
+
 @app.route('/api/watcher/start', methods=['POST'])
 def start_watcher():
     """API: Watcher starten"""
-    global watcher_thread, watcher_running
+    global watcher_thread, watcher_running, watcher_stop_event
     
     try:
         if watcher_running:
@@ -1905,6 +2141,8 @@ def start_watcher():
             return jsonify({'error': f'Konfiguration ungültig: {"; ".join(errors)}'}), 400
         
         watcher_running = True
+        watcher_stop_event = threading.Event()
+        stop_event = watcher_stop_event
         
         def watcher_callback(pdf_path: Path):
             """Callback für neue PDFs"""
@@ -1916,6 +2154,7 @@ def start_watcher():
             
             # Verarbeite PDF
             try:
+                get_ocr()  # Tesseract/Poppler einrichten (einmalig)
                 from main import process_single_pdf
                 c = get_config()
                 success = process_single_pdf(pdf_path, c)
@@ -1939,16 +2178,32 @@ def start_watcher():
                     'timestamp': datetime.now().isoformat()
                 })
         
+        def set_dispatcher(dispatcher):
+            global watcher_dispatcher
+            watcher_dispatcher = dispatcher
+        
         def run_watcher():
+            global watcher_running, watcher_dispatcher
             try:
+                import watcher  # watchdog erst beim Start des Watchers laden
+                import ingest_journal
+                input_folder = c.get_input_folder()
+                existing_files = ingest_journal.startup(c.get_db_path(), input_folder)
                 watcher.start_watcher(
-                    c.get_input_folder(),
-                    process_file_callback=watcher_callback
+                    input_folder,
+                    process_file_callback=watcher_callback,
+                    initial_files=existing_files,
+                    stop_event=stop_event,
+                    on_dispatcher=set_dispatcher,
+                    **watcher.config_options(c)
                 )
             except Exception as e:
                 logger.error(f"Watcher-Fehler: {e}")
-                global watcher_running
-                watcher_running = False
+            finally:
+                # Nur zurücksetzen, wenn nicht inzwischen ein neuer Watcher läuft
+                if watcher_stop_event is stop_event:
+                    watcher_running = False
+                    watcher_dispatcher = None
         
         watcher_thread = threading.Thread(target=run_watcher, daemon=True)
         watcher_thread.start()
@@ -1967,6 +2222,8 @@ def stop_watcher():
     global watcher_running
     
     watcher_running = False
+    if watcher_stop_event is not None:
+        watcher_stop_event.set()
     
     return jsonify({'success': True, 'message': 'Watcher wird gestoppt'})
 
@@ -2000,7 +2257,9 @@ def reprocess_auftrag(auftrag_id):
             }), 404
         
         # OCR neu durchführen - alle Seiten scannen
-        texts = ocr.pdf_to_ocr_texts(old_file_path, max_pages=None)
+        ocr = get_ocr()
+        with ocr_scheduler.interactive():
+            texts = ocr.pdf_to_ocr_texts(old_file_path, max_pages=None)
         
         # Metadaten neu extrahieren (nur von Seite 1)
         metadata = auftrag_parser.extract_auftrag_metadata(texts[0], fallback_filename=old_file_path.name)
@@ -2008,7 +2267,8 @@ def reprocess_auftrag(auftrag_id):
         # Wenn Auftragsnummer NUR aus Dateinamen kam (nicht aus OCR), versuche Enhanced-OCR
         if not metadata.get('auftrag_nr_from_ocr', True):
             logger.info(f"Auftragsnummer kam nur aus Dateinamen, versuche Enhanced-OCR mit höherer DPI...")
-            texts_enhanced = ocr.pdf_to_ocr_texts_enhanced(old_file_path, max_pages=None)
+            with ocr_scheduler.interactive():
+                texts_enhanced = ocr.pdf_to_ocr_texts_enhanced(old_file_path, max_pages=None)
             metadata_enhanced = auftrag_parser.extract_auftrag_metadata(texts_enhanced[0], fallback_filename=old_file_path.name)
             
             # Falls Enhanced-OCR die Nummer im Text gefunden hat, verwende diese Version
@@ -2112,6 +2372,11 @@ def reprocess_auftrag(auftrag_id):
         
         conn.commit()
         conn.close()
+        query_cache.invalidate(db_path)
+        if new_file_path != old_file_path:
+            archive_manifest.forget_files(db_path, [old_file_path])
+        archive_manifest.record_files(db_path, [new_file_path], auftrag_id=auftrag_id,
+                                      hashes={new_file_path: file_hash})
         
         return jsonify({
             'success': True,
@@ -2146,24 +2411,16 @@ def backup_stats():
         db_count = cursor.fetchone()[0]
         conn.close()
         
-        # Zähle CSV-Dateien
-        csv_files = list(archiv_root.rglob('data.csv'))
-        csv_count = len(csv_files)
+        # CSV-Dateien aus dem Manifest (Abgleich läuft bei Bedarf im Hintergrund)
+        archive_manifest.refresh_in_background(
+            db_path, archiv_root, c.get('manifest_refresh_seconds', 300)
+        )
+        csv_count = archive_manifest.statistics(db_path)['csv_count']
         
-        # Finde neueste CSV
-        last_backup = None
-        for csv_file in csv_files:
-            meta_file = csv_file.parent / 'meta.json'
-            if meta_file.exists():
-                try:
-                    with open(meta_file, 'r') as f:
-                        meta = json.load(f)
-                        exported_at = meta.get('exported_at')
-                        if exported_at:
-                            if not last_backup or exported_at > last_backup:
-                                last_backup = exported_at
-                except:
-                    pass
+        # Letzter Export-Lauf (auch wenn dabei keine data.csv geändert wurde)
+        import backup_system
+        last_run = backup_system.last_export(db_path)
+        last_backup = last_run['finished_at'] if last_run else None
         
         return jsonify({
             'db_count': db_count,
@@ -2235,6 +2492,7 @@ def backup_restore():
         start_time = time.time()
         stats = system.restore_all(dry_run=False)
         stats['duration'] = time.time() - start_time
+        query_cache.invalidate(db_path)
         
         return jsonify({'success': True, 'stats': stats})
         
@@ -2344,34 +2602,24 @@ def list_folders():
         if not input_folder or not input_folder.exists():
             return jsonify({'success': False, 'error': 'Eingangsordner nicht gefunden'}), 400
         
+        import re
+        from folder_walker import iter_pdf_folders
+        
         folders = []
         
-        # Finde alle Unterordner (nicht rekursiv, nur direkte Kinder)
-        for item in input_folder.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                # Ignoriere spezielle Ordner
-                if item.name in ['Fehler', 'temp_backup', '.trash']:
-                    continue
-                
-                # Zähle PDFs im Ordner
-                pdf_count = len(list(item.glob('*.pdf')))
-                
-                if pdf_count > 0:
-                    # Versuche Auftragsnummer aus Ordnername zu extrahieren
-                    import re
-                    suggested_auftrag = None
-                    
-                    # Suche nach Zahlen im Ordnername (5-6 Ziffern)
-                    match = re.search(r'\b(\d{5,6})\b', item.name)
-                    if match:
-                        suggested_auftrag = match.group(1)
-                    
-                    folders.append({
-                        'name': item.name,
-                        'path': str(item),
-                        'pdf_count': pdf_count,
-                        'suggested_auftrag': suggested_auftrag
-                    })
+        # Unterordner mit PDFs (nur direkte Kinder, ein scandir pro Ordner,
+        # Fehler/temp_backup/.trash und versteckte Ordner werden übersprungen)
+        for entry in iter_pdf_folders(input_folder):
+            # Suche nach Zahlen im Ordnername (5-6 Ziffern)
+            match = re.search(r'\b(\d{5,6})\b', entry.name)
+            suggested_auftrag = match.group(1) if match else None
+            
+            folders.append({
+                'name': entry.name,
+                'path': str(entry.path),
+                'pdf_count': entry.pdf_count,
+                'suggested_auftrag': suggested_auftrag
+            })
         
         # Sortiere nach Name
         folders.sort(key=lambda x: x['name'])
@@ -2391,6 +2639,7 @@ def list_folders():
 def import_folders():
     """API: Importiere mehrere Ordner"""
     try:
+        get_ocr()  # Tesseract/Poppler einrichten (einmalig)
         import folder_import
         
         c = get_config()
@@ -2437,7 +2686,8 @@ def import_folders():
                 continue
             
             # Zähle PDFs im Ordner
-            pdf_count = len(list(folder_path.glob('*.pdf')))
+            from folder_walker import count_pdfs
+            pdf_count = count_pdfs(folder_path)
             processing_queue.put({
                 'type': 'info',
                 'message': f'  → {pdf_count} PDF(s) gefunden in {folder_name}',
@@ -2633,7 +2883,7 @@ def start_keyword_rescan():
                     
                     # OCR für alle Seiten
                     try:
-                        ocr_texts = ocr.pdf_to_ocr_texts(file_path, max_pages=None)
+                        ocr_texts = get_ocr().pdf_to_ocr_texts(file_path, max_pages=None)
                         
                         # Extrahiere Keywords aus allen Seiten außer Seite 1
                         attachment_texts = ocr_texts[1:] if len(ocr_texts) > 1 else []
@@ -2652,6 +2902,7 @@ def start_keyword_rescan():
                         )
                         conn.commit()
                         conn.close()
+                        query_cache.invalidate(db_path)
                         
                         logger.info(f"Re-Scan: {auftrag['auftrag_nr']} - {len(found_keywords)} Schlagwörter gefunden")
                         
@@ -2691,6 +2942,83 @@ def get_rescan_status():
     return jsonify(rescan_status)
 
 
+# ============================================================
+# ROUTES - Metriken
+# ============================================================
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metriken im Prometheus-Textformat (Verarbeitungsschritte, HTTP, SQLite)"""
+    metrics.WATCHER_RUNNING.set(1 if watcher_running else 0)
+    return Response(metrics.render(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """API: Trefferstatistik des Such-Caches"""
+    return jsonify(query_cache.stats())
+
+
+@app.route('/api/ocr/scheduler')
+def ocr_scheduler_stats():
+    """API: Belegung der OCR-Plätze (interaktiv/bulk)"""
+    return jsonify(ocr_scheduler.stats())
+
+
+# ============================================================
+# ROUTES - Debug / Profiling
+# ============================================================
+
+@app.route('/debug/profiles')
+def list_profiles():
+    """API: Gespeicherte Request-Profile (neueste zuerst, Top-N Funktionen)"""
+    if not profiler.is_authorized(request.remote_addr, request.headers):
+        return jsonify({'error': 'Nur von localhost oder mit X-Profile-Token erlaubt'}), 403
+    top_n = request.args.get('top', 10, type=int)
+    return jsonify({
+        'sample_rate': profiler.sample_rate,
+        'profiles': profiler.list_profiles(top_n=top_n)
+    })
+
+
+@app.route('/debug/profiles/<int:profile_id>')
+def get_profile(profile_id):
+    """API: Einzelnes Profil inkl. SQL-Laufzeiten"""
+    if not profiler.is_authorized(request.remote_addr, request.headers):
+        return jsonify({'error': 'Nur von localhost oder mit X-Profile-Token erlaubt'}), 403
+    top_n = request.args.get('top', 30, type=int)
+    entry = profiler.get_profile(profile_id, top_n=top_n)
+    if not entry:
+        return jsonify({'error': 'Profil nicht gefunden'}), 404
+    return jsonify(entry)
+
+
+@app.route('/debug/profiles/<int:profile_id>/download')
+def download_profile(profile_id):
+    """API: Profil als .prof-Datei (pstats/snakeviz)"""
+    if not profiler.is_authorized(request.remote_addr, request.headers):
+        return jsonify({'error': 'Nur von localhost oder mit X-Profile-Token erlaubt'}), 403
+    raw = profiler.get_raw_stats(profile_id)
+    if raw is None:
+        return jsonify({'error': 'Profil nicht gefunden'}), 404
+    import io
+    return send_file(
+        io.BytesIO(raw),
+        mimetype='application/octet-stream',
+        as_attachment=True,
+        download_name=f"profile_{profile_id}.prof"
+    )
+
+
+@app.route('/debug/profiles', methods=['DELETE'])
+def clear_profiles():
+    """API: Ringpuffer leeren"""
+    if not profiler.is_authorized(request.remote_addr, request.headers):
+        return jsonify({'error': 'Nur von localhost oder mit X-Profile-Token erlaubt'}), 403
+    profiler.clear()
+    return jsonify({'success': True})
+
+
 # ============================================================
 # SERVER-START
 # ============================================================
@@ -2749,22 +3077,10 @@ if __name__ == '__main__':
     
     # Config initialisieren
     cfg = config.Config()
+    _apply_runtime_config(cfg)
     
-    # Tesseract OCR initialisieren (wichtig für Windows!)
-    tesseract_cmd = cfg.get('tesseract_cmd')
-    ocr.setup_tesseract(tesseract_cmd)
-    
-    # Tesseract testen und Warnung ausgeben wenn nicht gefunden
-    if not ocr.test_tesseract():
-        print("")
-        print("!" * 60)
-        print("  WARNUNG: Tesseract OCR nicht gefunden!")
-        print("  PDF-Verarbeitung wird nicht funktionieren.")
-        print("")
-        print("  Windows: Führe 'install_tesseract.bat' aus")
-        print("  macOS:   brew install tesseract tesseract-lang")
-        print("!" * 60)
-        print("")
+    # Tesseract OCR im Hintergrund laden und testen (blockiert den Start nicht)
+    warmup_ocr_in_background()
     
     print("")
     print("=" * 60)
@@ -2,6 +2,9 @@
 """
 Minimale Web-UI für Werkstatt-Archiv (Fast Startup)
 Lädt schwere Module nur bei Bedarf (lazy loading)
+
+VERALTET: web_app.py lädt OCR-/PDF-Module inzwischen selbst erst bei Bedarf
+(siehe web_app.get_ocr). Diese Datei wird nur noch für alte Startskripte behalten.
 """
 
 import logging
@@ -0,0 +1,265 @@
+"""
+Streaming-ZIP-Export für Suchergebnisse.
+
+Erzeugt ein ZIP-Archiv blockweise als Generator, sodass die Web-UI es per
+Chunked Transfer ausliefern kann, ohne das Archiv vorher auf die Platte zu
+schreiben. Der Speicherbedarf ist unabhängig von der Anzahl und Größe der
+Dateien (ein Lesepuffer + ein Zip-Header).
+
+PDFs sind bereits komprimiert und werden unkomprimiert (ZIP_STORED)
+gespeichert; nur das CSV-Manifest wird komprimiert.
+"""
+
+import csv
+import io
+import itertools
+import os
+import re
+import sqlite3
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+import archive_manifest
+
+logger = logging.getLogger(__name__)
+
+
+# Lesepuffer pro Datei (bestimmt die Chunk-Größe der HTTP-Antwort)
+CHUNK_SIZE = 256 * 1024
+
+# Versions-Suffix im Dateinamen (z.B. 076329_Auftrag_v2)
+_VERSION_PATTERN = re.compile(r'_v\d+$')
+
+# Spalten des CSV-Manifests
+MANIFEST_COLUMNS = [
+    'id', 'auftrag_nr', 'kunden_nr', 'kunde_name', 'datum',
+    'kennzeichen', 'vin', 'file_path', 'zip_path', 'status'
+]
+
+
+class ZipExportError(Exception):
+    """Fehler beim ZIP-Export."""
+    pass
+
+
+class _ChunkBuffer:
+    """
+    Nicht-seekbarer Schreibpuffer für zipfile.
+
+    zipfile erkennt die fehlende seek()-Methode und schreibt Data-Descriptors
+    hinter jede Datei, statt nachträglich Header zu patchen.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        """Gibt alle bisher geschriebenen Bytes zurück und leert den Puffer."""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _version_suffix(path: Path) -> str:
+    """Versions-Suffix eines Archivnamens ('' oder z.B. '_v2')."""
+    match = _VERSION_PATTERN.search(path.stem)
+    return match.group(0) if match else ''
+
+
+def _named_siblings(main_file: Path, auftrag_nr: str, listings: Dict[Path, List[str]]) -> List[Path]:
+    """
+    Anhang/Daten zu einer Hauptdatei über die Namenskonvention.
+
+    Nur für Dateien, die das Manifest keinem Auftrag zuordnet (ältere
+    Archivbestände). Passend sind `<nr>_Anhang_S2-<n>.pdf` und
+    `<nr>_Daten.pdf` mit derselben Version wie die Hauptdatei - die `_vN`
+    anderer Aufträge mit derselben Nummer bleiben draußen. Jeder Ordner wird
+    höchstens einmal aufgelistet.
+    """
+    directory = main_file.parent
+    if directory not in listings:
+        try:
+            with os.scandir(directory) as entries:
+                listings[directory] = [entry.name for entry in entries]
+        except OSError:
+            listings[directory] = []
+    pattern = re.compile(
+        rf'^{re.escape(auftrag_nr)}_(?:Anhang_S\d+-\d+|Daten){re.escape(_version_suffix(main_file))}\.pdf$',
+        re.IGNORECASE
+    )
+    return [directory / name for name in listings[directory] if pattern.match(name)]
+
+
+def collect_export_files(
+    rows: Iterable[Dict[str, Any]],
+    include_anhang: bool = True,
+    db_path: Optional[Path] = None
+) -> Iterator[Tuple[Dict[str, Any], List[Path]]]:
+    """
+    Ermittelt die Dateien pro Auftrag (erst beim Durchlaufen).
+
+    Die Hauptdatei ist `file_path` der Zeile. Anhang und Daten kommen aus dem
+    Archiv-Manifest (beim Archivieren dem Auftrag zugeordnet, eine Abfrage
+    für alle Zeilen); nur ohne Zuordnung wird der Ordner nach der
+    Namenskonvention durchsucht. Als Generator läuft das im Streaming der
+    Antwort statt vor dem ersten Byte.
+
+    Args:
+        rows: Datenbankzeilen (mindestens id, auftrag_nr, file_path)
+        include_anhang: Auch Anhang/Daten des Auftrags exportieren
+                        (z.B. 076329_Anhang_S2-10.pdf)
+        db_path: Datenbank mit dem Archiv-Manifest (None = nur Namenskonvention)
+
+    Yields:
+        (Zeile, [Dateipfade]); jede Datei kommt nur einmal vor
+    """
+    rows = list(rows)
+    known: Dict[int, List[Path]] = {}
+    if include_anhang and db_path is not None:
+        try:
+            known = archive_manifest.files_by_auftrag(db_path, [row['id'] for row in rows if row.get('id')])
+        except sqlite3.Error as e:
+            logger.warning(f"Export: Manifest nicht lesbar ({e}), verwende Dateinamen")
+
+    listings: Dict[Path, List[str]] = {}
+    seen = set()
+    for row in rows:
+        main_file = Path(row['file_path'])
+        files = [main_file]
+
+        if include_anhang:
+            siblings = [p for p in known.get(row.get('id'), []) if p.suffix.lower() == '.pdf']
+            if not any(p != main_file for p in siblings) and row.get('auftrag_nr'):
+                siblings = _named_siblings(main_file, row['auftrag_nr'], listings)
+            files.extend(sorted(p for p in siblings if p != main_file))
+
+        unique = []
+        for f in files:
+            key = str(f)
+            if key not in seen:
+                seen.add(key)
+                unique.append(f)
+        yield row, unique
+
+
+def _zip_info(arcname: str, file_path: Path, size: int, mtime: float) -> zipfile.ZipInfo:
+    """Baut den ZipInfo-Eintrag (STORED für PDFs, sonst DEFLATED)."""
+    date_time = datetime.fromtimestamp(mtime).timetuple()[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    info.file_size = size  # Für die ZIP64-Entscheidung vor dem Schreiben
+    info.external_attr = 0o644 << 16
+    if file_path.suffix.lower() == '.pdf':
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def _build_manifest(manifest_rows: List[Dict[str, Any]]) -> bytes:
+    """Erstellt das CSV-Manifest (UTF-8 mit BOM für Excel)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=MANIFEST_COLUMNS, delimiter=';', extrasaction='ignore')
+    writer.writeheader()
+    for row in manifest_rows:
+        writer.writerow(row)
+    return ('\ufeff' + buffer.getvalue()).encode('utf-8')
+
+
+def stream_zip(
+    entries: Iterable[Tuple[Dict[str, Any], List[Path]]],
+    include_manifest: bool = True,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Erzeugt das ZIP-Archiv als Folge von Byte-Blöcken.
+
+    Struktur im ZIP: <auftrag_nr>/<dateiname>, optional manifest.csv im Root.
+    Fehlende Dateien werden übersprungen und im Manifest als "fehlt" markiert.
+
+    Args:
+        entries: Ergebnis von collect_export_files
+        include_manifest: CSV-Manifest mit Metadaten anhängen
+        chunk_size: Lesepuffer in Bytes
+
+    Yields:
+        ZIP-Daten in Blöcken
+    
+    Raises:
+        ZipExportError: Wenn keine Aufträge übergeben wurden
+    """
+    entries = iter(entries)
+    first = next(entries, None)
+    if first is None:
+        raise ZipExportError("Keine Aufträge für den Export ausgewählt")
+    
+    buffer = _ChunkBuffer()
+    manifest_rows: List[Dict[str, Any]] = []
+    file_count = 0
+    row_count = 0
+    used_names = set()
+
+    with zipfile.ZipFile(buffer, mode='w', allowZip64=True) as zf:
+        for row, files in itertools.chain([first], entries):
+            row_count += 1
+            folder = row.get('auftrag_nr') or f"id_{row.get('id')}"
+            for file_path in files:
+                arcname = f"{folder}/{file_path.name}"
+                # Doppelte Namen (z.B. Duplikate mit gleicher Auftragsnr.) eindeutig machen
+                if arcname in used_names:
+                    arcname = f"{folder}/{row.get('id')}_{file_path.name}"
+                used_names.add(arcname)
+
+                manifest_row = {k: row.get(k) for k in MANIFEST_COLUMNS}
+                manifest_row['file_path'] = str(file_path)
+                manifest_row['zip_path'] = arcname
+
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    logger.warning(f"Export: Datei fehlt, übersprungen: {file_path}")
+                    manifest_row['zip_path'] = ''
+                    manifest_row['status'] = 'fehlt'
+                    manifest_rows.append(manifest_row)
+                    continue
+
+                info = _zip_info(arcname, file_path, stat.st_size, stat.st_mtime)
+                with open(file_path, 'rb') as src, zf.open(info, mode='w', force_zip64=stat.st_size > 0x7FFFFFFF) as dest:
+                    while True:
+                        block = src.read(chunk_size)
+                        if not block:
+                            break
+                        dest.write(block)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+                # Data-Descriptor der Datei
+                data = buffer.drain()
+                if data:
+                    yield data
+
+                manifest_row['status'] = 'ok'
+                manifest_rows.append(manifest_row)
+                file_count += 1
+
+        if include_manifest:
+            zf.writestr('manifest.csv', _build_manifest(manifest_rows), compress_type=zipfile.ZIP_DEFLATED)
+
+    # Central Directory
+    data = buffer.drain()
+    if data:
+        yield data
+
+    logger.info(f"📦 ZIP-Export abgeschlossen: {file_count} Dateien aus {row_count} Aufträgen")